@@ -3,10 +3,20 @@ from __future__ import annotations
 
 import heapq
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple, Callable
+from typing import Any, Dict, Generator, Hashable, List, Optional, Set, Tuple, Callable, TypeVar
 import math
 
 Coord = Tuple[int, int]
+T = TypeVar("T")
+
+SQRT2 = math.sqrt(2.0)
+
+# 4-neighborhood, in GridMap.neighbors4 order
+_N4 = ((0, -1), (0, 1), (1, 0), (-1, 0))
+_DIAGONALS = ((1, -1), (1, 1), (-1, 1), (-1, -1))
+
+# interruptible searches yield control every this many expansions
+YIELD_EVERY = 128
 
 
 @dataclass
@@ -16,6 +26,17 @@ class AStarResult:
     expanded: int
 
 
+def drain(steps: Generator[None, None, T]) -> T:
+    """
+    Run a step generator (see astar_steps) to completion and return its result.
+    """
+    try:
+        while True:
+            next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
 def astar(
     start: Coord,
     goal: Coord,
@@ -26,19 +47,40 @@ def astar(
     """
     A* on an implicit graph.
     """
-    if start == goal:
+    return drain(astar_steps(start, goal, neighbors_fn, passable_fn, heuristic_fn))
+
+
+def astar_steps(
+    start: Coord,
+    goal: Coord,
+    neighbors_fn: Callable[[Coord], List[Coord]],
+    passable_fn: Callable[[Coord], bool],
+    heuristic_fn: Callable[[Coord, Coord], float],
+    cost_fn: Optional[Callable[[Any, Any], float]] = None,
+    goal_fn: Optional[Callable[[Any], bool]] = None,
+) -> Generator[None, None, Optional[AStarResult]]:
+    """
+    Interruptible astar(): a generator that yields every YIELD_EVERY expansions, so the
+    caller can suspend the search and resume it later; its return value is the result.
+
+    Nodes may be any hashable states: cost_fn(a, b) prices an edge (default 1.0) and
+    goal_fn(node) replaces the node == goal test; heuristic_fn is still called as (node, goal).
+    """
+    if goal_fn is None:
+        goal_fn = goal.__eq__
+    if goal_fn(start):
         return AStarResult(path=[start], cost=0.0, expanded=0)
 
-    open_heap: List[Tuple[float, int, Coord]] = []
+    open_heap: List[Tuple[float, int, Hashable]] = []
     counter = 0
 
-    g: Dict[Coord, float] = {start: 0.0}
-    came_from: Dict[Coord, Coord] = {}
+    g: Dict[Hashable, float] = {start: 0.0}
+    came_from: Dict[Hashable, Hashable] = {}
 
     f0 = heuristic_fn(start, goal)
     heapq.heappush(open_heap, (f0, counter, start))
 
-    closed: Set[Coord] = set()
+    closed: Set[Hashable] = set()
     expanded = 0
 
     while open_heap:
@@ -47,8 +89,10 @@ def astar(
             continue
         closed.add(current)
         expanded += 1
+        if expanded % YIELD_EVERY == 0:
+            yield
 
-        if current == goal:
+        if goal_fn(current):
             # reconstruct
             path = [current]
             while path[-1] in came_from:
@@ -59,7 +103,7 @@ def astar(
         for nb in neighbors_fn(current):
             if not passable_fn(nb):
                 continue
-            tentative = g[current] + 1.0
+            tentative = g[current] + (1.0 if cost_fn is None else cost_fn(current, nb))
             if nb not in g or tentative < g[nb]:
                 g[nb] = tentative
                 came_from[nb] = current
@@ -72,3 +116,111 @@ def astar(
 
 def euclidean_heuristic(a: Coord, b: Coord) -> float:
     return math.hypot(b[0]-a[0], b[1]-a[1])
+
+
+def octile_heuristic(a: Coord, b: Coord) -> float:
+    dx, dy = abs(b[0] - a[0]), abs(b[1] - a[1])
+    return max(dx, dy) + (SQRT2 - 1.0) * min(dx, dy)
+
+
+def _turns(d0: Coord, d1: Coord) -> int:
+    # quarter turns between two cardinal directions; (0, 0) is "no heading yet"
+    if d0 == (0, 0) or d0 == d1:
+        return 0
+    return 2 if d0 == (-d1[0], -d1[1]) else 1
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """
+    Edge costs of the backtracking search, each with an admissible and consistent heuristic:
+    - UNIT: 4-connected, 1 per move (Euclidean distance)
+    - OCTILE: 8-connected, sqrt(2) per diagonal move, no corner cutting (octile distance)
+    - TURN: 4-connected over (x, y, dx, dy) states, 1 per move plus turn_penalty per quarter
+      turn of heading (Manhattan distance plus the fewest turns still needed)
+    """
+    kind: str = "UNIT"
+    turn_penalty: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.kind.upper() not in ("UNIT", "OCTILE", "TURN"):
+            raise ValueError(f"unknown cost model: {self.kind}")
+        if self.turn_penalty < 0:
+            raise ValueError("turn_penalty must be >= 0")
+
+    def search_steps(
+        self,
+        start: Coord,
+        goal: Coord,
+        passable_fn: Callable[[Coord], bool],
+        neighbors_fn: Optional[Callable[[Coord], List[Coord]]] = None,
+        heading: Optional[Coord] = None,
+    ) -> Generator[None, None, Optional[AStarResult]]:
+        """
+        astar_steps under this model. passable_fn must reject cells outside the map;
+        neighbors_fn (UNIT only) may supply a faster 4-neighborhood. heading is the
+        starting direction for TURN (None: the first move is free to pick any).
+        The result path lists cells; its cost is in this model's units.
+        """
+        kind = self.kind.upper()
+        if kind == "UNIT":
+            if neighbors_fn is None:
+                neighbors_fn = lambda c: [(c[0] + dx, c[1] + dy) for dx, dy in _N4]
+            return (yield from astar_steps(start, goal, neighbors_fn, passable_fn, euclidean_heuristic))
+        if kind == "OCTILE":
+            return (yield from astar_steps(start, goal, _octile_neighbors(passable_fn), passable_fn, octile_heuristic, cost_fn=_octile_cost))
+
+        p = self.turn_penalty
+
+        def neighbors(s: Tuple[int, int, int, int]) -> List[Tuple[int, int, int, int]]:
+            return [(s[0] + dx, s[1] + dy, dx, dy) for dx, dy in _N4]
+
+        def cost(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+            return 1.0 + p * _turns((a[2], a[3]), (b[2], b[3]))
+
+        def heuristic(s: Tuple[int, int, int, int], goal: Coord) -> float:
+            dx, dy = goal[0] - s[0], goal[1] - s[1]
+            need = [d for d in ((_sign(dx), 0), (0, _sign(dy))) if d != (0, 0)]
+            h = (s[2], s[3])
+            if not need:
+                turns = 0
+            elif len(need) == 1:
+                turns = _turns(h, need[0])
+            else:
+                # both axes still to travel: face one of them, then turn once more
+                turns = min(_turns(h, need[0]), _turns(h, need[1])) + 1
+            return abs(dx) + abs(dy) + p * turns
+
+        d0 = heading if heading is not None else (0, 0)
+        res = yield from astar_steps(
+            (start[0], start[1], d0[0], d0[1]),
+            goal,
+            neighbors,
+            lambda s: passable_fn((s[0], s[1])),
+            heuristic,
+            cost_fn=cost,
+            goal_fn=lambda s: s[0] == goal[0] and s[1] == goal[1],
+        )
+        if res is not None:
+            res.path = [(s[0], s[1]) for s in res.path]
+        return res
+
+
+def _sign(v: int) -> int:
+    return (v > 0) - (v < 0)
+
+
+def _octile_cost(a: Coord, b: Coord) -> float:
+    return SQRT2 if a[0] != b[0] and a[1] != b[1] else 1.0
+
+
+def _octile_neighbors(passable_fn: Callable[[Coord], bool]) -> Callable[[Coord], List[Coord]]:
+    def neighbors(c: Coord) -> List[Coord]:
+        x, y = c
+        out = [(x + dx, y + dy) for dx, dy in _N4]
+        for dx, dy in _DIAGONALS:
+            # a diagonal move needs both cells it squeezes between
+            if passable_fn((x + dx, y)) and passable_fn((x, y + dy)):
+                out.append((x + dx, y + dy))
+        return out
+    return neighbors
@@ -1,17 +1,27 @@
 
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Deque, Dict, Generator, Iterable, List, Optional, Sequence, Set, Tuple
+import itertools
 import math
+import time
 
 import numpy as np
 
-from .grid_map import GridMap, Coord
-from .astar import astar, euclidean_heuristic, AStarResult
+from .grid_map import N4_OFFSETS, N8_OFFSETS, GridMap, Coord, line_blocks
+from .astar import YIELD_EVERY, CostModel, drain, euclidean_heuristic, AStarResult
 from .smoothing import astar_spt_smooth, SmoothResult
+from .quadtree import QuadTreeMap, quadtree_astar_steps
+from .backends import get_backend
+from .spatial_index import BucketIndex
+from .sensing import build_ray_table, range_scan_obstacles, range_scan_split
 
 
+# candidate scanning yields every this many cells (mu is far costlier than an A* expansion)
+SCAN_YIELD_EVERY = 16
+
 STATE_UNKNOWN = 0
 STATE_COVERED = 1
 STATE_OBSTACLE = 2
@@ -27,10 +37,20 @@ class Pose:
 @dataclass
 class BAStarConfig:
     max_steps: int = 200000
-    sense_mode: str = "N8"  # "N4" or "N8" or "NONE"
-    inflate_obstacles: int = 0  # inflate ground-truth obstacles by this many cells
+    sense_mode: str = "N8"  # "N4" or "N8" or "RANGE" or "NONE"
+    sense_radius: int = 3  # only used by "RANGE": disc radius in cells
+    observability: str = "FULL"  # "FULL" (predicates peek at ground truth) or "PARTIAL" (discovered map only)
+    inflate_obstacles: float = 0  # inflate ground-truth obstacles by this many cells
+    inflate_shape: str = "SQUARE"  # "SQUARE" (Chebyshev, integer radius) or "DISK" (Euclidean, any radius)
     prefer_cost: str = "A_STAR"  # "EUCLIDEAN" or "A_STAR"
+    cost_model: str = "UNIT"  # backtracking search costs: "UNIT", "OCTILE" or "TURN" (see astar.CostModel)
+    turn_penalty: float = 1.0  # only used by "TURN": cost of a quarter turn, in moves
+    map_backend: str = "GRID"  # "GRID" or "QUADTREE" (backtracking search and LOS on a quadtree of the map; paths not always shortest)
+    compute_backend: Optional[str] = None  # "PYTHON", "NUMPY" or "NUMBA" (see backends); None: $BA_STAR_BACKEND or PYTHON
     stop_if_no_candidates: bool = True
+    record_events: str = "FULL"  # "FULL" (candidates and paths), "SUMMARY" (points and counts) or "NONE"
+    max_events: Optional[int] = None  # keep only the most recent events (ring buffer)
+    event_sample_every: int = 1  # record every k-th backtrack
 
 
 @dataclass
@@ -40,6 +60,10 @@ class BacktrackEvent:
     s_sp: Optional[Coord]
     astar_path: List[Coord]
     smooth_path: List[Coord]
+    traj_index: int = -1  # index of s_cp in the trajectory when the backtrack started
+    num_candidates: int = 0  # |L|, also kept when candidates are not recorded
+    astar_len: int = 0
+    smooth_len: int = 0
 
 
 @dataclass
@@ -51,6 +75,14 @@ class RunResult:
     steps: int
     coverage_rate: float
     path_length: float
+    num_backtracks: int = 0  # all backtracks, including the ones not kept in events
+
+
+@dataclass
+class PlanIncrement:
+    moves: List[Coord]  # cells entered since the previous increment, in order
+    done: bool  # BA* terminated (or hit max_steps); a later call starts a new run() from here
+    steps: int
 
 
 def heading_to_dir(theta: float) -> Coord:
@@ -79,7 +111,9 @@ def heading_to_dir(theta: float) -> Coord:
 class BAStarPlanner:
     def __init__(self, grid: GridMap, start_cell: Coord, start_theta: float = 0.0, cfg: Optional[BAStarConfig] = None):
         self.cfg = cfg or BAStarConfig()
-        self.grid = grid.inflate_obstacles(self.cfg.inflate_obstacles)
+        self.grid = grid.inflate_obstacles(self.cfg.inflate_obstacles, self.cfg.inflate_shape)
+        # private copy of the raw map, needed to re-inflate locally on occupancy updates
+        self.base_grid = GridMap(grid.occ, tile_size=grid.spec.tile_size) if self.cfg.inflate_obstacles > 0 else self.grid
         if not self.grid.is_free(start_cell):
             raise ValueError("start_cell must be free in the map")
         self.pose = Pose(float(start_cell[0]), float(start_cell[1]), float(start_theta))
@@ -91,9 +125,77 @@ class BAStarPlanner:
         self.known_obs: Set[Coord] = set()
         self.trajectory: List[Coord] = [start_cell]
 
-        self.events: List[BacktrackEvent] = []
+        level = self.cfg.record_events.upper()
+        if level not in ("FULL", "SUMMARY", "NONE"):
+            raise ValueError(f"unknown record_events level: {self.cfg.record_events}")
+        if self.cfg.event_sample_every < 1:
+            raise ValueError("event_sample_every must be >= 1")
+        self._record_level = level
+        self.events: Deque[BacktrackEvent] = deque(maxlen=self.cfg.max_events)
+        self.num_backtracks = 0
         self.steps = 0
 
+        self._ray_table = None
+        if self.cfg.sense_mode.upper() == "RANGE":
+            self._ray_table = build_ray_table(int(self.cfg.sense_radius))
+
+        # partial observability: free cells must be sensed before they can be used,
+        # and candidates come from an incrementally maintained frontier index
+        self.partial = self.cfg.observability.upper() == "PARTIAL"
+        self.known_free: Set[Coord] = set()
+        self.frontier: Set[Coord] = set()  # covered cells with an uncovered known-free 4-neighbor
+        if self.partial:
+            mode = self.cfg.sense_mode.upper()
+            if mode == "NONE" or (mode == "RANGE" and self.cfg.sense_radius < 1):
+                raise ValueError("PARTIAL observability needs a sensor that sees the 4-neighborhood")
+
+        # search caches, invalidated locally by apply_occupancy_updates
+        self._astar_cache: Dict[Tuple, Optional[AStarResult]] = {}
+        self._los_cache: Dict[Tuple[Coord, Coord], bool] = {}
+        self._los_index: Dict[Tuple[int, int], Set[Tuple[Coord, Coord]]] = {}
+
+        backend = self.cfg.map_backend.upper()
+        if backend not in ("GRID", "QUADTREE"):
+            raise ValueError(f"unknown map_backend: {self.cfg.map_backend}")
+        self._cost_model = CostModel(self.cfg.cost_model, self.cfg.turn_penalty)
+        if backend == "QUADTREE" and self._cost_model.kind.upper() != "UNIT":
+            raise ValueError("the QUADTREE backend only supports the UNIT cost model")
+        self._qt: Optional[QuadTreeMap] = None
+        if backend == "QUADTREE":
+            # quadtree of the planning map for LOS, and a second one of the cells the backtracking
+            # search may not use (1 until covered), updated in place before each search with
+            # the cells covered or lost since the previous one
+            self._qt = QuadTreeMap.from_grid(self.grid)
+            self._bt_qt = QuadTreeMap(np.ones_like(self.grid.occ))
+            self._bt_changes: Dict[Coord, int] = {}
+
+        # array kernels read the discovered map from a raster kept in step with hatM
+        self._backend = get_backend(self.cfg.compute_backend)
+        self._state: Optional[np.ndarray] = None
+        self._passable: Optional[np.ndarray] = None  # covered free cells, for grid_astar
+        if self._backend.corner_mask is not None or self._backend.grid_astar is not None:
+            self._state = np.zeros(self.grid.occ.shape, dtype=np.uint8)
+
+        # FULL observability: uncovered free cells as a flat byte raster, read through the grid's
+        # flat neighbor tables by BM, the critical test and mu; the extra last byte stays 0,
+        # so the tables' -1 (out of bounds) reads as blocked
+        self._open: Optional[bytearray] = None
+        self._nbr4: Optional[memoryview] = None
+        self._nbr8: Optional[memoryview] = None
+        if not self.partial:
+            self._open = bytearray((self.grid.occ.reshape(-1) == 0).tobytes() + b"\0")
+
+        # EUCLIDEAN selection (FULL observability): L kept in a spatial index, updated at each
+        # backtrack by re-evaluating mu only around cells whose state or occupancy changed
+        self._cand_index: Optional[BucketIndex] = None
+        self._dirty: Set[Coord] = set()
+        if self.cfg.prefer_cost.upper() == "EUCLIDEAN" and not self.partial:
+            self._cand_index = BucketIndex()
+
+        # suspended main loop of run() / run_for(), and how much of the trajectory was returned
+        self._steps_gen: Optional[Generator[None, None, None]] = None
+        self._emitted = 1
+
         self._sense()
 
         self._mark_covered(start_cell)
@@ -102,11 +204,24 @@ class BAStarPlanner:
         return self.hatM.get(c, STATE_UNKNOWN)
 
     def _set_state(self, c: Coord, st: int) -> None:
+        if self._cand_index is not None and self.hatM.get(c) != st:
+            self._dirty.add(c)
         self.hatM[c] = st
+        if self._open is not None:
+            self._open[c[1] * self.grid.w + c[0]] = 0
+        if self._state is not None:
+            self._state[c[1], c[0]] = st
         if st == STATE_OBSTACLE:
             self.known_obs.add(c)
         elif st == STATE_COVERED:
             self.covered.add(c)
+            # the backtracking graph grew, so cached shortest paths may no longer be shortest
+            self._astar_cache.clear()
+            self._passable = None
+            if self._qt is not None:
+                self._bt_changes[c] = 0
+            if self.partial:
+                self._frontier_on_covered(c)
 
     def _mark_covered(self, c: Coord) -> None:
         if self._get_state(c) == STATE_UNKNOWN:
@@ -119,20 +234,66 @@ class BAStarPlanner:
         mode = self.cfg.sense_mode.upper()
         if mode == "NONE":
             return
+        if mode == "RANGE":
+            # one vectorized raycast over the precomputed table, then a bulk write
+            if self.partial:
+                obs, free = range_scan_split(self.grid, self.cell, self._ray_table)
+                self._reveal_free(free)
+            else:
+                obs = range_scan_obstacles(self.grid, self.cell, self._ray_table)
+            if self._cand_index is not None:
+                self._dirty.update(c for c in obs if c not in self.known_obs)
+            self.hatM.update(dict.fromkeys(obs, STATE_OBSTACLE))
+            self.known_obs.update(obs)
+            if self._state is not None and obs:
+                xy = np.array(obs, dtype=np.int64)
+                self._state[xy[:, 1], xy[:, 0]] = STATE_OBSTACLE
+            return
         if mode == "N4":
-            cells = [self.cell] + self.grid.neighbors4(self.cell)
+            cells = (self.cell,) + tuple(self.grid.neighbors4(self.cell))
         else:
-            cells = [self.cell] + self.grid.neighbors8(self.cell)
+            cells = (self.cell,) + tuple(self.grid.neighbors8(self.cell))
 
         for c in cells:
             if self.grid.is_obstacle(c):
                 self._set_state(c, STATE_OBSTACLE)
+            elif self.partial:
+                self._reveal_free([c])
+
+    def _is_open(self, c: Coord) -> bool:
+        # known free but not yet covered
+        return c in self.known_free and self._get_state(c) == STATE_UNKNOWN
+
+    def _reveal_free(self, cells: List[Coord]) -> None:
+        """
+        Record sensed free cells. A newly seen uncovered cell turns its covered 4-neighbors into frontier cells.
+        """
+        for c in cells:
+            if c in self.known_free:
+                continue
+            self.known_free.add(c)
+            if self._get_state(c) == STATE_UNKNOWN:
+                for nb in self.grid.neighbors4(c):
+                    if nb in self.covered:
+                        self.frontier.add(nb)
+
+    def _frontier_on_covered(self, c: Coord) -> None:
+        """
+        c just became covered: it may join the frontier, and covered neighbors whose
+        only open neighbor was c leave it.
+        """
+        self.known_free.add(c)
+        for nb in self.grid.neighbors4(c):
+            if nb in self.frontier and not any(self._is_open(n) for n in self.grid.neighbors4(nb)):
+                self.frontier.discard(nb)
+        if any(self._is_open(n) for n in self.grid.neighbors4(c)):
+            self.frontier.add(c)
 
     def is_blocked(self, c: Coord) -> bool:
         # blocked if known covered or known obstacle or true obstacle (safety in simulation)
         if not self.grid.in_bounds(c):
             return True
-        if self.grid.is_obstacle(c):
+        if not self.partial and self.grid.is_obstacle(c):
             return True
         st = self._get_state(c)
         return st in (STATE_COVERED, STATE_OBSTACLE)
@@ -140,15 +301,31 @@ class BAStarPlanner:
     def is_uncovered_free(self, c: Coord) -> bool:
         """
         Free and uncovered relative to the discovered map.
-        In simulation we also require ground-truth free.
+        In simulation we also require ground-truth free, unless running with PARTIAL observability.
         """
+        if self.partial:
+            return self._is_open(c)
         return self.grid.is_free(c) and (self._get_state(c) == STATE_UNKNOWN)
 
+    def _flat_neighbors(self) -> Tuple[memoryview, memoryview]:
+        # rows of the grid's N4 and N8 tables, flattened: cell i's neighbors are [k*i, k*i+k)
+        if self._nbr4 is None:
+            self._nbr4 = memoryview(self.grid.neighbor_index(N4_OFFSETS).reshape(-1))
+            self._nbr8 = memoryview(self.grid.neighbor_index(N8_OFFSETS).reshape(-1))
+        return self._nbr4, self._nbr8
+
     def _bm_next_cell(self, s: Coord) -> Optional[Coord]:
         """
         One BM step using the priority order N, S, E, W.
         Returns next cell, or None if all blocked.
         """
+        if self._open is not None:
+            i = 4 * (s[1] * self.grid.w + s[0])
+            for j in self._flat_neighbors()[0][i:i + 4]:
+                if self._open[j]:
+                    y, x = divmod(j, self.grid.w)
+                    return (x, y)
+            return None
         # neighbors4 returns [N, S, E, W]
         for nb in self.grid.neighbors4(s):
             # BM moves into uncovered free tiles only
@@ -158,28 +335,20 @@ class BAStarPlanner:
 
     def _is_critical(self, s: Coord) -> bool:
         # critical if all four directions blocked
+        if self._open is not None:
+            i = 4 * (s[1] * self.grid.w + s[0])
+            return not any(self._open[j] for j in self._flat_neighbors()[0][i:i + 4])
         for nb in self.grid.neighbors4(s):
             if not self.is_blocked(nb):
                 return False
         return True
 
-    def _neighbors8_indexed(self, s: Coord) -> List[Coord]:
+    def _neighbors8_indexed(self, s: Coord) -> Sequence[Coord]:
         """
         Return [s1..s8] in the report order.
         """
-        nbs = self.grid.neighbors8(s)
-        # grid.neighbors8 already returns the ordered list, but it filters by bounds.
-        # We need all 8 positions, even out of bounds, to evaluate patterns consistently.
-        x, y = s
-        s1 = (x+1, y)
-        s2 = (x+1, y-1)
-        s3 = (x, y-1)
-        s4 = (x-1, y-1)
-        s5 = (x-1, y)
-        s6 = (x-1, y+1)
-        s7 = (x, y+1)
-        s8 = (x+1, y+1)
-        return [s1, s2, s3, s4, s5, s6, s7, s8]
+        # grid.neighbors8 filters by bounds; patterns need all 8 positions, even out of bounds.
+        return self.grid.neighbors8_all(s)
 
     def _b_indicator(self, si: Coord, sj: Coord) -> int:
         """
@@ -194,6 +363,14 @@ class BAStarPlanner:
         Corner detector from the report:
         mu(s)=b(s1,s8)+b(s1,s2)+b(s5,s6)+b(s5,s4)+b(s7,s6)+b(s7,s8)
         """
+        if self._open is not None and self.grid.in_bounds(s):
+            # with FULL observability a cell is blocked exactly when it is not uncovered free
+            op = self._open
+            i = 8 * (s[1] * self.grid.w + s[0])
+            f1, f2, _, f4, f5, f6, f7, f8 = [op[j] for j in self._flat_neighbors()[1][i:i + 8]]
+            return (
+                f1 * (2 - f8 - f2) + f5 * (2 - f6 - f4) + f7 * (2 - f6 - f8)
+            )
         s1, s2, s3, s4, s5, s6, s7, s8 = self._neighbors8_indexed(s)
         return (
             self._b_indicator(s1, s8)
@@ -207,15 +384,29 @@ class BAStarPlanner:
     def build_candidates_L(self) -> List[Coord]:
         """
         Build L by scanning covered tiles and selecting those with mu(s) >= 1.
+        With PARTIAL observability only the frontier index is scanned.
         """
+        return drain(self._build_candidates_steps())
+
+    def _build_candidates_steps(self) -> Generator[None, None, List[Coord]]:
+        # build_candidates_L, yielding every SCAN_YIELD_EVERY scanned cells
+        if self._backend.corner_mask is not None and not self.partial:
+            # one array kernel call over all covered cells, kept in covered-set order
+            xy = np.fromiter(itertools.chain.from_iterable(self.covered), dtype=np.int64, count=2 * len(self.covered))
+            mask = self._backend.corner_mask(self.grid.occ, self._state, xy[0::2], xy[1::2])
+            return list(itertools.compress(self.covered, mask.tolist()))
         L: List[Coord] = []
-        for s in self.covered:
+        for i, s in enumerate(sorted(self.frontier) if self.partial else self.covered):
             if self.mu(s) >= 1:
                 L.append(s)
+            if i % SCAN_YIELD_EVERY == SCAN_YIELD_EVERY - 1:
+                yield
         return L
 
     def _passable_for_astar(self, c: Coord) -> bool:
         # backtracking moves only over covered tiles (including start and goal)
+        if self.partial:
+            return c in self.covered
         if not self.grid.in_bounds(c):
             return False
         if self.grid.is_obstacle(c):
@@ -223,15 +414,224 @@ class BAStarPlanner:
         return c in self.covered
 
     def _astar_path(self, start: Coord, goal: Coord) -> Optional[AStarResult]:
-        return astar(
-            start=start,
-            goal=goal,
-            neighbors_fn=lambda c: self.grid.neighbors4(c),
-            passable_fn=self._passable_for_astar,
-            heuristic_fn=euclidean_heuristic,
-        )
+        return drain(self._astar_path_steps(start, goal))
+
+    def _arrival_heading(self) -> Optional[Coord]:
+        # direction of the last move, when it was a single 4-connected step
+        if len(self.trajectory) < 2:
+            return None
+        (x0, y0), (x1, y1) = self.trajectory[-2], self.trajectory[-1]
+        d = (x1 - x0, y1 - y0)
+        return d if abs(d[0]) + abs(d[1]) == 1 else None
+
+    def _astar_path_steps(self, start: Coord, goal: Coord) -> Generator[None, None, Optional[AStarResult]]:
+        heading = None
+        if self._cost_model.kind.upper() == "TURN" and start == self.cell:
+            heading = self._arrival_heading()
+        key = (start, goal) if heading is None else (start, goal, heading)
+        if key in self._astar_cache:
+            return self._astar_cache[key]
+        if self._qt is not None:
+            bt = self._bt_qt
+            if self._bt_changes:
+                bt.update(self._bt_changes)
+                self._bt_changes.clear()
+            res = yield from quadtree_astar_steps(
+                bt,
+                start,
+                goal,
+                passable_fn=self._passable_for_astar,
+                leaf_passable_fn=lambda i: bt.leaf_free[i],
+            )
+        elif self._backend.grid_astar is not None and self._cost_model.kind.upper() == "UNIT":
+            if self._passable is None:
+                covered = self._state == STATE_COVERED
+                self._passable = (covered if self.partial else covered & (self.grid.occ == 0)).view(np.uint8)
+            res = self._backend.grid_astar(self._passable, start, goal)
+        else:
+            res = yield from self._cost_model.search_steps(
+                start,
+                goal,
+                passable_fn=self._passable_for_astar,
+                neighbors_fn=self.grid.neighbors4,
+                heading=heading,
+            )
+        self._astar_cache[key] = res
+        return res
+
+    def _line_of_sight(self, a: Coord, b: Coord) -> bool:
+        """
+        Line of sight for smoothing. FULL mode results are cached and indexed by the
+        8x8 blocks the line crosses; PARTIAL mode tests known-free cells and is not cached
+        because the discovered map keeps growing.
+        """
+        if self.partial:
+            return all(p in self.known_free for p in self._backend.bresenham_line(a, b))
+        key = (a, b)
+        hit = self._los_cache.get(key)
+        if hit is not None:
+            return hit
+        res = (self._qt or self.grid).line_of_sight(a, b)
+        self._los_cache[key] = res
+        for blk in line_blocks(a, b, 3):
+            self._los_index.setdefault(blk, set()).add(key)
+        return res
+
+    def apply_occupancy_updates(self, updates: Dict[Coord, int]) -> Set[Coord]:
+        """
+        Apply ground-truth occupancy changes (cell -> 1 obstacle / 0 free) to a running planner.
+
+        The inflated map is recomputed only around the changed cells, and only the discovered
+        state, frontier, LOS entries and cached A* paths that touch flipped cells are dropped.
+        With PARTIAL observability only cells already in the discovered map are updated; the
+        others stay unknown until the sensor reaches them.
+        Calling run() again continues coverage from the current cell.
+        Returns the cells of the planning grid whose occupancy flipped.
+        """
+        r, shape = self.cfg.inflate_obstacles, self.cfg.inflate_shape
+        if any(not self.base_grid.in_bounds(c) for c in updates):
+            raise ValueError("occupancy update outside the map")
+        old = {c: int(self.base_grid.occ[c[1], c[0]]) for c in updates}
+        for (x, y), v in updates.items():
+            self.base_grid.occ[y, x] = 1 if v else 0
+        cells = [c for c, v in old.items() if v != int(self.base_grid.occ[c[1], c[0]])]
+        self.base_grid.occupancy_changed()
+        flipped = self.grid.reinflate_around(self.base_grid, r, cells, shape) if r > 0 else set(cells)
+
+        if self.cell in flipped and self.grid.is_obstacle(self.cell):
+            # roll back so the planner stays consistent
+            for (x, y), v in old.items():
+                self.base_grid.occ[y, x] = v
+            self.base_grid.occupancy_changed()
+            if r > 0:
+                self.grid.reinflate_around(self.base_grid, r, cells, shape)
+            raise ValueError("occupancy update would place an obstacle on the robot cell")
+
+        for c in flipped:
+            if self.partial and c not in self.known_free and c not in self.known_obs:
+                continue
+            if self.grid.is_obstacle(c):
+                self._forget_free(c)
+                self._set_state(c, STATE_OBSTACLE)
+            else:
+                self.hatM.pop(c, None)
+                self.known_obs.discard(c)
+                if self._open is not None:
+                    self._open[c[1] * self.grid.w + c[0]] = 1
+                if self._state is not None:
+                    self._state[c[1], c[0]] = STATE_UNKNOWN
+                if self.partial:
+                    self._reveal_free([c])
+        self._invalidate_caches(flipped)
+        if flipped and self._steps_gen is not None:
+            # an interrupted backtrack may rely on the old map: restart from the current cell
+            self._steps_gen.close()
+            self._steps_gen = None
+        if self._qt is not None and flipped:
+            self._qt.update({c: int(self.grid.occ[c[1], c[0]]) for c in flipped})
+        return flipped
+
+    def absorb_bm_moves(self, cells: Sequence[Coord], new_obstacles: Sequence[Coord] = ()) -> None:
+        """
+        Take over BM moves made outside the planner (e.g. by BatchSimulator on its arrays):
+        the robot entered cells in order, each one uncovered until then, and sensed
+        new_obstacles on the way. Updates the discovered map, trajectory, step count and
+        pose in bulk, as the same moves made by run() would. FULL observability only.
+        """
+        if self.partial:
+            raise ValueError("absorb_bm_moves needs FULL observability")
+        w = self.grid.w
+        op = np.frombuffer(self._open, dtype=np.uint8)
+        if len(new_obstacles):
+            obs = [c for c in new_obstacles if c not in self.known_obs]
+            if self._cand_index is not None:
+                self._dirty.update(obs)
+            self.hatM.update(dict.fromkeys(obs, STATE_OBSTACLE))
+            self.known_obs.update(obs)
+            xy = np.array(obs, dtype=np.int64).reshape(-1, 2)
+            op[xy[:, 1] * w + xy[:, 0]] = 0
+            if self._state is not None:
+                self._state[xy[:, 1], xy[:, 0]] = STATE_OBSTACLE
+        if not len(cells):
+            return
+        cells = list(cells)
+        self.trajectory.extend(cells)
+        self.covered.update(cells)
+        self.hatM.update(dict.fromkeys(cells, STATE_COVERED))
+        if self._cand_index is not None:
+            self._dirty.update(cells)
+        xy = np.array(cells, dtype=np.int64)
+        op[xy[:, 1] * w + xy[:, 0]] = 0
+        if self._state is not None:
+            self._state[xy[:, 1], xy[:, 0]] = STATE_COVERED
+        # the backtracking graph grew, as in _set_state
+        self._astar_cache.clear()
+        self._passable = None
+        if self._qt is not None:
+            self._bt_changes.update(dict.fromkeys(cells, 0))
+        self.steps += len(cells)
+        self.cell = cells[-1]
+        self.pose.x, self.pose.y = float(self.cell[0]), float(self.cell[1])
+
+    def _forget_free(self, c: Coord) -> None:
+        """
+        c turned into an obstacle: drop it from coverage and from the frontier index.
+        """
+        self.covered.discard(c)
+        if self._qt is not None:
+            self._bt_changes[c] = 1
+        if not self.partial:
+            return
+        self.known_free.discard(c)
+        self.frontier.discard(c)
+        for nb in self.grid.neighbors4(c):
+            if nb in self.frontier and not any(self._is_open(n) for n in self.grid.neighbors4(nb)):
+                self.frontier.discard(nb)
+
+    def _invalidate_caches(self, cells: Iterable[Coord]) -> None:
+        cells = set(cells)
+        if not cells:
+            return
+        self._passable = None
+        if self._cand_index is not None:
+            self._dirty |= cells
+        for key in [k for k, res in self._astar_cache.items() if res is not None and not cells.isdisjoint(res.path)]:
+            del self._astar_cache[key]
+        # removing nodes cannot create paths, but freed cells are never covered, so
+        # unreachable results stay valid as well
+        for blk in {(x >> 3, y >> 3) for x, y in cells}:
+            for key in self._los_index.pop(blk, ()):
+                self._los_cache.pop(key, None)
+
+    def _refresh_candidates(self) -> None:
+        # mu(s) reads only s's 8-neighborhood, so only cells next to a change can flip
+        if not self._dirty:
+            return
+        touched = set(self._dirty)
+        for c in self._dirty:
+            touched.update(self._neighbors8_indexed(c))
+        self._dirty.clear()
+        for s in touched:
+            if s in self.covered and self.mu(s) >= 1:
+                self._cand_index.add(s)
+            else:
+                self._cand_index.discard(s)
+
+    def _nearest_candidate(self, s_cp: Coord) -> Optional[Coord]:
+        """
+        select_start_point for EUCLIDEAN on the candidate index; ties go to the cell that
+        comes first in covered-set order, as min() over build_candidates_L() would pick.
+        """
+        tied = self._cand_index.nearest(s_cp)
+        if len(tied) <= 1:
+            return tied[0] if tied else None
+        tied_set = set(tied)
+        return next(c for c in self.covered if c in tied_set)
 
     def select_start_point(self, s_cp: Coord, L: List[Coord]) -> Optional[Coord]:
+        return drain(self._select_start_point_steps(s_cp, L))
+
+    def _select_start_point_steps(self, s_cp: Coord, L: List[Coord]) -> Generator[None, None, Optional[Coord]]:
         if not L:
             return None
         if self.cfg.prefer_cost.upper() == "EUCLIDEAN":
@@ -241,7 +641,7 @@ class BAStarPlanner:
         best_s = None
         best_cost = float("inf")
         for s in L:
-            res = self._astar_path(s_cp, s)
+            res = yield from self._astar_path_steps(s_cp, s)
             if res is None:
                 continue
             if res.cost < best_cost:
@@ -254,6 +654,10 @@ class BAStarPlanner:
         Append the cell path to trajectory, updating sensing along the way.
         This is a discrete execution; continuous pose is not simulated beyond storing theta updates.
         """
+        drain(self._follow_cells_steps(cells))
+
+    def _follow_cells_steps(self, cells: List[Coord]) -> Generator[None, None, None]:
+        # _follow_cells, yielding after every move
         for c in cells[1:]:
             self.cell = c
             self.pose.x, self.pose.y = float(c[0]), float(c[1])
@@ -262,6 +666,7 @@ class BAStarPlanner:
             self._sense()
             if self.steps >= self.cfg.max_steps:
                 break
+            yield
 
     def _heading_adjustment(self, s_sp: Coord) -> None:
         """
@@ -283,11 +688,88 @@ class BAStarPlanner:
                 return
         # fallback: keep heading unchanged
 
-    def run(self) -> RunResult:
+    def _backtrack(self, L: Optional[List[Coord]] = None, s_sp: Optional[Coord] = None) -> bool:
         """
-        Execute BA* until termination or max steps.
+        One backtracking phase from the current cell: build L, pick s_sp, follow the smoothed A* path.
+        A caller that already knows L (e.g. computed in bulk), and possibly the start point
+        select_start_point would pick from it, can pass them in.
+        Returns False when BA* terminates here.
         """
-        # Main loop: BM until critical, then backtrack.
+        return drain(self._backtrack_steps(L, s_sp))
+
+    def _backtrack_steps(self, L: Optional[List[Coord]] = None, s_sp: Optional[Coord] = None) -> Generator[None, None, bool]:
+        # _backtrack with yield points in candidate building, selection, A* and path following
+        s_cp = self.cell
+        if not self._is_critical(s_cp):
+            # could happen if BM stopped due to max steps
+            return False
+
+        # build L and pick s_sp
+        if L is None and self._cand_index is not None:
+            self._refresh_candidates()
+            L = self._cand_index
+            s_sp = self._nearest_candidate(s_cp)
+        else:
+            if L is None:
+                L = yield from self._build_candidates_steps()
+            if s_sp is None:
+                s_sp = yield from self._select_start_point_steps(s_cp, L)
+
+        if s_sp is None:
+            if self.cfg.stop_if_no_candidates:
+                return False
+            else:
+                # no candidates but continue? stop
+                return False
+
+        res = yield from self._astar_path_steps(s_cp, s_sp)
+        if res is None:
+            # if graph disconnected, remove this candidate and try again
+            # in this simplified implementation, terminate
+            return False
+
+        smooth = astar_spt_smooth(self.grid, res.path, los_fn=self._line_of_sight)
+
+        # record event
+        self._record_event(s_cp, L, s_sp, res.path, smooth.path)
+
+        # follow smoothed path (backtracking)
+        yield from self._follow_cells_steps(smooth.path)
+
+        # heading adjustment
+        self._heading_adjustment(s_sp)
+
+        # mark current (already covered)
+        self._mark_covered(self.cell)
+        return True
+
+    def _record_event(self, s_cp: Coord, L: List[Coord], s_sp: Coord, astar_path: List[Coord], smooth_path: List[Coord]) -> None:
+        """
+        Store a BacktrackEvent according to cfg.record_events / event_sample_every / max_events.
+        SUMMARY keeps the points and counts but skips sorting L and holding on to the paths.
+        """
+        k = self.num_backtracks
+        self.num_backtracks += 1
+        if self._record_level == "NONE" or k % self.cfg.event_sample_every:
+            return
+        full = self._record_level == "FULL"
+        self.events.append(
+            BacktrackEvent(
+                s_cp=s_cp,
+                candidates=sorted(L) if full else [],
+                s_sp=s_sp,
+                astar_path=astar_path if full else [],
+                smooth_path=smooth_path if full else [],
+                traj_index=len(self.trajectory) - 1,
+                num_candidates=len(L),
+                astar_len=len(astar_path),
+                smooth_len=len(smooth_path),
+            )
+        )
+
+    def _run_steps(self) -> Generator[None, None, None]:
+        # Main loop: BM until critical, then backtrack; yields after every move and
+        # periodically inside backtracking so run_for() can stop at any of those points.
         while self.steps < self.cfg.max_steps:
             # BM phase
             while self.steps < self.cfg.max_steps:
@@ -296,54 +778,66 @@ class BAStarPlanner:
                     break
                 self._follow_cells([self.cell, nxt])
                 self._mark_covered(self.cell)
+                yield
 
-            s_cp = self.cell
-            if not self._is_critical(s_cp):
-                # could happen if BM stopped due to max steps
-                break
-
-            # build L and pick s_sp
-            L = self.build_candidates_L()
-            s_sp = self.select_start_point(s_cp, L)
-
-            if s_sp is None:
-                if self.cfg.stop_if_no_candidates:
-                    break
-                else:
-                    # no candidates but continue? stop
-                    break
-
-            res = self._astar_path(s_cp, s_sp)
-            if res is None:
-                # if graph disconnected, remove this candidate and try again
-                # in this simplified implementation, terminate
+            ok = yield from self._backtrack_steps()
+            if not ok:
                 break
 
-            smooth = astar_spt_smooth(self.grid, res.path)
-
-            # record event
-            self.events.append(
-                BacktrackEvent(
-                    s_cp=s_cp,
-                    candidates=sorted(L),
-                    s_sp=s_sp,
-                    astar_path=res.path,
-                    smooth_path=smooth.path,
-                )
-            )
+    def _advance(self, deadline: Optional[float]) -> bool:
+        """
+        Resume the main loop until it finishes (returns True) or, when a deadline
+        (time.perf_counter() value) is given, until the first yield point after it.
+        """
+        if self._steps_gen is None:
+            self._steps_gen = self._run_steps()
+        for _ in self._steps_gen:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+        self._steps_gen = None
+        return True
 
-            # follow smoothed path (backtracking)
-            self._follow_cells(smooth.path)
+    def run(self) -> RunResult:
+        """
+        Execute BA* until termination or max steps, continuing a run_for() increment if
+        one was interrupted.
+        """
+        self._advance(None)
+        self._emitted = len(self.trajectory)
+        return self.result()
 
-            # heading adjustment
-            self._heading_adjustment(s_sp)
+    def prepare(self) -> None:
+        """
+        Build the map lookup tables that are otherwise created on first use, so that
+        the first run_for() increments are not charged for them.
+        """
+        self.grid.precompute()
+        if self._qt is not None:
+            self._qt.adjacency()
 
-            # mark current (already covered)
-            self._mark_covered(self.cell)
+    def run_for(self, budget_s: float) -> PlanIncrement:
+        """
+        Plan for about budget_s seconds of wall-clock time and return the moves produced.
+        The planner stops at the first yield point past the budget (after a move, or inside
+        candidate scanning / A* every YIELD_EVERY expansions) and the next run_for() or
+        run() call continues exactly there, so the concatenated moves equal one run().
+        Call prepare() once beforehand to keep one-time table builds out of the budget.
+        """
+        done = self._advance(time.perf_counter() + budget_s)
+        moves = self.trajectory[self._emitted:]
+        self._emitted = len(self.trajectory)
+        return PlanIncrement(moves=moves, done=done, steps=self.steps)
 
+    def result(self) -> RunResult:
+        """
+        Snapshot of the run so far, with coverage metrics.
+        """
         # compute metrics
-        free_total = int(np.sum(self.grid.occ == 0))
-        covered_free = sum(1 for c in self.covered if self.grid.is_free(c))
+        free_total = int(np.count_nonzero(self.grid.occ == 0))
+        covered_free = 0
+        if self.covered:
+            xy = np.fromiter(itertools.chain.from_iterable(self.covered), dtype=np.int64, count=2 * len(self.covered))
+            covered_free = int(np.count_nonzero(self.grid.occ[xy[1::2], xy[0::2]] == 0))
         coverage_rate = (covered_free / free_total) if free_total > 0 else 0.0
 
         # path length in cells (each move is 1)
@@ -357,4 +851,5 @@ class BAStarPlanner:
             steps=self.steps,
             coverage_rate=float(coverage_rate),
             path_length=float(path_length),
+            num_backtracks=self.num_backtracks,
         )
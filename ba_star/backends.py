@@ -0,0 +1,239 @@
+"""
+Compute backends: interchangeable implementations of the planner's hot kernels.
+
+- PYTHON: the reference implementation (per-cell mu, astar_steps, bresenham_line)
+- NUMPY: the candidate scan evaluates mu at all covered cells with array gathers, and
+  lines come from the closed form of bresenham_point; A* stays the reference search
+- NUMBA: JIT-compiled candidate scan, Bresenham walk and 4-connected unit-cost A* (same
+  expansion order and tie-breaking as astar_steps); needs numba, else falls back to NUMPY
+
+All backends return identical results. The backend is chosen by BAStarConfig.compute_backend,
+or, when that is None, by the BA_STAR_BACKEND environment variable (default PYTHON).
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .astar import AStarResult
+from .grid_map import Coord, bresenham_line
+
+ENV_VAR = "BA_STAR_BACKEND"
+BACKENDS = ("PYTHON", "NUMPY", "NUMBA")
+
+# discovered-map states, as in ba_star.ba_star
+_UNKNOWN, _COVERED, _OBSTACLE = 0, 1, 2
+
+
+@dataclass(frozen=True)
+class ComputeBackend:
+    name: str
+    bresenham_line: Callable[[Coord, Coord], List[Coord]]
+    # corner_mask(occ, state, xs, ys) -> bool per cell: mu >= 1 (FULL observability); None: per-cell mu
+    corner_mask: Optional[Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]] = None
+    # grid_astar(passable, start, goal): unit-cost 4-connected A*; None: astar_steps
+    grid_astar: Optional[Callable[[np.ndarray, Coord, Coord], Optional[AStarResult]]] = None
+
+
+def numba_available() -> bool:
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_backend(name: Optional[str] = None) -> ComputeBackend:
+    """
+    Backend by name (case-insensitive); None reads BA_STAR_BACKEND.
+    """
+    if name is None:
+        name = os.environ.get(ENV_VAR) or "PYTHON"
+    return _backend(name.upper())
+
+
+@lru_cache(maxsize=None)
+def _backend(name: str) -> ComputeBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"unknown compute backend: {name} (expected one of {', '.join(BACKENDS)})")
+    if name == "NUMBA" and numba_available():
+        k = _numba_kernels()
+        return ComputeBackend("NUMBA", k.bresenham_line, k.corner_mask, k.grid_astar)
+    if name == "PYTHON":
+        return ComputeBackend("PYTHON", bresenham_line)
+    return ComputeBackend("NUMPY", bresenham_line_np, corner_mask_np)
+
+
+def bresenham_line_np(a: Coord, b: Coord) -> List[Coord]:
+    """
+    bresenham_line via the closed form of bresenham_point, evaluated for all t at once.
+    """
+    (x0, y0), (x1, y1) = a, b
+    dx, dy = abs(x1 - x0), abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    t = np.arange(max(dx, dy) + 1, dtype=np.int64)
+    if dx >= dy:
+        xs = x0 + sx * t
+        ys = y0 + sy * ((2 * t * dy + dx - 1) // (2 * dx)) if dx else np.full_like(t, y0)
+    else:
+        xs = x0 + sx * ((2 * t * dx + dy - 1) // (2 * dy))
+        ys = y0 + sy * t
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def corner_mask_np(occ: np.ndarray, state: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """
+    mu(s) >= 1 for the cells (xs, ys), with mu's neighbor gathers done as array indexing.
+    """
+    h, w = occ.shape
+
+    def look(dx: int, dy: int) -> Tuple[np.ndarray, np.ndarray]:
+        # (uncovered free, blocked) of the neighbor at (dx, dy); outside the map is blocked
+        nx, ny = xs + dx, ys + dy
+        inside = (nx >= 0) & (nx < w) & (ny >= 0) & (ny < h)
+        nx, ny = np.clip(nx, 0, w - 1), np.clip(ny, 0, h - 1)
+        o, st = occ[ny, nx], state[ny, nx]
+        return inside & (o == 0) & (st == _UNKNOWN), ~inside | (o != 0) | (st == _COVERED) | (st == _OBSTACLE)
+
+    f1, _ = look(1, 0)
+    f5, _ = look(-1, 0)
+    f7, _ = look(0, 1)
+    _, b2 = look(1, -1)
+    _, b4 = look(-1, -1)
+    _, b6 = look(-1, 1)
+    _, b8 = look(1, 1)
+    return (f1 & (b8 | b2)) | (f5 & (b6 | b4)) | (f7 & (b6 | b8))
+
+
+@dataclass(frozen=True)
+class _NumbaKernels:
+    bresenham_line: Callable[[Coord, Coord], List[Coord]]
+    corner_mask: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+    grid_astar: Callable[[np.ndarray, Coord, Coord], Optional[AStarResult]]
+
+
+@lru_cache(maxsize=1)
+def _numba_kernels() -> _NumbaKernels:
+    # compiled on first use, so importing ba_star never loads numba
+    import heapq
+    import math
+    from numba import njit
+
+    @njit(cache=True)
+    def _line(x0, y0, x1, y1):
+        dx, dy = abs(x1 - x0), abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        out = np.empty((max(dx, dy) + 1, 2), dtype=np.int64)
+        err = dx - dy
+        x, y = x0, y0
+        k = 0
+        while True:
+            out[k, 0] = x
+            out[k, 1] = y
+            k += 1
+            if x == x1 and y == y1:
+                break
+            e2 = 2 * err
+            if e2 > -dy:
+                err -= dy
+                x += sx
+            if e2 < dx:
+                err += dx
+                y += sy
+        return out
+
+    @njit(cache=True)
+    def _free(occ, state, x, y):
+        h, w = occ.shape
+        return 0 <= x < w and 0 <= y < h and occ[y, x] == 0 and state[y, x] == _UNKNOWN
+
+    @njit(cache=True)
+    def _blocked(occ, state, x, y):
+        h, w = occ.shape
+        if not (0 <= x < w and 0 <= y < h):
+            return True
+        return occ[y, x] != 0 or state[y, x] == _COVERED or state[y, x] == _OBSTACLE
+
+    @njit(cache=True)
+    def _corner_mask(occ, state, xs, ys):
+        out = np.zeros(xs.shape[0], dtype=np.bool_)
+        for i in range(xs.shape[0]):
+            x, y = xs[i], ys[i]
+            b2 = _blocked(occ, state, x + 1, y - 1)
+            b4 = _blocked(occ, state, x - 1, y - 1)
+            b6 = _blocked(occ, state, x - 1, y + 1)
+            b8 = _blocked(occ, state, x + 1, y + 1)
+            out[i] = (
+                (_free(occ, state, x + 1, y) and (b8 or b2))
+                or (_free(occ, state, x - 1, y) and (b6 or b4))
+                or (_free(occ, state, x, y + 1) and (b6 or b8))
+            )
+        return out
+
+    @njit(cache=True)
+    def _astar(passable, sx, sy, gx, gy):
+        # astar_steps with euclidean_heuristic over 4-neighbors in N, S, E, W order;
+        # sqrt of an exact integer square sum equals math.hypot on integer coordinates
+        h, w = passable.shape
+        g = np.full(h * w, np.inf)
+        came = np.full(h * w, -1, dtype=np.int64)
+        closed = np.zeros(h * w, dtype=np.bool_)
+        offs = ((0, -1), (0, 1), (1, 0), (-1, 0))
+        start, goal = sy * w + sx, gy * w + gx
+        g[start] = 0.0
+        heap = [(math.sqrt(float((gx - sx) ** 2 + (gy - sy) ** 2)), 0, start)]
+        counter = 0
+        expanded = 0
+        while len(heap) > 0:
+            _, _, cur = heapq.heappop(heap)
+            if closed[cur]:
+                continue
+            closed[cur] = True
+            expanded += 1
+            if cur == goal:
+                n = 1
+                c = cur
+                while came[c] != -1:
+                    c = came[c]
+                    n += 1
+                path = np.empty((n, 2), dtype=np.int64)
+                c = cur
+                for k in range(n - 1, -1, -1):
+                    path[k, 0] = c % w
+                    path[k, 1] = c // w
+                    c = came[c]
+                return path, g[cur], expanded
+            cy, cx = cur // w, cur % w
+            for dx, dy in offs:
+                nx, ny = cx + dx, cy + dy
+                if nx < 0 or nx >= w or ny < 0 or ny >= h or not passable[ny, nx]:
+                    continue
+                nb = ny * w + nx
+                t = g[cur] + 1.0
+                if t < g[nb]:
+                    g[nb] = t
+                    came[nb] = cur
+                    counter += 1
+                    ex, ey = gx - nx, gy - ny
+                    heapq.heappush(heap, (t + math.sqrt(float(ex * ex + ey * ey)), counter, nb))
+        return np.empty((0, 2), dtype=np.int64), -1.0, expanded
+
+    def line(a: Coord, b: Coord) -> List[Coord]:
+        return list(map(tuple, _line(a[0], a[1], b[0], b[1]).tolist()))
+
+    def grid_astar(passable: np.ndarray, start: Coord, goal: Coord) -> Optional[AStarResult]:
+        if start == goal:
+            return AStarResult(path=[start], cost=0.0, expanded=0)
+        path, cost, expanded = _astar(passable, start[0], start[1], goal[0], goal[1])
+        if len(path) == 0:
+            return None
+        return AStarResult(path=list(map(tuple, path.tolist())), cost=float(cost), expanded=int(expanded))
+
+    return _NumbaKernels(line, _corner_mask, grid_astar)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from .ba_star import BAStarPlanner, BAStarConfig, RunResult, STATE_UNKNOWN, STATE_COVERED, STATE_OBSTACLE
+from .grid_map import Coord
+from .scenarios import Scenario
+
+
+# padded occupancy value for cells outside the map: never free, never sensed
+_OUTSIDE = 2
+
+# BM priority N, S, E, W (same order as GridMap.neighbors4)
+_BM_DX = np.array([0, 0, 1, -1])
+_BM_DY = np.array([-1, 1, 0, 0])
+
+_SENSE_OFFSETS = {
+    "N4": [(0, 0), (0, -1), (0, 1), (1, 0), (-1, 0)],
+    "N8": [(0, 0), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1)],
+    "NONE": [],
+}
+
+
+class BatchSimulator:
+    """
+    Lockstep BA* over N independent environments of the same size.
+
+    Occupancy, discovered states, current cells and trajectories are stacked NumPy arrays,
+    and the BM phase advances every environment at once. The environments that reach a
+    critical point in the same step get L and their start point computed together on the
+    arrays (EUCLIDEAN, or A_STAR with the UNIT cost model), are synced into their own
+    BAStarPlanner, which follows the backtracking path, and the result is written back.
+    Runs are identical to BAStarPlanner.run() per environment.
+
+    Supports FULL observability with "N4", "N8" or "NONE" sensing and the "GRID" map backend.
+    """
+    def __init__(self, scenarios: Sequence[Scenario], cfg: Optional[BAStarConfig] = None):
+        if not scenarios:
+            raise ValueError("need at least one scenario")
+        self.cfg = cfg or BAStarConfig()
+        mode = self.cfg.sense_mode.upper()
+        if mode not in _SENSE_OFFSETS or self.cfg.observability.upper() != "FULL" or self.cfg.map_backend.upper() != "GRID":
+            raise ValueError("BatchSimulator supports FULL observability with N4/N8/NONE sensing on the GRID backend")
+
+        self.planners: List[BAStarPlanner] = [
+            BAStarPlanner(sc.grid, sc.start, sc.start_theta, cfg=self.cfg) for sc in scenarios
+        ]
+        shapes = {p.grid.occ.shape for p in self.planners}
+        if len(shapes) != 1:
+            raise ValueError("all scenarios must share the same grid shape")
+        h, w = shapes.pop()
+        n = len(self.planners)
+
+        # one-cell border so neighbor lookups never need bounds checks
+        self.occ = np.full((n, h + 2, w + 2), _OUTSIDE, dtype=np.uint8)
+        self.state = np.zeros((n, h + 2, w + 2), dtype=np.uint8)
+        for e, p in enumerate(self.planners):
+            self.occ[e, 1:-1, 1:-1] = p.grid.occ
+            for (x, y), st in p.hatM.items():
+                self.state[e, y + 1, x + 1] = st
+
+        self.cells = np.array([p.cell for p in self.planners], dtype=np.int64)  # (N, 2), unpadded (x, y)
+        self.steps = np.array([p.steps for p in self.planners], dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+        # bounding box (x0, y0, x1, y1) of each environment's covered cells, inclusive, unpadded
+        self.bbox = np.concatenate([self.cells, self.cells], axis=1)
+
+        # trajectory buffer, grown by doubling; synced[e] = prefix already in planners[e].trajectory
+        self.traj = np.zeros((n, 1024, 2), dtype=np.int32)
+        self.traj[:, 0] = self.cells
+        self.traj_len = np.ones(n, dtype=np.int64)
+        self.synced = np.ones(n, dtype=np.int64)
+
+        # obstacles sensed on the arrays and not yet synced to their planner: (env, x, y) rows
+        self._found: List[np.ndarray] = []
+
+        offs = _SENSE_OFFSETS[mode]
+        self._sense_dx = np.array([o[0] for o in offs], dtype=np.int64)
+        self._sense_dy = np.array([o[1] for o in offs], dtype=np.int64)
+
+    def _sense(self, env: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> None:
+        # mark ground-truth obstacles around (xs, ys) for the given environments
+        if len(self._sense_dx) == 0 or len(env) == 0:
+            return
+        sx = xs[:, None] + self._sense_dx + 1
+        sy = ys[:, None] + self._sense_dy + 1
+        e = np.broadcast_to(env[:, None], sx.shape)
+        hit = (self.occ[e, sy, sx] == 1) & (self.state[e, sy, sx] != STATE_OBSTACLE)
+        if hit.any():
+            e, sx, sy = e[hit], sx[hit], sy[hit]
+            self.state[e, sy, sx] = STATE_OBSTACLE
+            self._found.append(np.stack([e, sx - 1, sy - 1], axis=1))
+
+    def _take_found(self, envs: np.ndarray) -> Dict[int, np.ndarray]:
+        # unsynced obstacles of envs as {env: (m, 2) array of (x, y)}; the others stay buffered
+        if not self._found:
+            return {}
+        found = np.concatenate(self._found)
+        mine = np.isin(found[:, 0], envs)
+        rest = found[~mine]
+        self._found = [rest] if len(rest) else []
+        found = found[mine]
+        found = found[np.argsort(found[:, 0], kind="stable")]
+        keys, first = np.unique(found[:, 0], return_index=True)
+        return dict(zip(keys.tolist(), np.split(found[:, 1:], first[1:])))
+
+    def _reserve(self, need: int) -> None:
+        if need > self.traj.shape[1]:
+            grown = np.zeros((self.traj.shape[0], max(need, 2 * self.traj.shape[1]), 2), dtype=np.int32)
+            grown[:, :self.traj.shape[1]] = self.traj
+            self.traj = grown
+
+    def _append(self, env: np.ndarray, cells: np.ndarray) -> None:
+        # one cell per environment
+        self._reserve(int(self.traj_len[env].max()) + 1)
+        self.traj[env, self.traj_len[env]] = cells
+        self.traj_len[env] += 1
+
+    def _bm_step(self) -> np.ndarray:
+        """
+        Advance every active environment by one BM move.
+        Returns the active environments that could not move (critical or out of steps).
+        """
+        env = np.nonzero(~self.done)[0]
+        if len(env) == 0:
+            return env
+        nx = self.cells[env, 0][:, None] + _BM_DX + 1
+        ny = self.cells[env, 1][:, None] + _BM_DY + 1
+        e = env[:, None]
+        ok = (self.occ[e, ny, nx] == 0) & (self.state[e, ny, nx] == STATE_UNKNOWN)
+        can = ok.any(axis=1) & (self.steps[env] < self.cfg.max_steps)
+
+        mv = env[can]
+        if len(mv):
+            k = ok[can].argmax(axis=1)
+            x = nx[can, k] - 1
+            y = ny[can, k] - 1
+            self.cells[mv, 0] = x
+            self.cells[mv, 1] = y
+            self.steps[mv] += 1
+            self._append(mv, self.cells[mv])
+            self._sense(mv, x, y)
+            self.state[mv, y + 1, x + 1] = STATE_COVERED
+            self.bbox[mv, 0] = np.minimum(self.bbox[mv, 0], x)
+            self.bbox[mv, 1] = np.minimum(self.bbox[mv, 1], y)
+            self.bbox[mv, 2] = np.maximum(self.bbox[mv, 2], x)
+            self.bbox[mv, 3] = np.maximum(self.bbox[mv, 3], y)
+        return env[~can]
+
+    def _sync_to_planner(self, e: int, obs_xy: Optional[np.ndarray]) -> BAStarPlanner:
+        # obs_xy: obstacles sensed on the arrays since the last sync of e
+        p = self.planners[e]
+        # BM moves always enter uncovered cells, so they are exactly the newly covered cells, in order
+        new = list(map(tuple, self.traj[e, self.synced[e]:self.traj_len[e]].tolist()))
+        obs = list(map(tuple, obs_xy.tolist())) if obs_xy is not None else []
+        p.absorb_bm_moves(new, obs)
+        self.synced[e] = self.traj_len[e]
+        return p
+
+    def _sync_all(self, envs: np.ndarray) -> None:
+        found = self._take_found(envs)
+        for e in envs.tolist():
+            self._sync_to_planner(e, found.get(e))
+
+    def _candidates(self, envs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        L of several environments at once, with mu evaluated on the arrays inside the union
+        of their covered bounding boxes. Returns (mask, origin): mask[i, y - oy, x - ox] is
+        True where (x, y) is a candidate of envs[i], with origin = (ox, oy).
+        """
+        x0, y0 = self.bbox[envs, 0].min(), self.bbox[envs, 1].min()
+        x1, y1 = self.bbox[envs, 2].max(), self.bbox[envs, 3].max()
+        h, w = y1 - y0 + 1, x1 - x0 + 1
+        # the window plus its one-cell ring, in padded coordinates
+        occ = self.occ[envs, y0:y1 + 3, x0:x1 + 3]
+        st = self.state[envs, y0:y1 + 3, x0:x1 + 3]
+        # with FULL observability a cell is blocked exactly when it is not uncovered free
+        free = (occ == 0) & (st == STATE_UNKNOWN)
+        blocked = ~free
+
+        def at(dx: int, dy: int, a: np.ndarray) -> np.ndarray:
+            return a[:, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+
+        s1, s5, s7 = at(1, 0, free), at(-1, 0, free), at(0, 1, free)
+        b2, b4, b6, b8 = at(1, -1, blocked), at(-1, -1, blocked), at(-1, 1, blocked), at(1, 1, blocked)
+        corner = (s1 & (b8 | b2)) | (s5 & (b6 | b4)) | (s7 & (b6 | b8))
+        return corner & (at(0, 0, st) == STATE_COVERED), np.array([x0, y0])
+
+    def _nearest_by_path(self, envs: np.ndarray, mask: np.ndarray, origin: np.ndarray) -> List[List[Coord]]:
+        """
+        For each of envs, the candidates at the smallest 4-connected path length over covered
+        cells from its current cell (the UNIT A* cost), found by one breadth-first search
+        over all of them; [] where no candidate is reachable.
+        """
+        k, h, w = mask.shape
+        x0, y0 = origin.tolist()
+        passable = self.state[envs, y0 + 1:y0 + 1 + h, x0 + 1:x0 + 1 + w] == STATE_COVERED
+        front = np.zeros_like(mask)
+        front[np.arange(k), self.cells[envs, 1] - y0, self.cells[envs, 0] - x0] = True
+        seen = front.copy()
+        out: List[List[Coord]] = [[] for _ in range(k)]
+        active = np.ones(k, dtype=bool)
+        while active.any():
+            hit = front & mask
+            reached = hit.any(axis=(1, 2))
+            for i in np.nonzero(reached)[0].tolist():
+                ys, xs = np.nonzero(hit[i])
+                out[i] = list(zip((xs + x0).tolist(), (ys + y0).tolist()))
+            active &= ~reached
+            nxt = np.zeros_like(front)
+            nxt[:, 1:] |= front[:, :-1]
+            nxt[:, :-1] |= front[:, 1:]
+            nxt[:, :, 1:] |= front[:, :, :-1]
+            nxt[:, :, :-1] |= front[:, :, 1:]
+            nxt &= passable & ~seen
+            nxt[~active] = False
+            active &= nxt.any(axis=(1, 2))
+            seen |= nxt
+            front = nxt
+        return out
+
+    def _backtrack(self, envs: np.ndarray) -> None:
+        """
+        Backtracking phase of every environment in envs.
+        """
+        self._sync_all(envs)
+        mask, origin = self._candidates(envs)
+        prefer = self.cfg.prefer_cost.upper()
+        by_path = None
+        if prefer != "EUCLIDEAN" and self.cfg.cost_model.upper() == "UNIT":
+            by_path = self._nearest_by_path(envs, mask, origin)
+        for i, e in enumerate(envs.tolist()):
+            p = self.planners[e]
+            ys, xs = np.nonzero(mask[i])
+            xs, ys = xs + origin[0], ys + origin[1]
+            L = list(zip(xs.tolist(), ys.tolist()))
+            tied: Optional[List[Coord]] = None
+            if prefer == "EUCLIDEAN" and L:
+                d2 = (xs - p.cell[0]) ** 2 + (ys - p.cell[1]) ** 2
+                near = np.nonzero(d2 == d2.min())[0]
+                tied = [L[j] for j in near.tolist()]
+            elif by_path is not None:
+                tied = by_path[i]
+                if not tied:
+                    L = []  # nothing reachable: the planner stops here
+            s_sp = None
+            if tied:
+                # select_start_point keeps the first of equal costs in covered-set order
+                if len(tied) == 1:
+                    s_sp = tied[0]
+                else:
+                    tied_set = set(tied)
+                    s_sp = next(c for c in p.covered if c in tied_set)
+            elif tied is None:
+                # other cost models: the planner selects, over L in covered-set order
+                cand = set(L)
+                L = [c for c in p.covered if c in cand]
+            ok = p._backtrack(L, s_sp)
+            self._sync_from_planner(e)
+            if not ok or p.steps >= self.cfg.max_steps:
+                self.done[e] = True
+
+    def _sync_from_planner(self, e: int) -> None:
+        p = self.planners[e]
+        new = p.trajectory[int(self.synced[e]):]
+        if new:
+            arr = np.array(new, dtype=np.int64)
+            n0 = int(self.traj_len[e])
+            self._reserve(n0 + len(arr))
+            self.traj[e, n0:n0 + len(arr)] = arr
+            self.traj_len[e] += len(arr)
+            # the planner sensed along its path itself
+            found = len(self._found)
+            self._sense(np.full(len(arr), e), arr[:, 0], arr[:, 1])
+            del self._found[found:]
+        self.cells[e] = p.cell
+        self.steps[e] = p.steps
+        self.synced[e] = self.traj_len[e]
+
+    def run(self) -> List[RunResult]:
+        while not self.done.all():
+            critical = self._bm_step()
+            if len(critical):
+                self._backtrack(critical)
+        self._sync_all(np.arange(len(self.planners)))
+        return [p.result() for p in self.planners]
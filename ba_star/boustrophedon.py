@@ -0,0 +1,195 @@
+"""
+Offline baseline: boustrophedon cell decomposition (BCD) of a fully known map.
+
+Free space is split into cells by a left-to-right sweep over columns: a cell grows while each
+of its column segments overlaps exactly one segment of the next column and vice versa, and a
+split or merge closes it. Cells are toured greedily (the next cell is the one with a corner
+nearest the robot along free cells), swept column by column, and joined by shortest transit
+paths. Runs come back as RunResult, with one BacktrackEvent per transit.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .grid_map import GridMap, Coord
+from .ba_star import BacktrackEvent, RunResult
+
+Segment = Tuple[int, int]  # free rows y0..y1 (inclusive) of one column
+
+
+@dataclass
+class BCDCell:
+    id: int
+    x0: int
+    segments: List[Segment] = field(default_factory=list)  # one per column, from x0
+
+    @property
+    def x1(self) -> int:
+        return self.x0 + len(self.segments) - 1
+
+    def corners(self) -> List[Tuple[Coord, int, int]]:
+        """
+        Entry points as (cell, sweep direction in x, first direction in y).
+        """
+        (a0, b0), (a1, b1) = self.segments[0], self.segments[-1]
+        return [
+            ((self.x0, a0), 1, 1), ((self.x0, b0), 1, -1),
+            ((self.x1, a1), -1, 1), ((self.x1, b1), -1, -1),
+        ]
+
+
+def column_segments(column: np.ndarray) -> List[Segment]:
+    free = np.concatenate(([False], column == 0, [False]))
+    edges = np.flatnonzero(free[1:] != free[:-1])
+    return [(int(a), int(b) - 1) for a, b in zip(edges[::2], edges[1::2])]
+
+
+def _overlaps(s: Segment, t: Segment) -> bool:
+    return s[0] <= t[1] and t[0] <= s[1]
+
+
+def decompose(occ: np.ndarray) -> List[BCDCell]:
+    """
+    Boustrophedon cells of the free space of occ (4-connected, sweep along x).
+    """
+    cells: List[BCDCell] = []
+    prev: List[Segment] = []
+    prev_cell: List[int] = []
+    for x in range(occ.shape[1]):
+        segs = column_segments(occ[:, x])
+        cur_cell: List[int] = []
+        for s in segs:
+            left = [i for i, p in enumerate(prev) if _overlaps(p, s)]
+            if len(left) == 1 and sum(_overlaps(prev[left[0]], t) for t in segs) == 1:
+                cid = prev_cell[left[0]]
+                cells[cid].segments.append(s)
+            else:
+                cid = len(cells)
+                cells.append(BCDCell(cid, x, [s]))
+            cur_cell.append(cid)
+        prev, prev_cell = segs, cur_cell
+    return cells
+
+
+def _sweep(cell: BCDCell, entry: Coord, dx: int, dy: int) -> List[Coord]:
+    """
+    Cells visited sweeping `cell` column by column from entry, alternating up and down.
+    """
+    cols = range(len(cell.segments)) if dx > 0 else range(len(cell.segments) - 1, -1, -1)
+    path: List[Coord] = [entry]
+    x, y = entry
+    for k in cols:
+        cx = cell.x0 + k
+        a, b = cell.segments[k]
+        if cx != x:
+            # step over at the row of the shared span nearest the current one
+            pa, pb = cell.segments[k + (1 if dx < 0 else -1)]
+            y_cross = min(max(y, max(a, pa)), min(b, pb))
+            path.extend((x, yy) for yy in _span(y, y_cross))
+            x, y = cx, y_cross
+            path.append((x, y))
+        # cover the segment: to its nearer end first, then to the far end
+        top_first = (y - a) <= (b - y) if dy == 0 else dy > 0
+        ends = (a, b) if top_first else (b, a)
+        for e in ends:
+            path.extend((x, yy) for yy in _span(y, e))
+            y = e
+        dy = 0
+    return path
+
+
+def _span(y0: int, y1: int) -> range:
+    # rows strictly after y0 up to and including y1
+    step = 1 if y1 >= y0 else -1
+    return range(y0 + step, y1 + step, step)
+
+
+class BoustrophedonPlanner:
+    """
+    Offline coverage baseline with the BAStarPlanner interface: BoustrophedonPlanner(grid, start).run().
+    """
+    def __init__(self, grid: GridMap, start_cell: Coord, start_theta: float = 0.0, max_steps: int = 200000):
+        if not grid.is_free(start_cell):
+            raise ValueError("start_cell must be free in the map")
+        self.grid = grid
+        self.start = start_cell
+        self.start_theta = start_theta
+        self.max_steps = max_steps
+        self.cells = decompose(grid.occ)
+
+    def _nearest_entry(self, src: Coord, entries: Dict[Coord, List[Tuple[int, int, int]]], done: List[bool]) -> Optional[Tuple[List[Coord], int, int, int]]:
+        # BFS over free cells to the closest corner of an unvisited cell
+        parent: Dict[Coord, Optional[Coord]] = {src: None}
+        queue = deque([src])
+        while queue:
+            c = queue.popleft()
+            for cid, dx, dy in entries.get(c, ()):
+                if not done[cid]:
+                    path = [c]
+                    while parent[path[-1]] is not None:
+                        path.append(parent[path[-1]])
+                    path.reverse()
+                    return path, cid, dx, dy
+            for nb in self.grid.neighbors4(c):
+                if nb not in parent and self.grid.is_free(nb):
+                    parent[nb] = c
+                    queue.append(nb)
+        return None
+
+    def run(self) -> RunResult:
+        entries: Dict[Coord, List[Tuple[int, int, int]]] = {}
+        for cell in self.cells:
+            for corner, dx, dy in cell.corners():
+                entries.setdefault(corner, []).append((cell.id, dx, dy))
+        done = [False] * len(self.cells)
+        traj: List[Coord] = [self.start]
+        events: List[BacktrackEvent] = []
+        while len(traj) <= self.max_steps:
+            found = self._nearest_entry(traj[-1], entries, done)
+            if found is None:
+                break
+            path, cid, dx, dy = found
+            done[cid] = True
+            if len(path) > 1:
+                events.append(BacktrackEvent(
+                    s_cp=path[0], candidates=[], s_sp=path[-1], astar_path=path, smooth_path=path,
+                    traj_index=len(traj) - 1, astar_len=len(path), smooth_len=len(path),
+                ))
+                traj.extend(path[1:])
+            traj.extend(_sweep(self.cells[cid], path[-1], dx, dy)[1:])
+        traj = traj[:self.max_steps + 1]
+        return result_from_trajectory(self.grid, traj, events)
+
+
+def result_from_trajectory(grid: GridMap, traj: List[Coord], events: List[BacktrackEvent]) -> RunResult:
+    """
+    RunResult of an offline trajectory: covered = visited cells, known obstacles = the ones
+    an N8 sensor would have seen along the way, one backtrack per event.
+    """
+    occ = grid.occ
+    visited = np.zeros(occ.shape, dtype=bool)
+    xy = np.array(traj, dtype=np.int64).reshape(-1, 2)
+    visited[xy[:, 1], xy[:, 0]] = True
+    seen = np.zeros((occ.shape[0] + 2, occ.shape[1] + 2), dtype=bool)
+    for oy in (0, 1, 2):
+        for ox in (0, 1, 2):
+            seen[oy:oy + occ.shape[0], ox:ox + occ.shape[1]] |= visited
+    obs = seen[1:-1, 1:-1] & (occ != 0)
+    free_total = int(np.count_nonzero(occ == 0))
+    ys, xs = np.nonzero(visited)
+    oys, oxs = np.nonzero(obs)
+    return RunResult(
+        trajectory_cells=traj,
+        covered_cells=set(zip(xs.tolist(), ys.tolist())),
+        known_obstacles=set(zip(oxs.tolist(), oys.tolist())),
+        events=events,
+        steps=len(traj) - 1,
+        coverage_rate=float(len(xs) / free_total) if free_total else 0.0,
+        path_length=float(max(0, len(traj) - 1) * grid.spec.tile_size),
+        num_backtracks=len(events),
+    )
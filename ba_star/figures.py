@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .grid_map import GridMap
+
+
+MANIFEST_NAME = ".figure_hashes.json"
+
+
+@dataclass
+class FigureJob:
+    """
+    One figure to render: fn(**kwargs) must write out_path.
+    fn has to be a module-level function so it can be sent to a worker process.
+    """
+    out_path: str
+    fn: Callable[..., Any]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+def _feed(h: "hashlib._Hash", obj: Any) -> None:
+    if isinstance(obj, np.ndarray):
+        h.update(f"nd{obj.dtype.str}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, GridMap):
+        h.update(f"grid{obj.spec.tile_size}".encode())
+        _feed(h, obj.occ)
+    elif isinstance(obj, (set, frozenset)):
+        h.update(b"set")
+        _feed(h, sorted(obj))
+    elif isinstance(obj, (list, tuple)):
+        if obj and all(isinstance(c, tuple) and len(c) == 2 for c in obj):
+            # cell lists: hash as one int array instead of element by element
+            _feed(h, np.asarray(obj, dtype=np.int64))
+            return
+        h.update(f"seq{len(obj)}".encode())
+        for v in obj:
+            _feed(h, v)
+    elif isinstance(obj, dict):
+        h.update(f"dict{len(obj)}".encode())
+        for k in sorted(obj, key=repr):
+            h.update(repr(k).encode())
+            _feed(h, obj[k])
+    elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        h.update(type(obj).__name__.encode())
+        _feed(h, {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)})
+    else:
+        h.update(repr(obj).encode())
+
+
+def job_hash(job: FigureJob) -> str:
+    """
+    Content hash of everything that determines the figure: the plotting function,
+    the source of the module defining it and of viz.py, and the keyword arguments.
+    """
+    h = hashlib.sha256()
+    h.update(f"{job.fn.__module__}.{job.fn.__qualname__}".encode())
+    src = getattr(sys.modules.get(job.fn.__module__), "__file__", None)
+    for path in (src, Path(__file__).with_name("viz.py")):
+        if path and os.path.exists(path):
+            h.update(Path(path).read_bytes())
+    _feed(h, {k: v for k, v in job.kwargs.items()})
+    return h.hexdigest()
+
+
+def _run_job(job: FigureJob) -> str:
+    import matplotlib
+    matplotlib.use("Agg")
+    job.fn(**job.kwargs)
+    return job.out_path
+
+
+def run_figure_jobs(jobs: Sequence[FigureJob], manifest_dir: str, workers: Optional[int] = None, force: bool = False) -> List[str]:
+    """
+    Render the jobs whose output is missing or whose input hash changed, spread over a
+    process pool (workers=1 renders inline). Hashes are kept in a manifest file in
+    manifest_dir. Returns the paths that were rendered.
+    """
+    manifest_path = Path(manifest_dir) / MANIFEST_NAME
+    try:
+        manifest: Dict[str, str] = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    todo: List[FigureJob] = []
+    hashes: Dict[str, str] = {}
+    for job in jobs:
+        key = job_hash(job)
+        hashes[job.out_path] = key
+        name = Path(job.out_path).name
+        if force or manifest.get(name) != key or not Path(job.out_path).exists():
+            todo.append(job)
+
+    if workers is None:
+        workers = min(len(todo), os.cpu_count() or 1)
+    if workers <= 1 or len(todo) <= 1:
+        done = [_run_job(job) for job in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            done = list(ex.map(_run_job, todo))
+
+    for path in done:
+        manifest[Path(path).name] = hashes[path]
+    Path(manifest_dir).mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return done
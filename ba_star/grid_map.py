@@ -1,12 +1,212 @@
 
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 import numpy as np
 
 Coord = Tuple[int, int]  # (x, y)
 
+# neighbor offsets (dx, dy) in the orders used throughout the planner
+N4_OFFSETS = ((0, -1), (0, 1), (1, 0), (-1, 0))  # N, S, E, W
+N8_OFFSETS = ((1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1))  # s1..s8
+
+
+def bresenham_line(a: Coord, b: Coord) -> List[Coord]:
+    x0, y0 = a
+    x1, y1 = b
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx - dy
+    x, y = x0, y0
+    pts: List[Coord] = []
+    while True:
+        pts.append((x, y))
+        if x == x1 and y == y1:
+            break
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x += sx
+        if e2 < dx:
+            err += dx
+            y += sy
+    return pts
+
+
+def bresenham_point(a: Coord, b: Coord, t: int) -> Coord:
+    """
+    The t-th cell of bresenham_line(a, b) in closed form, for 0 <= t <= max(|dx|, |dy|).
+    """
+    x0, y0 = a
+    x1, y1 = b
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    if dx >= dy:
+        return (x0 + sx * t, y0 + sy * ((2 * t * dy + dx - 1) // (2 * dx)) if dx else y0)
+    return (x0 + sx * ((2 * t * dx + dy - 1) // (2 * dy)), y0 + sy * t)
+
+
+def line_blocks(a: Coord, b: Coord, shift: int) -> Set[Tuple[int, int]]:
+    """
+    Blocks (x >> shift, y >> shift) covering every cell of bresenham_line(a, b), possibly
+    with a few extra ones. Samples one cell per block width instead of walking the line:
+    the cells between two samples lie in the blocks spanned by the samples on each axis.
+    """
+    n = max(abs(b[0] - a[0]), abs(b[1] - a[1]))
+    step = 1 << shift
+    blocks: Set[Tuple[int, int]] = set()
+    px, py = a[0] >> shift, a[1] >> shift
+    blocks.add((px, py))
+    for t in list(range(step, n, step)) + [n]:
+        x, y = bresenham_point(a, b, t)
+        qx, qy = x >> shift, y >> shift
+        blocks.update(((px, py), (px, qy), (qx, py), (qx, qy)))
+        px, py = qx, qy
+    return blocks
+
+
+def _edt_rows_sq(f: np.ndarray) -> np.ndarray:
+    """
+    1D squared distance transform of every row of f at once:
+    out[r, q] = min_p f[r, p] + (q - p)^2 (lower envelope of parabolas, Felzenszwalb-Huttenlocher),
+    with the envelope stacks of all rows advanced together.
+    """
+    rows, n = f.shape
+    r = np.arange(rows)
+    v = np.zeros((rows, n), dtype=np.int64)      # parabola apexes in the envelope
+    z = np.empty((rows, n + 1), dtype=np.float64)  # envelope breakpoints
+    z[:, 0] = -np.inf
+    z[:, 1] = np.inf
+    k = np.zeros(rows, dtype=np.int64)
+    for q in range(1, n):
+        fq = f[:, q] + q * q
+        while True:
+            vk = v[r, k]
+            s = (fq - (f[r, vk] + vk * vk)) / (2.0 * (q - vk))
+            pop = s <= z[r, k]
+            if not pop.any():
+                break
+            k -= pop
+        k += 1
+        v[r, k] = q
+        z[r, k] = s
+        z[r, k + 1] = np.inf
+
+    out = np.empty_like(f)
+    k[:] = 0
+    for q in range(n):
+        while True:
+            adv = z[r, k + 1] < q
+            if not adv.any():
+                break
+            k += adv
+        vk = v[r, k]
+        out[:, q] = (q - vk) ** 2 + f[r, vk]
+    return out
+
+
+def distance_transform(occ: np.ndarray) -> np.ndarray:
+    """
+    Exact Euclidean distance (in cells) from every cell center to the nearest obstacle
+    cell center; 0 on obstacles, inf everywhere if there are none. Cells outside the
+    map do not count as obstacles.
+    """
+    occ = np.asarray(occ) > 0
+    h, w = occ.shape
+    if not occ.any():
+        return np.full((h, w), np.inf)
+    # vertical pass: distance to the nearest obstacle in the same column, from two scans
+    ys = np.arange(h)[:, None]
+    big = h + w
+    above = np.maximum.accumulate(np.where(occ, ys, -big), axis=0)
+    below = np.minimum.accumulate(np.where(occ, ys, 2 * big)[::-1], axis=0)[::-1]
+    g = np.minimum(ys - above, below - ys).astype(np.float64)
+    # columns without obstacles: any finite value beyond the map diagonal works
+    f = np.minimum(g, big) ** 2
+    # horizontal pass on the squared column distances
+    return np.sqrt(_edt_rows_sq(f))
+
+
+def dilate_square(occ: np.ndarray, radius_cells: int) -> np.ndarray:
+    """
+    Max filter with a (2r+1)x(2r+1) square kernel, clipped at the borders.
+    Separable: a sliding max along x followed by one along y.
+    """
+    if radius_cells <= 0:
+        return occ.copy()
+    k = 2 * radius_cells + 1
+    p = np.pad(occ, radius_cells)
+    rows = np.lib.stride_tricks.sliding_window_view(p, k, axis=1).max(axis=-1)
+    return np.lib.stride_tricks.sliding_window_view(rows, k, axis=0).max(axis=-1)
+
+
+def block_reduce_occupancy(
+    pixels,
+    factor: int,
+    obstacle_fraction: float = 0.0,
+    is_obstacle: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    strip_tiles: int = 256,
+) -> np.ndarray:
+    """
+    Reduce a pixel occupancy raster by factor x factor blocks: a tile is an obstacle if more
+    than obstacle_fraction of its pixels are (0.0: any pixel). Partial tiles at the right and
+    bottom edges use the pixels they have.
+
+    pixels is any 2D array-like that supports row slicing (array, np.memmap, ...); it is read
+    strip_tiles tile rows at a time, so only one strip of pixels is held in memory.
+    is_obstacle maps a strip of raw pixels to a boolean mask (default: pixels > 0).
+    """
+    if factor < 1:
+        raise ValueError("factor must be >= 1")
+    h, w = pixels.shape[:2]
+    th, tw = -(-h // factor), -(-w // factor)
+    out = np.empty((th, tw), dtype=np.uint8)
+    # pixels per tile column / row, smaller for the partial edge tiles
+    col_px = np.minimum(factor, w - factor * np.arange(tw))
+    for t0 in range(0, th, strip_tiles):
+        t1 = min(th, t0 + strip_tiles)
+        raw = np.asarray(pixels[t0 * factor:min(h, t1 * factor)])
+        occ = is_obstacle(raw) if is_obstacle is not None else raw > 0
+        pad_h, pad_w = (t1 - t0) * factor - occ.shape[0], tw * factor - occ.shape[1]
+        if pad_h or pad_w:
+            occ = np.pad(occ, ((0, pad_h), (0, pad_w)))
+        blocks = occ.reshape(t1 - t0, factor, tw, factor)
+        if obstacle_fraction <= 0.0:
+            out[t0:t1] = blocks.any(axis=(1, 3))
+        else:
+            counts = blocks.sum(axis=(1, 3), dtype=np.int64)
+            row_px = np.minimum(factor, h - factor * np.arange(t0, t1))
+            out[t0:t1] = counts > obstacle_fraction * (row_px[:, None] * col_px[None, :])
+    return out
+
+
+def _neighbor_index(h: int, w: int, offsets: Tuple[Coord, ...]) -> np.ndarray:
+    ys, xs = np.divmod(np.arange(h * w, dtype=np.int32), np.int32(w))
+    table = np.full((h * w, len(offsets)), -1, dtype=np.int32)
+    for k, (dx, dy) in enumerate(offsets):
+        nx, ny = xs + dx, ys + dy
+        ok = (nx >= 0) & (nx < w) & (ny >= 0) & (ny < h)
+        table[ok, k] = ny[ok] * w + nx[ok]
+    table.setflags(write=False)
+    return table
+
+
+class _ImageRows:
+    # row-sliceable view of a PIL image that only converts the requested rows
+    def __init__(self, img):
+        self.img = img
+        self.shape = (img.height, img.width)
+
+    def __getitem__(self, rows: slice) -> np.ndarray:
+        y0, y1, _ = rows.indices(self.img.height)
+        return np.asarray(self.img.crop((0, y0, self.img.width, y1)))
+
 
 @dataclass(frozen=True)
 class GridSpec:
@@ -31,6 +231,9 @@ class GridMap:
         self.occ = (occupancy > 0).astype(np.uint8)
         self.h, self.w = self.occ.shape
         self.spec = GridSpec(width=self.w, height=self.h, tile_size=float(tile_size))
+        # flat neighbor tables by offsets, built on first use (see neighbor_index)
+        self._nbr: Dict[Tuple[Coord, ...], np.ndarray] = {}
+        self._clearance: Optional[np.ndarray] = None
 
     @staticmethod
     def from_binary_image(path: str, obstacle_is_black: bool = True, threshold: int = 128, tile_size: float = 1.0) -> "GridMap":
@@ -43,6 +246,36 @@ class GridMap:
             occ = (arr >= threshold).astype(np.uint8)
         return GridMap(occ, tile_size=tile_size)
 
+    @staticmethod
+    def from_image_tiles(
+        path: str,
+        pixel_size: float,
+        tile_size: float,
+        obstacle_is_black: bool = True,
+        threshold: int = 128,
+        obstacle_fraction: float = 0.0,
+    ) -> "GridMap":
+        """
+        Load a floor plan with pixel_size meters per pixel as a grid of tile_size tiles
+        (tile_size must be a whole number of pixels); see block_reduce_occupancy for how
+        obstacle_fraction decides a tile. A .npy file of grayscale pixels is memory-mapped
+        instead of decoded, which keeps very large maps out of memory.
+        """
+        factor = int(round(tile_size / pixel_size))
+        if factor < 1 or abs(factor * pixel_size - tile_size) > 1e-6 * tile_size:
+            raise ValueError("tile_size must be a positive whole multiple of pixel_size")
+
+        def is_obstacle(a: np.ndarray) -> np.ndarray:
+            return a < threshold if obstacle_is_black else a >= threshold
+
+        if str(path).endswith(".npy"):
+            pixels = np.load(path, mmap_mode="r")
+        else:
+            from PIL import Image
+            pixels = _ImageRows(Image.open(path).convert("L"))
+        occ = block_reduce_occupancy(pixels, factor, obstacle_fraction, is_obstacle)
+        return GridMap(occ, tile_size=factor * pixel_size)
+
     def in_bounds(self, c: Coord) -> bool:
         x, y = c
         return 0 <= x < self.w and 0 <= y < self.h
@@ -54,72 +287,143 @@ class GridMap:
     def is_free(self, c: Coord) -> bool:
         return self.in_bounds(c) and (not self.is_obstacle(c))
 
-    def neighbors4(self, c: Coord) -> List[Coord]:
+    def neighbor_index(self, offsets: Sequence[Coord]) -> np.ndarray:
+        """
+        Flat-index neighbor table: row y*w+x holds the flat indices of (x+dx, y+dy) for each
+        offset, in order, with -1 where the neighbor is out of bounds (int32, read-only).
+        Built on first use and kept on this grid.
+        """
+        key = tuple(offsets)
+        table = self._nbr.get(key)
+        if table is None:
+            table = self._nbr[key] = _neighbor_index(self.h, self.w, key)
+        return table
+
+    def precompute(self) -> None:
+        """
+        Build the lazily created N4/N8 neighbor tables and clearance field now instead of on first use.
+        """
+        self.neighbor_index(N4_OFFSETS)
+        self.neighbor_index(N8_OFFSETS)
+        self.clearance()
+
+    def neighbors4(self, c: Coord) -> Sequence[Coord]:
         """
         Order: N, S, E, W (consistent with the BA* priority rule used in the report),
         where N = (x, y-1) and S = (x, y+1).
         """
         x, y = c
+        if 0 < x < self.w - 1 and 0 < y < self.h - 1:
+            return ((x, y-1), (x, y+1), (x+1, y), (x-1, y))
         cand = [(x, y-1), (x, y+1), (x+1, y), (x-1, y)]
         return [p for p in cand if self.in_bounds(p)]
 
-    def neighbors8(self, c: Coord) -> List[Coord]:
+    def neighbors8_all(self, c: Coord) -> Sequence[Coord]:
+        """
+        All eight positions s1..s8 of c, including out-of-bounds ones.
+        """
+        x, y = c
+        return ((x+1, y), (x+1, y-1), (x, y-1), (x-1, y-1), (x-1, y), (x-1, y+1), (x, y+1), (x+1, y+1))
+
+    def neighbors8(self, c: Coord) -> Sequence[Coord]:
         """
         Order matches the report indexing:
         s1 E, s2 NE, s3 N, s4 NW, s5 W, s6 SW, s7 S, s8 SE.
         """
         x, y = c
-        cand = [
-            (x+1, y),     # s1 E
-            (x+1, y-1),   # s2 NE
-            (x,   y-1),   # s3 N
-            (x-1, y-1),   # s4 NW
-            (x-1, y),     # s5 W
-            (x-1, y+1),   # s6 SW
-            (x,   y+1),   # s7 S
-            (x+1, y+1),   # s8 SE
-        ]
-        return [p for p in cand if self.in_bounds(p)]
+        if 0 < x < self.w - 1 and 0 < y < self.h - 1:
+            return self.neighbors8_all(c)
+        return [p for p in self.neighbors8_all(c) if self.in_bounds(p)]
 
-    def inflate_obstacles(self, radius_cells: int) -> "GridMap":
-        if radius_cells <= 0:
-            return GridMap(self.occ.copy(), tile_size=self.spec.tile_size)
-
-        ys, xs = np.where(self.occ == 1)
-        out = self.occ.copy()
-        for x, y in zip(xs, ys):
-            x0 = max(0, x - radius_cells)
-            x1 = min(self.w - 1, x + radius_cells)
-            y0 = max(0, y - radius_cells)
-            y1 = min(self.h - 1, y + radius_cells)
-            out[y0:y1+1, x0:x1+1] = 1
-        return GridMap(out, tile_size=self.spec.tile_size)
+    def clearance(self) -> np.ndarray:
+        """
+        Euclidean distance from each cell to the nearest obstacle (see distance_transform),
+        computed on first use and kept until the occupancy changes.
+        """
+        if self._clearance is None:
+            self._clearance = distance_transform(self.occ)
+        return self._clearance
+
+    def occupancy_changed(self) -> None:
+        """
+        Must be called after writing to occ directly; drops the cached clearance field.
+        """
+        self._clearance = None
+
+    def inflate_obstacles(self, radius_cells: float, shape: str = "SQUARE") -> "GridMap":
+        """
+        Grow obstacles by radius_cells: "SQUARE" blocks every cell within Chebyshev distance
+        int(radius_cells), "DISK" every cell within Euclidean distance radius_cells (any
+        real radius, thresholded on the clearance field).
+        """
+        out = GridMap(_inflate(self.occ, radius_cells, shape, self._clearance), tile_size=self.spec.tile_size)
+        out._nbr = self._nbr  # same shape, same neighbor tables
+        if (int(radius_cells) if shape.upper() == "SQUARE" else radius_cells) <= 0:
+            # unchanged occupancy: the copy can reuse the clearance field
+            out._clearance = self._clearance
+        return out
+
+    def reinflate_around(self, base: "GridMap", radius_cells: float, cells: Iterable[Coord], shape: str = "SQUARE") -> Set[Coord]:
+        """
+        Keep self equal to base.inflate_obstacles(radius_cells, shape) after base changed at cells.
+        Only the (2r+1)x(2r+1) window around each changed cell is recomputed.
+        Returns the cells of self whose occupancy flipped.
+        """
+        r = max(0, math.ceil(radius_cells) if shape.upper() == "DISK" else int(radius_cells))
+        changed: Set[Coord] = set()
+        for x, y in cells:
+            # output window and the base window it depends on
+            x0, x1 = max(0, x - r), min(self.w, x + r + 1)
+            y0, y1 = max(0, y - r), min(self.h, y + r + 1)
+            bx0, bx1 = max(0, x0 - r), min(self.w, x1 + r)
+            by0, by1 = max(0, y0 - r), min(self.h, y1 + r)
+            local = _inflate(base.occ[by0:by1, bx0:bx1], radius_cells, shape)
+            new = local[y0-by0:y1-by0, x0-bx0:x1-bx0]
+            diff_ys, diff_xs = np.nonzero(new != self.occ[y0:y1, x0:x1])
+            changed.update(zip((diff_xs + x0).tolist(), (diff_ys + y0).tolist()))
+            self.occ[y0:y1, x0:x1] = new
+        if changed:
+            self.occupancy_changed()
+        return changed
 
     def bresenham_line(self, a: Coord, b: Coord) -> List[Coord]:
-        x0, y0 = a
-        x1, y1 = b
-        dx = abs(x1 - x0)
-        dy = abs(y1 - y0)
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        err = dx - dy
-        x, y = x0, y0
-        pts: List[Coord] = []
-        while True:
-            pts.append((x, y))
-            if x == x1 and y == y1:
-                break
-            e2 = 2 * err
-            if e2 > -dy:
-                err -= dy
-                x += sx
-            if e2 < dx:
-                err += dx
-                y += sy
-        return pts
+        return bresenham_line(a, b)
 
     def line_of_sight(self, a: Coord, b: Coord) -> bool:
-        for p in self.bresenham_line(a, b):
-            if not self.is_free(p):
+        """
+        True if every cell of bresenham_line(a, b) is free.
+
+        Walks the line on the clearance field: from a free cell with clearance c, the next
+        k cells are all closer than c (k * sqrt(1 + slope^2) + 1 < c) and are skipped, so
+        open space is crossed in a few steps and the first obstacle cell is still found.
+        """
+        if not (self.in_bounds(a) and self.in_bounds(b)):
+            return False
+        clear = self.clearance()
+        dx, dy = abs(b[0] - a[0]), abs(b[1] - a[1])
+        n = max(dx, dy)
+        step_len = math.hypot(n, min(dx, dy)) / n if n else 1.0
+        t = 0
+        while True:
+            x, y = bresenham_point(a, b, t)
+            c = clear[y, x]
+            if c == 0:
                 return False
-        return True
+            if t >= n:
+                return True
+            if c == np.inf:
+                return True
+            skip = int((c - 1.0) / step_len - 1e-9) if c > 1.0 else 0
+            t = min(n, t + max(0, skip) + 1)
+
+
+def _inflate(occ: np.ndarray, radius_cells: float, shape: str, clearance: Optional[np.ndarray] = None) -> np.ndarray:
+    shape = shape.upper()
+    if shape == "SQUARE":
+        return dilate_square(occ, int(radius_cells))
+    if shape == "DISK":
+        if radius_cells <= 0:
+            return occ.copy()
+        dist = clearance if clearance is not None else distance_transform(occ)
+        return (dist <= radius_cells).astype(np.uint8)
+    raise ValueError(f"unknown inflation shape: {shape}")
@@ -0,0 +1,108 @@
+"""
+Run-quality metrics, computed from the trajectory with array operations only.
+
+Moves are consecutive trajectory entries; a backtracking move may jump several cells along
+the smoothed path, so lengths are Euclidean and visits count trajectory entries.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from .grid_map import Coord, GridMap
+from .ba_star import BacktrackEvent, RunResult
+
+
+def cells_array(cells: Union[np.ndarray, Iterable[Coord]]) -> np.ndarray:
+    """
+    (n, 2) int64 array of (x, y) rows; arrays (e.g. a run log's trajectory) pass through.
+    """
+    if isinstance(cells, np.ndarray):
+        return cells.reshape(-1, 2).astype(np.int64, copy=False)
+    if not isinstance(cells, Sequence):
+        cells = list(cells)
+    flat = np.fromiter(itertools.chain.from_iterable(cells), dtype=np.int64, count=2 * len(cells))
+    return flat.reshape(-1, 2)
+
+
+def backtrack_mask(num_moves: int, events: Sequence[BacktrackEvent]) -> np.ndarray:
+    """
+    Boolean per move: True for moves made while following a backtracking path.
+    Event i covers moves traj_index .. traj_index + smooth_len - 2.
+    """
+    starts = np.array([e.traj_index for e in events], dtype=np.int64)
+    ends = starts + np.maximum(np.array([e.smooth_len for e in events], dtype=np.int64) - 1, 0)
+    delta = np.zeros(num_moves + 1, dtype=np.int64)
+    np.add.at(delta, np.clip(starts, 0, num_moves), 1)
+    np.add.at(delta, np.clip(ends, 0, num_moves), -1)
+    return np.cumsum(delta[:-1]) > 0
+
+
+def run_metrics(res: RunResult, grid: GridMap, curve_points: int = 101) -> Dict[str, Any]:
+    """
+    Metrics of a run on its planning grid (the inflated map when inflation was used):
+
+    - num_turns: moves whose direction differs from the previous move's; turn_angle_rad: their summed angle
+    - unique_cells, revisits (visits to an already visited cell), revisited_cells (cells visited
+      more than once), overlap_ratio = revisits / unique_cells
+    - bm_distance / backtrack_distance: length of boustrophedon and of backtracking moves
+      (None when events were dropped, i.e. record_events NONE, max_events or sampling)
+    - coverage_curve: [step, fraction of free cells visited by then], curve_points samples
+    """
+    traj = cells_array(res.trajectory_cells)
+    occ = grid.occ
+    h, w = occ.shape
+    tile = grid.spec.tile_size
+    n = len(traj)
+
+    dx, dy = np.diff(traj[:, 0]), np.diff(traj[:, 1])
+    move_len = np.sqrt(dx * dx + dy * dy)
+    moved = move_len > 0
+    if not moved.all():
+        dx, dy = dx[moved], dy[moved]
+    cross = dx[:-1] * dy[1:] - dy[:-1] * dx[1:]
+    dot = dx[:-1] * dx[1:] + dy[:-1] * dy[1:]
+    turned = (cross != 0) | (dot < 0)
+    turn_angle = float(np.sum(np.abs(np.arctan2(cross[turned], dot[turned]))))
+
+    lin = traj[:, 1] * w + traj[:, 0]
+    visits = np.bincount(lin, minlength=h * w)
+    unique_cells = int(np.count_nonzero(visits))
+    revisits = n - unique_cells
+
+    bm_distance: Optional[float] = None
+    backtrack_distance: Optional[float] = None
+    if len(res.events) == res.num_backtracks and all(e.traj_index >= 0 for e in res.events):
+        bt = backtrack_mask(len(move_len), res.events)
+        backtrack_distance = float(move_len[bt].sum() * tile)
+        bm_distance = float(move_len[~bt].sum() * tile)
+
+    # first visit of each cell, then the running count of free cells first visited by each step
+    first = np.full(h * w, n, dtype=np.int64)
+    np.minimum.at(first, lin, np.arange(n, dtype=np.int64))
+    free = occ.reshape(-1) == 0
+    free_total = int(np.count_nonzero(free))
+    t_first = first[free & (visits > 0)]
+    covered_by = np.cumsum(np.bincount(t_first, minlength=n))
+    steps = np.unique(np.linspace(0, max(n - 1, 0), num=max(curve_points, 2)).round().astype(np.int64))
+    if n == 0 or free_total == 0:
+        curve = []
+    else:
+        curve = [[int(s), float(c)] for s, c in zip(steps, covered_by[steps] / free_total)]
+
+    return {
+        "num_moves": int(len(dx)),
+        "num_turns": int(np.count_nonzero(turned)),
+        "turn_angle_rad": turn_angle,
+        "distance": float(move_len.sum() * tile),
+        "unique_cells": unique_cells,
+        "revisits": int(revisits),
+        "revisited_cells": int(np.count_nonzero(visits > 1)),
+        "overlap_ratio": float(revisits / unique_cells) if unique_cells else 0.0,
+        "bm_distance": bm_distance,
+        "backtrack_distance": backtrack_distance,
+        "coverage_curve": curve,
+    }
@@ -0,0 +1,254 @@
+"""
+Coarse-to-fine coverage: BA* over blocks of a map pyramid, refined into cell-level lanes per block.
+
+The pyramid holds the number of free cells per 2**k x 2**k block; a level's GridMap marks a
+block free if any of its cells is. BA* plans the block visiting order and the backtracking
+routes on the coarse level. Each block is then covered on its own: a fully free block by a
+vectorized serpentine of vertical lanes, a block with obstacles by the boustrophedon baseline
+on its sub-grid. Transits between blocks are straight lines when free, else searched inside
+the blocks of the coarse route, so on open layouts the Python-level work grows with the number
+of blocks rather than with the map area. Parts of blocks that cannot be reached that way
+(walls thinner than a block vanish on the coarse level) are covered nearest-first at the end.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .grid_map import GridMap, Coord, N4_OFFSETS
+from .ba_star import BAStarConfig, BAStarPlanner, BacktrackEvent, RunResult
+from .boustrophedon import BoustrophedonPlanner, result_from_trajectory
+from .smoothing import astar_spt_smooth
+
+Block = Tuple[int, int]
+
+
+@dataclass
+class GridPyramid:
+    """
+    free_counts[k]: free cells per 2**k x 2**k block (level 0 is the map itself).
+    """
+    free_counts: List[np.ndarray]
+    tile_size: float = 1.0
+
+    def level(self, k: int) -> GridMap:
+        """
+        Level k as a GridMap: a block is free if any of its cells is.
+        """
+        return GridMap((self.free_counts[k] == 0).astype(np.uint8), tile_size=self.tile_size * (1 << k))
+
+
+def build_pyramid(grid: GridMap, levels: int) -> GridPyramid:
+    """
+    Free-cell counts for block sizes 1, 2, 4, ... 2**levels (2x2 sum pooling per level).
+    """
+    counts = [(grid.occ == 0).astype(np.int64)]
+    for _ in range(levels):
+        c = counts[-1]
+        h, w = c.shape
+        c = np.pad(c, ((0, h % 2), (0, w % 2)))
+        counts.append(c.reshape(c.shape[0] // 2, 2, c.shape[1] // 2, 2).sum(axis=(1, 3)))
+    return GridPyramid(counts, grid.spec.tile_size)
+
+
+def serpentine(x0: int, y0: int, x1: int, y1: int, entry: Coord) -> np.ndarray:
+    """
+    Vertical lanes covering the box x0..x1, y0..y1 (inclusive) from one of its corners, as (n, 2).
+    """
+    xs = np.arange(x0, x1 + 1) if entry[0] == x0 else np.arange(x1, x0 - 1, -1)
+    ys = np.arange(y0, y1 + 1) if entry[1] == y0 else np.arange(y1, y0 - 1, -1)
+    lanes = np.empty((len(xs), len(ys), 2), dtype=np.int64)
+    lanes[:, :, 0] = xs[:, None]
+    lanes[:, :, 1] = ys[None, :]
+    lanes[1::2, :, 1] = ys[::-1][None, :]
+    return lanes.reshape(-1, 2)
+
+
+class MultiResolutionPlanner:
+    """
+    Coarse-to-fine coverage with the BAStarPlanner interface; block is a power of two (cells per side).
+    cfg applies to the coarse BA* run, except inflation (done on the fine map) and max_steps
+    (the fine trajectory budget).
+    """
+    def __init__(self, grid: GridMap, start_cell: Coord, start_theta: float = 0.0, cfg: Optional[BAStarConfig] = None, block: int = 16):
+        if block < 2 or block & (block - 1):
+            raise ValueError("block must be a power of two >= 2")
+        self.cfg = cfg or BAStarConfig()
+        self.grid = grid.inflate_obstacles(self.cfg.inflate_obstacles, self.cfg.inflate_shape)
+        if not self.grid.is_free(start_cell):
+            raise ValueError("start_cell must be free in the map")
+        self.start = start_cell
+        self.start_theta = start_theta
+        self.block = block
+        self.shift = block.bit_length() - 1
+        self.pyramid = build_pyramid(self.grid, self.shift)
+        self.coarse = self.pyramid.level(self.shift)
+        self._counts = self.pyramid.free_counts[self.shift]
+
+    def _box(self, b: Block) -> Tuple[int, int, int, int]:
+        x0, y0 = b[0] << self.shift, b[1] << self.shift
+        return x0, y0, min(x0 + self.block, self.grid.w) - 1, min(y0 + self.block, self.grid.h) - 1
+
+    def _block_order(self) -> List[Tuple[Block, Set[Block], bool]]:
+        """
+        Blocks in the order coarse BA* first enters them, each with the blocks a transit to it
+        may use (the previous block, plus the coarse backtracking route when one led there)
+        and whether it was reached by backtracking.
+        """
+        cfg = dataclasses.replace(self.cfg, inflate_obstacles=0, record_events="FULL", max_events=None, event_sample_every=1, max_steps=BAStarConfig.max_steps)
+        s = (self.start[0] >> self.shift, self.start[1] >> self.shift)
+        res = BAStarPlanner(self.coarse, s, self.start_theta, cfg=cfg).run()
+        routes = {e.traj_index: e.astar_path for e in res.events}
+        order: List[Tuple[Block, Set[Block], bool]] = []
+        seen: Set[Block] = set()
+        route: Set[Block] = set()
+        prev = s
+        for i, b in enumerate(res.trajectory_cells):
+            if b not in seen:
+                seen.add(b)
+                order.append((b, route | {prev, b}, bool(route)))
+                route = set()
+                prev = b
+            if i in routes:
+                route = set(routes[i])
+        return order
+
+    def _bfs(self, src: Coord, targets: Set[Coord], allowed: Optional[Set[Block]]) -> Tuple[Optional[List[Coord]], Dict[Coord, Optional[Coord]]]:
+        """
+        BFS over free cells to the nearest target, through the allowed blocks only (None: any).
+        Returns the path (None if no target is reachable) and the search tree. Reads occ
+        directly, so the fine map's per-cell neighbor tables are never built.
+        """
+        occ, w, h, sh = self.grid.occ, self.grid.w, self.grid.h, self.shift
+        parent: Dict[Coord, Optional[Coord]] = {src: None}
+        queue = deque([src])
+        while queue:
+            c = queue.popleft()
+            if c in targets:
+                path = [c]
+                while parent[path[-1]] is not None:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path, parent
+            x, y = c
+            for dx, dy in N4_OFFSETS:
+                nb = (x + dx, y + dy)
+                if nb in parent or not (0 <= nb[0] < w and 0 <= nb[1] < h) or occ[nb[1], nb[0]]:
+                    continue
+                if allowed is not None and (nb[0] >> sh, nb[1] >> sh) not in allowed:
+                    continue
+                parent[nb] = c
+                queue.append(nb)
+        return None, parent
+
+    def _straight(self, targets: Set[Coord]) -> Optional[List[Coord]]:
+        # a free L-shaped path to the target nearest in Manhattan distance (so a shortest path), or None
+        x, y = self._pos
+        tx, ty = min(targets, key=lambda t: (abs(t[0] - x) + abs(t[1] - y), t))
+        xs = np.arange(x, tx + 1) if tx >= x else np.arange(x, tx - 1, -1)
+        ys = np.arange(y, ty + 1) if ty >= y else np.arange(y, ty - 1, -1)
+        for legs in (((xs, y), (tx, ys)), ((x, ys), (xs, ty))):
+            path = np.concatenate([np.column_stack(np.broadcast_arrays(*legs[0])), np.column_stack(np.broadcast_arrays(*legs[1]))[1:]])
+            if not self.grid.occ[path[:, 1], path[:, 0]].any():
+                return list(map(tuple, path.tolist()))
+        return None
+
+    def _go(self, path: List[Coord], backtrack: bool) -> None:
+        # backtracks follow the path with line-of-sight shortcuts, like BA*, and are recorded
+        moves = path
+        if backtrack and len(path) > 1:
+            moves = astar_spt_smooth(self.grid, path).path
+            self._events.append(BacktrackEvent(
+                s_cp=path[0], candidates=[], s_sp=path[-1], astar_path=path, smooth_path=moves,
+                traj_index=self._n - 1, astar_len=len(path), smooth_len=len(moves),
+            ))
+        self._append(np.array(moves, dtype=np.int64))
+
+    def _append(self, cells: np.ndarray) -> None:
+        # cells[0] is the current position
+        if len(cells) > 1:
+            self._chunks.append(cells[1:])
+            self._n += len(cells) - 1
+            self._pos = tuple(cells[-1].tolist())
+            self._covered[cells[:, 1], cells[:, 0]] = True
+
+    def _cover_free(self, b: Block, corridor: Set[Block], backtrack: bool) -> None:
+        x0, y0, x1, y1 = self._box(b)
+        corners = {(x0, y0), (x0, y1), (x1, y0), (x1, y1)}
+        path = self._straight(corners) or self._bfs(self._pos, corners, corridor)[0]
+        if path is None:
+            self._deferred.update(corners)
+            return
+        self._go(path, backtrack)
+        self._append(serpentine(x0, y0, x1, y1, path[-1]))
+
+    def _cover_part(self, b: Block, entry: Coord, blocked: np.ndarray) -> Set[Coord]:
+        """
+        Boustrophedon over the part of block b reachable from entry inside the block, avoiding
+        the cells blocked in the block's sub-array (which is updated); returns the cells visited.
+        """
+        x0, y0 = b[0] << self.shift, b[1] << self.shift
+        run = BoustrophedonPlanner(GridMap(blocked), (entry[0] - x0, entry[1] - y0)).run()
+        cells = np.array(run.trajectory_cells, dtype=np.int64) + (x0, y0)
+        self._append(cells)
+        blocked[cells[:, 1] - y0, cells[:, 0] - x0] = 1
+        return set(map(tuple, cells.tolist()))
+
+    def _cover_mixed(self, b: Block, corridor: Set[Block], backtrack: bool) -> None:
+        # one boustrophedon per part of the block; parts not reachable within the corridor wait
+        x0, y0, x1, y1 = self._box(b)
+        blocked = np.array(self.grid.occ[y0:y1 + 1, x0:x1 + 1])
+        ys, xs = np.nonzero(blocked == 0)
+        left = set(zip((xs + x0).tolist(), (ys + y0).tolist()))
+        while left:
+            path = self._bfs(self._pos, left, corridor | {b})[0]
+            if path is None:
+                self._deferred.update(left)
+                return
+            self._go(path, backtrack)
+            backtrack = False
+            left -= self._cover_part(b, path[-1], blocked)
+
+    def _cover_deferred(self) -> None:
+        # nearest-first over the deferred cells that are still uncovered and reachable at all
+        reach = self._bfs(self._pos, set(), None)[1]
+        left = {c for c in self._deferred if c in reach}
+        while self._n <= self.cfg.max_steps:
+            left = {c for c in left if not self._covered[c[1], c[0]]}
+            if not left:
+                break
+            path = self._bfs(self._pos, left, None)[0]
+            self._go(path, True)
+            b = (path[-1][0] >> self.shift, path[-1][1] >> self.shift)
+            x0, y0, x1, y1 = self._box(b)
+            blocked = self.grid.occ[y0:y1 + 1, x0:x1 + 1] | self._covered[y0:y1 + 1, x0:x1 + 1]
+            blocked[path[-1][1] - y0, path[-1][0] - x0] = 0
+            self._cover_part(b, path[-1], blocked.astype(np.uint8))
+
+    def run(self) -> RunResult:
+        self._pos = self.start
+        self._chunks: List[np.ndarray] = [np.array([self.start], dtype=np.int64)]
+        self._events: List[BacktrackEvent] = []
+        self._deferred: Set[Coord] = set()
+        self._covered = np.zeros(self.grid.occ.shape, dtype=bool)
+        self._covered[self.start[1], self.start[0]] = True
+        self._n = 1
+        for b, corridor, backtrack in self._block_order():
+            if self._n > self.cfg.max_steps:
+                break
+            x0, y0, x1, y1 = self._box(b)
+            if self._counts[b[1], b[0]] == (x1 - x0 + 1) * (y1 - y0 + 1):
+                self._cover_free(b, corridor, backtrack)
+            else:
+                self._cover_mixed(b, corridor, backtrack)
+        if self._deferred and self._n <= self.cfg.max_steps:
+            self._cover_deferred()
+        traj_arr = np.concatenate(self._chunks)[:self.cfg.max_steps + 1]
+        traj = list(map(tuple, traj_arr.tolist()))
+        events = [e for e in self._events if e.traj_index < len(traj)]
+        return result_from_trajectory(self.grid, traj, events)
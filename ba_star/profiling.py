@@ -0,0 +1,167 @@
+"""
+Profiling of planner runs: cProfile statistics plus sampled call stacks, attributed to BA* phases.
+
+profile_call(fn) runs fn under cProfile while a background thread samples the calling thread's
+stack every `interval` seconds. The Profile it returns writes pstats (pstats.Stats, snakeviz)
+and collapsed stacks ("frame;frame;... count" lines, the input of flamegraph.pl and speedscope),
+and reports the hottest functions with the planner phase their time was spent in.
+
+A sample belongs to the outermost phase function on its stack, so A* run while selecting a
+start point counts as selection and line-of-sight checks made by the smoother as smoothing.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+PHASES = ("BM", "candidates", "selection", "A*", "smoothing", "other")
+
+Frame = Tuple[str, int, str]  # (file name, first line, function name)
+Stack = Tuple[Frame, ...]  # outermost frame first
+
+_PHASE_OF: Dict[Tuple[str, str], str] = {
+    ("ba_star.py", "_bm_next_cell"): "BM",
+    ("batch.py", "_bm_step"): "BM",
+    ("ba_star.py", "build_candidates_L"): "candidates",
+    ("ba_star.py", "_build_candidates_steps"): "candidates",
+    ("ba_star.py", "_refresh_candidates"): "candidates",
+    ("batch.py", "_candidates"): "candidates",
+    ("ba_star.py", "select_start_point"): "selection",
+    ("ba_star.py", "_select_start_point_steps"): "selection",
+    ("ba_star.py", "_nearest_candidate"): "selection",
+    ("ba_star.py", "_astar_path"): "A*",
+    ("ba_star.py", "_astar_path_steps"): "A*",
+    ("smoothing.py", "astar_spt_smooth"): "smoothing",
+    ("batch.py", "_sync_to_planner"): "other",
+    ("batch.py", "_sync_from_planner"): "other",
+}
+# moves, sensing and coverage marking belong to BM inside these loops, to "other" inside a backtrack
+_BM_LOOPS = {("ba_star.py", "_run_steps"), ("batch.py", "run")}
+_BACKTRACK = ("ba_star.py", "_backtrack_steps")
+
+
+def stack_phase(stack: Stack) -> str:
+    """
+    Planner phase of a sampled stack (one of PHASES).
+    """
+    phase = "other"
+    for file, _, name in stack:
+        key = (file, name)
+        if key in _PHASE_OF:
+            return _PHASE_OF[key]
+        if key in _BM_LOOPS:
+            phase = "BM"
+        elif key == _BACKTRACK:
+            phase = "other"
+    return phase
+
+
+@dataclass
+class Profile:
+    stats: pstats.Stats
+    stacks: Counter  # Stack -> number of samples
+    seconds: float
+
+    def phase_shares(self) -> Dict[str, float]:
+        """
+        Fraction of the stack samples spent in each phase.
+        """
+        counts = Counter()
+        for stack, n in self.stacks.items():
+            counts[stack_phase(stack)] += n
+        total = sum(counts.values())
+        return {p: counts[p] / total if total else 0.0 for p in PHASES}
+
+    def function_phase(self, func: Tuple[str, int, str]) -> str:
+        """
+        Dominant phase of the samples with a pstats function on the stack; C functions
+        (never on a sampled stack) take the phase of their most expensive caller.
+        """
+        for _ in range(8):
+            frame = (os.path.basename(func[0]), func[1], func[2])
+            counts = Counter()
+            for stack, n in self.stacks.items():
+                if frame in stack:
+                    counts[stack_phase(stack)] += n
+            if counts:
+                return counts.most_common(1)[0][0]
+            callers = self.stats.stats[func][4] if func in self.stats.stats else {}
+            if not callers:
+                break
+            func = max(callers, key=lambda c: callers[c][2])
+        return _PHASE_OF.get((os.path.basename(func[0]), func[2]), "other")
+
+    def write(self, prefix: Path) -> Tuple[Path, Path]:
+        """
+        Write <prefix>.prof (pstats) and <prefix>.collapsed (flame graph stacks); returns both paths.
+        """
+        prefix = Path(prefix)
+        prof, collapsed = prefix.with_suffix(".prof"), prefix.with_suffix(".collapsed")
+        self.stats.dump_stats(str(prof))
+        lines = [
+            ";".join(f"{name} ({file}:{line})" for file, line, name in stack) + f" {n}"
+            for stack, n in sorted(self.stacks.items())
+        ]
+        collapsed.write_text("\n".join(lines) + "\n" if lines else "")
+        return prof, collapsed
+
+    def report(self, top: int = 15) -> str:
+        """
+        Phase shares and the top functions by own time, each with its phase.
+        """
+        shares = self.phase_shares()
+        out = [f"profile: {self.seconds:.3f} s, {sum(self.stacks.values())} stack samples"]
+        out.append("  " + "  ".join(f"{p} {shares[p]:.1%}" for p in PHASES))
+        out.append(f"  {'own s':>8} {'total s':>8} {'calls':>10}  {'phase':<10}  function")
+        funcs = sorted(self.stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:top]
+        for func, (_, nc, tt, ct, _) in funcs:
+            file, line, name = func
+            where = name if file == "~" else f"{os.path.basename(file)}:{line}({name})"
+            out.append(f"  {tt:8.3f} {ct:8.3f} {nc:10d}  {self.function_phase(func):<10}  {where}")
+        return "\n".join(out)
+
+
+def profile_call(fn: Callable[..., Any], *args: Any, interval: float = 0.005, **kwargs: Any) -> Tuple[Any, Profile]:
+    """
+    fn(*args, **kwargs) under cProfile with stack sampling every `interval` seconds; returns
+    (fn's result, Profile). Samples are taken at most once per interpreter switch interval.
+    """
+    tid = threading.get_ident()
+    here = sys._getframe()
+    stacks: Counter = Counter()
+    stop = threading.Event()
+
+    def sample() -> None:
+        while not stop.wait(interval):
+            f: Optional[Any] = sys._current_frames().get(tid)
+            stack = []
+            while f is not None and f is not here:
+                c = f.f_code
+                stack.append((os.path.basename(c.co_filename), c.co_firstlineno, c.co_name))
+                f = f.f_back
+            while stack and stack[-1][0] == "cProfile.py":
+                stack.pop()  # runcall's own frame
+            # stacks still outside fn (not under this frame) are skipped
+            if f is here and stack:
+                stacks[tuple(reversed(stack))] += 1
+
+    prof = cProfile.Profile()
+    sampler = threading.Thread(target=sample, name="profile-sampler", daemon=True)
+    t0 = time.perf_counter()
+    sampler.start()
+    try:
+        result = prof.runcall(fn, *args, **kwargs)
+    finally:
+        stop.set()
+        sampler.join()
+    seconds = time.perf_counter() - t0
+    return result, Profile(pstats.Stats(prof), stacks, seconds)
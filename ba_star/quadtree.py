@@ -0,0 +1,507 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Callable, Dict, Generator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .astar import YIELD_EVERY, AStarResult, drain
+from .grid_map import GridMap, GridSpec, Coord, bresenham_line, bresenham_point
+
+
+Box = Tuple[int, int, int]  # (x0, y0, size)
+
+
+class QuadTreeMap:
+    """
+    Occupancy map stored as a region quadtree: uniform free or obstacle squares are merged
+    into single leaves, so large open areas become a handful of nodes.
+
+    Conventions follow GridMap (occupancy 1 = obstacle, cells (x, y), y downward).
+    Leaves are aligned power-of-two squares fully inside the map; leaf_value[i] is 0 (free)
+    or 1 (obstacle). A dense leaf-id raster answers point queries in O(1). update() changes
+    cells in place; ids of leaves merged away are reused later and have size 0 meanwhile.
+    """
+    def __init__(self, occupancy: np.ndarray, tile_size: float = 1.0):
+        if occupancy.ndim != 2:
+            raise ValueError("occupancy must be a 2D array")
+        occ = (occupancy > 0).astype(np.uint8)
+        self.h, self.w = occ.shape
+        self.spec = GridSpec(width=self.w, height=self.h, tile_size=float(tile_size))
+        self._occ = occ
+
+        x0, y0, size, value = self._build(occ)
+        self.leaf_x0, self.leaf_y0, self.leaf_size, self.leaf_value = x0, y0, size, value
+        self._leaf_ids = np.empty((self.h, self.w), dtype=np.int32)
+        self._boxes: List[Box] = list(zip(x0.tolist(), y0.tolist(), size.tolist()))
+        for i, (x, y, s) in enumerate(self._boxes):
+            self._leaf_ids[y:y + s, x:x + s] = i
+        # plain-list mirrors for the per-node lookups of the search loops
+        self._ids_flat: List[int] = self._leaf_ids.ravel().tolist()
+        self.leaf_free: List[bool] = (value == 0).tolist()
+        self._levels = (max(self.h, self.w) - 1).bit_length()  # the root square has side 2**_levels
+        self._order: List[int] = self._build_order(x0, y0, size).tolist()
+        self._adjacency: Optional[List[List[int]]] = None
+        self._free_ids: List[int] = []
+        # obstacle counts of the aligned 2**k squares, level k; built by the first update()
+        self._counts: Optional[List[np.ndarray]] = None
+
+    @staticmethod
+    def from_grid(grid: GridMap) -> "QuadTreeMap":
+        return QuadTreeMap(grid.occ, tile_size=grid.spec.tile_size)
+
+    def _build(self, occ: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # top-down, one level at a time: obstacle counts from a summed-area table decide
+        # which squares are uniform; squares crossing the map border are always split
+        h, w = occ.shape
+        sat = np.zeros((h + 1, w + 1), dtype=np.int64)
+        sat[1:, 1:] = occ.cumsum(0).cumsum(1)
+        size = 1
+        while size < max(h, w):
+            size *= 2
+        xs = np.zeros(1, dtype=np.int64)
+        ys = np.zeros(1, dtype=np.int64)
+        leaves: List[Tuple[np.ndarray, np.ndarray, int, np.ndarray]] = []
+        while len(xs):
+            keep = (xs < w) & (ys < h)
+            xs, ys = xs[keep], ys[keep]
+            inside = (xs + size <= w) & (ys + size <= h)
+            x1 = np.minimum(xs + size, w)
+            y1 = np.minimum(ys + size, h)
+            count = sat[y1, x1] - sat[ys, x1] - sat[y1, xs] + sat[ys, xs]
+            uniform = inside & ((count == 0) | (count == size * size))
+            leaves.append((xs[uniform], ys[uniform], size, (count[uniform] > 0).astype(np.uint8)))
+            xs, ys = xs[~uniform], ys[~uniform]
+            half = size // 2
+            xs = np.concatenate([xs, xs + half, xs, xs + half])
+            ys = np.concatenate([ys, ys, ys + half, ys + half])
+            size = half
+        x0 = np.concatenate([l[0] for l in leaves])
+        y0 = np.concatenate([l[1] for l in leaves])
+        sz = np.concatenate([np.full(len(l[0]), l[2], dtype=np.int64) for l in leaves])
+        val = np.concatenate([l[3] for l in leaves])
+        return x0, y0, sz, val
+
+    def _build_order(self, x0: np.ndarray, y0: np.ndarray, size: np.ndarray) -> np.ndarray:
+        # position of each leaf in the order _build emits the leaves of the whole map: larger
+        # squares first, then by quadrant (0..3) within the parent, ties by the parent's quadrant, ...
+        k = np.log2(size).astype(np.int64)
+        depth = self._levels - k
+        key = np.zeros(len(size), dtype=np.int64)
+        for i in range(self._levels):
+            quad = ((x0 >> (k + i)) & 1) + 2 * ((y0 >> (k + i)) & 1)
+            key = np.where(i < depth, key * 4 + quad, key)
+        return depth * 4 ** self._levels + key
+
+    def node_order(self, n: int) -> int:
+        """
+        Tie-break rank of a search node (a leaf id, or id_bound + y * w + x for a cell): the leaf
+        ids a fresh build would assign, cells after all leaves, so searches do not depend on
+        the update history.
+        """
+        if n < len(self._boxes):
+            return self._order[n]
+        return (self._levels + 1) * 4 ** self._levels + n - len(self._boxes)
+
+    @property
+    def num_leaves(self) -> int:
+        return len(self._boxes) - len(self._free_ids)
+
+    @property
+    def id_bound(self) -> int:
+        # leaf ids are below this (some may be unused)
+        return len(self._boxes)
+
+    def leaf_id(self, c: Coord) -> int:
+        return self._ids_flat[c[1] * self.w + c[0]]
+
+    def leaf_box(self, i: int) -> Box:
+        return self._boxes[i]
+
+    def to_grid(self) -> GridMap:
+        return GridMap(self._occ.copy(), tile_size=self.spec.tile_size)
+
+    def in_bounds(self, c: Coord) -> bool:
+        x, y = c
+        return 0 <= x < self.w and 0 <= y < self.h
+
+    def is_obstacle(self, c: Coord) -> bool:
+        return not self.leaf_free[self._ids_flat[c[1] * self.w + c[0]]]
+
+    def is_free(self, c: Coord) -> bool:
+        return self.in_bounds(c) and not self.is_obstacle(c)
+
+    def neighbors4(self, c: Coord) -> List[Coord]:
+        x, y = c
+        cand = [(x, y-1), (x, y+1), (x+1, y), (x-1, y)]
+        return [p for p in cand if self.in_bounds(p)]
+
+    def bresenham_line(self, a: Coord, b: Coord) -> List[Coord]:
+        return bresenham_line(a, b)
+
+    def line_of_sight(self, a: Coord, b: Coord) -> bool:
+        """
+        True if every cell of bresenham_line(a, b) is free. Free leaves are crossed in one
+        step: the index at which the line leaves a leaf's square is computed in closed form.
+        """
+        if not (self.in_bounds(a) and self.in_bounds(b)):
+            return False
+        dx, dy = abs(b[0] - a[0]), abs(b[1] - a[1])
+        n = max(dx, dy)
+        t = 0
+        while True:
+            x, y = bresenham_point(a, b, t)
+            i = self._ids_flat[y * self.w + x]
+            if not self.leaf_free[i]:
+                return False
+            if t >= n:
+                return True
+            t = min(n, _exit_index(a, b, t, self._boxes[i]))
+
+    def adjacency(self) -> List[List[int]]:
+        """
+        Free-leaf adjacency graph: adjacency()[i] lists the free leaves sharing an edge
+        with free leaf i (empty for obstacle leaves). Built on first use.
+        """
+        if self._adjacency is None:
+            ids, free = self._leaf_ids, self.leaf_value == 0
+            pairs = [
+                np.stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()], axis=1),
+                np.stack([ids[:-1, :].ravel(), ids[1:, :].ravel()], axis=1),
+            ]
+            p = np.concatenate(pairs)
+            p = p[(p[:, 0] != p[:, 1]) & free[p[:, 0]] & free[p[:, 1]]]
+            p = np.unique(np.sort(p, axis=1), axis=0)
+            adj: List[List[int]] = [[] for _ in range(self.id_bound)]
+            for i, j in p.tolist():
+                adj[i].append(j)
+                adj[j].append(i)
+            self._adjacency = adj
+        return self._adjacency
+
+    def update(self, changes: Dict[Coord, int]) -> None:
+        """
+        Set cells to occupancy 1 (obstacle) or 0 (free) and rebuild only the affected part of
+        the tree. A leaf can change only inside the larger of the old and the new leaf holding a
+        changed cell (the topmost uniform square above it), so each such square is re-split
+        and the adjacency graph, if built, is patched along its border.
+        """
+        if not changes:
+            return
+        xy = np.array(list(changes), dtype=np.int64).reshape(-1, 2)
+        val = (np.fromiter(changes.values(), dtype=np.int64, count=len(changes)) != 0).astype(np.uint8)
+        xs, ys = xy[:, 0], xy[:, 1]
+        diff = self._occ[ys, xs] != val
+        if not diff.any():
+            return
+        xs, ys, val = xs[diff], ys[diff], val[diff]
+        if self._counts is None:
+            self._counts = _count_pyramid(self._occ)
+        old_size = self.leaf_size[self._leaf_ids[ys, xs]]
+        self._occ[ys, xs] = val
+        delta = val.astype(np.int64) * 2 - 1
+        for k, level in enumerate(self._counts):
+            np.add.at(level, (ys >> k, xs >> k), delta)
+
+        # the topmost uniform square above each changed cell after the change
+        new_size = np.ones(len(xs), dtype=np.int64)
+        found = np.zeros(len(xs), dtype=bool)
+        for k in range(len(self._counts) - 1, 0, -1):
+            s = 1 << k
+            X, Y = xs >> k, ys >> k
+            cnt = self._counts[k][Y, X]
+            hit = ~found & ((X + 1) * s <= self.w) & ((Y + 1) * s <= self.h) & ((cnt == 0) | (cnt == s * s))
+            new_size[hit] = s
+            found |= hit
+        rs = np.maximum(old_size, new_size)
+
+        # squares to rebuild: distinct, and not inside a larger one
+        rx, ry = xs & -rs, ys & -rs
+        sq = np.unique(np.stack([rs, ry, rx], axis=1), axis=0)
+        rs, ry, rx = sq[:, 0], sq[:, 1], sq[:, 2]
+        inner = np.zeros(len(rs), dtype=bool)
+        for big in np.unique(rs)[1:].tolist():
+            at = rs == big
+            keys = (ry[at] // big) * self.w + rx[at] // big
+            inner |= (rs < big) & np.isin((ry // big) * self.w + rx // big, keys)
+        rs, ry, rx = rs[~inner], ry[~inner], rx[~inner]
+        regions: List[Box] = list(zip(rx.tolist(), ry.tolist(), rs.tolist()))
+
+        removed = np.unique(np.concatenate([
+            self._leaf_ids[_square_cells(rx[rs == s], ry[rs == s], s)].ravel() for s in np.unique(rs).tolist()
+        ])).tolist()
+        removed_set = set(removed)
+        adj = self._adjacency
+        if adj is not None:
+            for nb in {j for i in removed for j in adj[i]} - removed_set:
+                adj[nb] = [j for j in adj[nb] if j not in removed_set]
+            for i in removed:
+                adj[i] = []
+        for i in removed:
+            self._boxes[i] = (0, 0, 0)
+            self.leaf_free[i] = False
+        self.leaf_size[removed] = 0
+        self.leaf_value[removed] = 1
+        self._free_ids.extend(removed)
+
+        lx, ly, ls, lv = self._split(rx, ry, rs)
+        n_old = len(self._boxes)
+        reuse = min(len(self._free_ids), len(lx))
+        ids = np.concatenate([
+            np.array(self._free_ids[len(self._free_ids) - reuse:], dtype=np.int64),
+            np.arange(n_old, n_old + len(lx) - reuse, dtype=np.int64),
+        ])
+        del self._free_ids[len(self._free_ids) - reuse:]
+        n = n_old + len(lx) - reuse
+        grow = n - n_old
+        self._boxes.extend([(0, 0, 0)] * grow)
+        self.leaf_free.extend([False] * grow)
+        self._order.extend([0] * grow)
+        if adj is not None:
+            adj.extend([] for _ in range(grow))
+        if grow:
+            self.leaf_x0 = np.concatenate([self.leaf_x0, np.zeros(grow, dtype=self.leaf_x0.dtype)])
+            self.leaf_y0 = np.concatenate([self.leaf_y0, np.zeros(grow, dtype=self.leaf_y0.dtype)])
+            self.leaf_size = np.concatenate([self.leaf_size, np.zeros(grow, dtype=self.leaf_size.dtype)])
+            self.leaf_value = np.concatenate([self.leaf_value, np.ones(grow, dtype=self.leaf_value.dtype)])
+        self.leaf_x0[ids], self.leaf_y0[ids], self.leaf_size[ids], self.leaf_value[ids] = lx, ly, ls, lv
+        for i, box, v, o in zip(ids.tolist(), zip(lx.tolist(), ly.tolist(), ls.tolist()), lv.tolist(), self._build_order(lx, ly, ls).tolist()):
+            self._boxes[i] = box
+            self.leaf_free[i] = v == 0
+            self._order[i] = o
+        for s in np.unique(ls).tolist():
+            at = ls == s
+            self._leaf_ids[_square_cells(lx[at], ly[at], s)] = ids[at][:, None, None]
+        for x0, y0, s in regions:
+            for y in range(y0, y0 + s):
+                self._ids_flat[y * self.w + x0:y * self.w + x0 + s] = self._leaf_ids[y, x0:x0 + s].tolist()
+
+        if adj is not None:
+            # every 4-adjacent cell pair with at least one cell inside a rebuilt square
+            free = self.leaf_value == 0
+            pairs = []
+            for x0, y0, s in regions:
+                xa, xb = max(x0 - 1, 0), min(x0 + s + 1, self.w)
+                ya, yb = max(y0 - 1, 0), min(y0 + s + 1, self.h)
+                rows = self._leaf_ids[y0:y0 + s, xa:xb]
+                cols = self._leaf_ids[ya:yb, x0:x0 + s]
+                pairs.append(np.stack([rows[:, :-1].ravel(), rows[:, 1:].ravel()], axis=1))
+                pairs.append(np.stack([cols[:-1, :].ravel(), cols[1:, :].ravel()], axis=1))
+            p = np.concatenate(pairs).astype(np.int64)
+            p = p[(p[:, 0] != p[:, 1]) & free[p[:, 0]] & free[p[:, 1]]]
+            for i, j in np.unique(np.sort(p, axis=1), axis=0).tolist():
+                adj[i].append(j)
+                adj[j].append(i)
+
+    def _split(self, rx: np.ndarray, ry: np.ndarray, rs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # _build restricted to the given aligned squares, with counts from the pyramid
+        xs = np.zeros(0, dtype=np.int64)
+        ys = np.zeros(0, dtype=np.int64)
+        leaves: List[Tuple[np.ndarray, np.ndarray, int, np.ndarray]] = []
+        for k in range(int(rs.max()).bit_length() - 1, -1, -1):
+            size = 1 << k
+            xs = np.concatenate([xs, rx[rs == size]])
+            ys = np.concatenate([ys, ry[rs == size]])
+            keep = (xs < self.w) & (ys < self.h)
+            xs, ys = xs[keep], ys[keep]
+            count = self._counts[k][ys >> k, xs >> k]
+            uniform = (xs + size <= self.w) & (ys + size <= self.h) & ((count == 0) | (count == size * size))
+            leaves.append((xs[uniform], ys[uniform], size, (count[uniform] > 0).astype(np.uint8)))
+            xs, ys = xs[~uniform], ys[~uniform]
+            half = size // 2
+            xs = np.concatenate([xs, xs + half, xs, xs + half])
+            ys = np.concatenate([ys, ys, ys + half, ys + half])
+        x0 = np.concatenate([l[0] for l in leaves])
+        y0 = np.concatenate([l[1] for l in leaves])
+        sz = np.concatenate([np.full(len(l[0]), l[2], dtype=np.int64) for l in leaves])
+        val = np.concatenate([l[3] for l in leaves])
+        return x0, y0, sz, val
+
+
+def _square_cells(x0: np.ndarray, y0: np.ndarray, s: int) -> Tuple[np.ndarray, np.ndarray]:
+    # index arrays (rows, cols) of shape (n, s, s) covering n aligned squares of side s
+    r = np.arange(s)
+    return y0[:, None, None] + r[None, :, None], x0[:, None, None] + r[None, None, :]
+
+
+def _count_pyramid(occ: np.ndarray) -> List[np.ndarray]:
+    # level k: obstacle counts of the aligned 2**k squares (clipped at the map border),
+    # up to the level whose single square spans the whole map
+    levels = [occ.astype(np.int64)]
+    while max(levels[-1].shape) > 1:
+        a = levels[-1]
+        a = np.pad(a, ((0, a.shape[0] % 2), (0, a.shape[1] % 2)))
+        levels.append(a[0::2, 0::2] + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2])
+    return levels
+
+
+def _exit_index(a: Coord, b: Coord, t: int, box: Box) -> int:
+    """
+    Smallest t' > t at which bresenham_point(a, b, t') leaves box, given that point t is inside.
+    Both coordinates move monotonically, so each axis is inverted separately.
+    """
+    bx0, by0, s = box
+    dx, dy = abs(b[0] - a[0]), abs(b[1] - a[1])
+    # (start, direction, box start, per-axis delta) for the major and minor axis
+    if dx >= dy:
+        major = (a[0], 1 if b[0] > a[0] else -1, bx0)
+        minor = (a[1], 1 if b[1] > a[1] else -1, by0, dy)
+        d_major = dx
+    else:
+        major = (a[1], 1 if b[1] > a[1] else -1, by0)
+        minor = (a[0], 1 if b[0] > a[0] else -1, bx0, dx)
+        d_major = dy
+    # offset from the line start at which each axis is outside the box
+    m0, ms, mb = major
+    t_major = (mb + s - m0) if ms > 0 else (m0 - mb + 1)
+    n0, ns, nb, d_minor = minor
+    e = (nb + s - n0) if ns > 0 else (n0 - nb + 1)
+    if d_minor == 0:
+        return t_major
+    # minor offset at index t is (2 t d_minor + d_major - 1) // (2 d_major) (see bresenham_point)
+    t_minor = -(-(2 * e * d_major - d_major + 1) // (2 * d_minor))
+    return max(t + 1, min(t_major, t_minor))
+
+
+def _border_pairs(a: Box, b: Box) -> List[Tuple[Coord, Coord]]:
+    # 4-adjacent cell pairs (p in a, q in b) across the shared edge of two squares
+    ax, ay, asz = a
+    bx, by, bsz = b
+    out: List[Tuple[Coord, Coord]] = []
+    if bx == ax + asz or ax == bx + bsz:
+        px, qx = (ax + asz - 1, bx) if bx == ax + asz else (ax, bx + bsz - 1)
+        out += [((px, y), (qx, y)) for y in range(max(ay, by), min(ay + asz, by + bsz))]
+    if by == ay + asz or ay == by + bsz:
+        py, qy = (ay + asz - 1, by) if by == ay + asz else (ay, by + bsz - 1)
+        out += [((x, py), (x, qy)) for x in range(max(ax, bx), min(ax + asz, bx + bsz))]
+    return out
+
+
+def _walk_in_box(p: Coord, q: Coord) -> List[Coord]:
+    # 4-connected path from p to q (x first, then y); stays inside any square holding both
+    out: List[Coord] = []
+    x, y = p
+    sx = 1 if q[0] > x else -1
+    while x != q[0]:
+        x += sx
+        out.append((x, y))
+    sy = 1 if q[1] > y else -1
+    while y != q[1]:
+        y += sy
+        out.append((x, y))
+    return out
+
+
+def quadtree_astar(
+    qt: QuadTreeMap,
+    start: Coord,
+    goal: Coord,
+    passable_fn: Callable[[Coord], bool],
+    leaf_passable_fn: Callable[[int], bool],
+) -> Optional[AStarResult]:
+    return drain(quadtree_astar_steps(qt, start, goal, passable_fn, leaf_passable_fn))
+
+
+def quadtree_astar_steps(
+    qt: QuadTreeMap,
+    start: Coord,
+    goal: Coord,
+    passable_fn: Callable[[Coord], bool],
+    leaf_passable_fn: Callable[[int], bool],
+) -> Generator[None, None, Optional[AStarResult]]:
+    """
+    A* between two passable cells over the quadtree adjacency graph.
+
+    A free leaf whose cells are all passable (leaf_passable_fn) is one node; the passable
+    cells of other free leaves are single-cell nodes. Edges join nodes whose squares touch,
+    weighted by the distance between their centers; the Euclidean distance to the goal node's
+    center is admissible for that cost. The node path is expanded into a 4-connected cell path,
+    whose length (number of moves) is reported as cost. Paths are shortest in center distance,
+    not in moves: the cost can exceed that of astar_steps over the same cells.
+    Like astar_steps, yields every YIELD_EVERY expansions; quadtree_astar runs it to the end.
+    """
+    if start == goal:
+        return AStarResult(path=[start], cost=0.0, expanded=0)
+
+    # nodes are ints: leaf ids below n_leaves, cells (x, y) as n_leaves + y * w + x
+    n_leaves, w, boxes, ids = qt.id_bound, qt.w, qt._boxes, qt._ids_flat
+    adjacency = qt.adjacency()
+
+    def node_of(c: Coord) -> int:
+        i = ids[c[1] * w + c[0]]
+        return i if leaf_passable_fn(i) else n_leaves + c[1] * w + c[0]
+
+    def box(n: int) -> Box:
+        if n < n_leaves:
+            return boxes[n]
+        y, x = divmod(n - n_leaves, w)
+        return x, y, 1
+
+    def center(n: int) -> Tuple[float, float]:
+        x, y, s = box(n)
+        return x + (s - 1) / 2.0, y + (s - 1) / 2.0
+
+    def neighbors(n: int) -> Set[int]:
+        out: Set[int] = set()
+        if n < n_leaves:
+            for j in adjacency[n]:
+                if leaf_passable_fn(j):
+                    out.add(j)
+                else:
+                    out.update(n_leaves + q[1] * w + q[0] for _, q in _border_pairs(boxes[n], boxes[j]) if passable_fn(q))
+        else:
+            y, x = divmod(n - n_leaves, w)
+            for q in qt.neighbors4((x, y)):
+                if passable_fn(q):
+                    out.add(node_of(q))
+        return out
+
+    s_node, g_node = node_of(start), node_of(goal)
+    gx, gy = center(g_node)
+    g: Dict[int, float] = {s_node: 0.0}
+    came_from: Dict[int, int] = {}
+    # ties go by node_order, which does not depend on how the tree was updated
+    open_heap: List[Tuple[float, int, int]] = [(0.0, qt.node_order(s_node), s_node)]
+    closed: Set[int] = set()
+    expanded = 0
+    while open_heap:
+        _, _, cur = heapq.heappop(open_heap)
+        if cur in closed:
+            continue
+        closed.add(cur)
+        expanded += 1
+        if expanded % YIELD_EVERY == 0:
+            yield
+        if cur == g_node:
+            nodes = [cur]
+            while nodes[-1] in came_from:
+                nodes.append(came_from[nodes[-1]])
+            nodes.reverse()
+            path = _expand(nodes, start, goal, box, passable_fn)
+            return AStarResult(path=path, cost=float(len(path) - 1), expanded=expanded)
+        cx, cy = center(cur)
+        gc = g[cur]
+        for nb in neighbors(cur):
+            if nb in closed:
+                continue
+            nx, ny = center(nb)
+            tentative = gc + math.hypot(nx - cx, ny - cy)
+            if nb not in g or tentative < g[nb]:
+                g[nb] = tentative
+                came_from[nb] = cur
+                heapq.heappush(open_heap, (tentative + math.hypot(gx - nx, gy - ny), qt.node_order(nb), nb))
+    return None
+
+
+def _expand(nodes: Sequence[int], start: Coord, goal: Coord, box: Callable[[int], Box], passable_fn: Callable[[Coord], bool]) -> List[Coord]:
+    # cross each pair of consecutive nodes at the passable border pair closest to the current cell
+    path: List[Coord] = [start]
+    for a, b in zip(nodes, nodes[1:]):
+        p = path[-1]
+        pairs = [(u, v) for u, v in _border_pairs(box(a), box(b)) if passable_fn(v)]
+        u, v = min(pairs, key=lambda uv: abs(uv[0][0] - p[0]) + abs(uv[0][1] - p[1]))
+        path += _walk_in_box(p, u)
+        path.append(v)
+    path += _walk_in_box(path[-1], goal)
+    return path
@@ -0,0 +1,166 @@
+"""
+Config racing: run BAStarConfig variants on one map in parallel and keep the shortest full-coverage run.
+
+Each variant plans in a worker process in run_for() slices and reports progress after every
+slice. Path length only grows during a run, so a variant is cancelled as soon as its length
+exceeds the shortest finished run that reached min_coverage: it can no longer win.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .ba_star import BAStarConfig, BAStarPlanner, RunResult
+from .grid_map import GridMap, Coord
+
+# variant states
+RUNNING, FINISHED, CANCELLED, FAILED = "RUNNING", "FINISHED", "CANCELLED", "FAILED"
+
+# per-worker-process state, set up by _init_worker
+_grid: Optional[GridMap] = None
+_progress: Any = None  # multiprocessing queue of RaceProgress
+_best: Any = None  # multiprocessing Value: shortest finished path length at min_coverage
+
+
+@dataclass
+class RaceProgress:
+    variant: int  # index into the configs
+    status: str  # RUNNING, FINISHED, CANCELLED or FAILED
+    steps: int
+    path_length: float
+    seconds: float
+    coverage_rate: Optional[float] = None  # FINISHED only
+    error: Optional[str] = None  # FAILED only
+
+
+@dataclass
+class RaceResult:
+    winner: Optional[int]  # index of the winning config, None if no variant finished
+    cfg: Optional[BAStarConfig]
+    result: Optional[RunResult]
+    outcomes: List[RaceProgress]  # final state of every variant, in config order
+
+
+def _init_worker(occ: np.ndarray, tile_size: float, progress: Any, best: Any) -> None:
+    global _grid, _progress, _best
+    _grid = GridMap(occ, tile_size=tile_size)
+    _progress = progress
+    _best = best
+
+
+def _run_variant(i: int, cfg: BAStarConfig, start: Coord, start_theta: float, slice_s: float, min_coverage: float) -> Tuple[RaceProgress, Optional[RunResult]]:
+    """
+    One variant, in a worker process. The RunResult is returned only when it can still win.
+    """
+    t0 = time.perf_counter()
+
+    def report(status: str, steps: int, length: float, **kw: Any) -> RaceProgress:
+        p = RaceProgress(i, status, steps, length, time.perf_counter() - t0, **kw)
+        _progress.put(p)
+        return p
+
+    try:
+        planner = BAStarPlanner(_grid, start, start_theta, cfg=cfg)
+    except ValueError as e:
+        return report(FAILED, 0, 0.0, error=str(e)), None
+    planner.prepare()
+    tile = planner.grid.spec.tile_size
+    while True:
+        done = planner.run_for(slice_s).done
+        length = max(0, len(planner.trajectory) - 1) * tile
+        if length > _best.value:
+            return report(CANCELLED, planner.steps, length), None
+        if done:
+            break
+        report(RUNNING, planner.steps, length)
+    res = planner.result()
+    full = res.coverage_rate >= min_coverage
+    if full:
+        with _best.get_lock():
+            full_best = res.path_length <= _best.value
+            _best.value = min(_best.value, res.path_length)
+    p = report(FINISHED, res.steps, res.path_length, coverage_rate=res.coverage_rate)
+    # runs below min_coverage are kept as a fallback in case no variant reaches it
+    return p, res if (not full or full_best) else None
+
+
+def race_configs(
+    grid: GridMap,
+    start: Coord,
+    configs: Sequence[BAStarConfig],
+    start_theta: float = 0.0,
+    workers: Optional[int] = None,
+    min_coverage: float = 1.0,
+    slice_s: float = 0.05,
+    on_progress: Optional[Callable[[RaceProgress], None]] = None,
+) -> RaceResult:
+    """
+    Race the configs on grid from start. The winner is the finished run with coverage_rate >=
+    min_coverage and the shortest path_length (ties: the earlier config); if none reaches
+    min_coverage, the finished run with the highest coverage. on_progress receives every
+    RaceProgress (one per slice and variant, then its final state) in the calling process.
+    """
+    if not configs:
+        raise ValueError("need at least one config")
+    ctx = multiprocessing.get_context("spawn")
+    progress = ctx.Queue()
+    best = ctx.Value("d", math.inf)
+    n = len(configs)
+    outcomes: List[Optional[RaceProgress]] = [None] * n
+    results: List[Optional[RunResult]] = [None] * n
+
+    def emit(p: RaceProgress) -> None:
+        if p.status != RUNNING:
+            outcomes[p.variant] = p
+        if on_progress is not None:
+            on_progress(p)
+
+    with ProcessPoolExecutor(
+        max_workers=workers or min(n, os.cpu_count() or 1), mp_context=ctx,
+        initializer=_init_worker, initargs=(grid.occ, grid.spec.tile_size, progress, best),
+    ) as pool:
+        futures: List[Future] = [
+            pool.submit(_run_variant, i, cfg, start, start_theta, slice_s, min_coverage)
+            for i, cfg in enumerate(configs)
+        ]
+        collected: Set[int] = set()
+        while len(collected) < n:
+            try:
+                emit(progress.get(timeout=0.05))
+            except queue.Empty:
+                pass
+            for i, f in enumerate(futures):
+                if i in collected or not f.done():
+                    continue
+                if f.exception() is not None:
+                    # the worker died or raised: no final message will come
+                    collected.add(i)
+                    emit(RaceProgress(i, FAILED, 0, 0.0, 0.0, error=repr(f.exception())))
+                elif outcomes[i] is not None:
+                    # collect only after the final message, so progress stays in order
+                    collected.add(i)
+                    results[i] = f.result()[1]
+
+    def rank(i: int) -> Tuple:
+        o = outcomes[i]
+        if o.coverage_rate >= min_coverage:
+            return (0, o.path_length, i)
+        return (1, -o.coverage_rate, o.path_length, i)
+
+    finished = [i for i in range(n) if outcomes[i].status == FINISHED and results[i] is not None]
+    winner = min(finished, key=rank) if finished else None
+    return RaceResult(
+        winner=winner,
+        cfg=configs[winner] if winner is not None else None,
+        result=results[winner] if winner is not None else None,
+        outcomes=outcomes,
+    )
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import warnings
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .grid_map import GridMap, Coord
+from .ba_star import BAStarPlanner, BAStarConfig, RunResult
+from .runlog import load_run_log, run_result_from_log, save_run_log
+
+
+# bump when the on-disk layout changes
+CACHE_FORMAT = 3
+
+# planner sources that determine a run; editing any of them invalidates the cache
+_PLANNER_SOURCES = ("ba_star.py", "astar.py", "smoothing.py", "grid_map.py", "sensing.py", "runlog.py", "quadtree.py", "backends.py", "spatial_index.py")
+
+
+def run_key(grid: GridMap, start_cell: Coord, start_theta: float, cfg: BAStarConfig) -> str:
+    """
+    Content hash of everything BAStarPlanner.run() depends on.
+    """
+    h = hashlib.sha256()
+    h.update(f"format{CACHE_FORMAT}".encode())
+    here = Path(__file__).parent
+    for name in _PLANNER_SOURCES:
+        h.update((here / name).read_bytes())
+    h.update(f"{grid.occ.shape}{grid.spec.tile_size}".encode())
+    h.update(np.ascontiguousarray(grid.occ).tobytes())
+    # every compute backend gives the same run
+    fields = {k: v for k, v in dataclasses.asdict(cfg).items() if k != "compute_backend"}
+    h.update(json.dumps([list(start_cell), float(start_theta), fields], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class RunCache:
+    """
+    Persistent RunResult store: one compressed run log (see runlog) per key in a directory.
+
+    Reads refresh the entry's mtime; after each write the least recently used entries are
+    removed until the directory fits max_bytes and max_entries. Unreadable entries count as
+    misses and are deleted; a run whose log alone exceeds max_bytes is not stored.
+    """
+    def __init__(self, directory: str, max_bytes: int = 256 * 2**20, max_entries: Optional[int] = None):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[RunResult]:
+        path = self._path(key)
+        try:
+            res = run_result_from_log(load_run_log(path, mmap=False))
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile, zlib.error):
+            # truncated or corrupt (e.g. an interrupted copy): drop it so the run is redone
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return None
+        os.utime(path)
+        return res
+
+    def put(self, key: str, res: RunResult) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        save_run_log(tmp, res, compress=True)
+        size = tmp.stat().st_size
+        if size > self.max_bytes:
+            tmp.unlink()
+            warnings.warn(f"run log of {size} bytes exceeds the cache's max_bytes ({self.max_bytes}); not cached", RuntimeWarning, stacklevel=2)
+            return
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path) -> None:
+        # keep (the entry just written) is never evicted, even when its mtime ties an older one
+        entries = []
+        total, count = 0, 0
+        for p in self.dir.glob("*.npz"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            total += st.st_size
+            count += 1
+            if p != keep:
+                entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        while entries and (total > self.max_bytes or (self.max_entries is not None and count > self.max_entries)):
+            _, size, p = entries.pop(0)
+            p.unlink(missing_ok=True)
+            total -= size
+            count -= 1
+
+
+def cached_run(grid: GridMap, start_cell: Coord, start_theta: float = 0.0, cfg: Optional[BAStarConfig] = None, cache: Optional[RunCache] = None) -> RunResult:
+    """
+    BAStarPlanner(...).run(), memoized in cache when one is given.
+    """
+    cfg = cfg or BAStarConfig()
+    if cache is None:
+        return BAStarPlanner(grid, start_cell, start_theta, cfg=cfg).run()
+    key = run_key(grid, start_cell, start_theta, cfg)
+    res = cache.get(key)
+    if res is None:
+        res = BAStarPlanner(grid, start_cell, start_theta, cfg=cfg).run()
+        cache.put(key, res)
+    return res
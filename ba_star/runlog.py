@@ -0,0 +1,151 @@
+"""
+Columnar run log: a RunResult as flat NumPy arrays in one .npz.
+
+Keys (cells are int32 (x, y) rows, E = number of events):
+- trajectory, covered, known_obstacles: (n, 2)
+- steps, coverage_rate, path_length, num_backtracks: 0-d
+- ev_s_cp, ev_s_sp: (E, 2), s_sp = (-1, -1) when None
+- ev_traj_index, ev_num_candidates, ev_astar_len, ev_smooth_len: (E,)
+- candidates, astar_path, smooth_path: all events' cells concatenated, (sum, 2);
+  empty for events recorded at the SUMMARY level, whose counts are still in the ev_* columns
+- candidates_offsets, astar_path_offsets, smooth_path_offsets: (E + 1,); event i owns
+  rows offsets[i]:offsets[i + 1]
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import zipfile
+from typing import Dict, List, Mapping, Union
+
+import numpy as np
+
+from .grid_map import Coord
+from .ba_star import BacktrackEvent, RunResult
+
+
+_PATHS = ("candidates", "astar_path", "smooth_path")
+_COUNT_COLUMNS = {"candidates": "num_candidates", "astar_path": "astar_len", "smooth_path": "smooth_len"}
+
+
+def _cells(cells) -> np.ndarray:
+    return np.array(list(cells), dtype=np.int32).reshape(-1, 2)
+
+
+def _as_coords(a: np.ndarray) -> List[Coord]:
+    return list(map(tuple, np.asarray(a).tolist()))
+
+
+def run_log_arrays(res: RunResult) -> Dict[str, np.ndarray]:
+    events = res.events
+    arrays: Dict[str, np.ndarray] = {
+        "trajectory": _cells(res.trajectory_cells),
+        "covered": _cells(res.covered_cells),
+        "known_obstacles": _cells(res.known_obstacles),
+        "steps": np.array(res.steps, dtype=np.int64),
+        "coverage_rate": np.array(res.coverage_rate, dtype=np.float64),
+        "path_length": np.array(res.path_length, dtype=np.float64),
+        "num_backtracks": np.array(res.num_backtracks, dtype=np.int64),
+        "ev_s_cp": _cells(e.s_cp for e in events),
+        "ev_s_sp": _cells(e.s_sp if e.s_sp is not None else (-1, -1) for e in events),
+        "ev_traj_index": np.array([e.traj_index for e in events], dtype=np.int64),
+    }
+    for name in _PATHS:
+        lengths = np.array([len(getattr(e, name)) for e in events], dtype=np.int64)
+        offsets = np.zeros(len(events) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        arrays[name] = _cells(c for e in events for c in getattr(e, name))
+        arrays[f"{name}_offsets"] = offsets
+        count = _COUNT_COLUMNS[name]
+        arrays[f"ev_{count}"] = np.array([getattr(e, count) for e in events], dtype=np.int64)
+    return arrays
+
+
+def save_run_log(path: Union[str, os.PathLike], res: RunResult, compress: bool = False) -> None:
+    """
+    Write the run log. Uncompressed logs (the default) can be memory-mapped by load_run_log.
+    """
+    save = np.savez_compressed if compress else np.savez
+    with open(path, "wb") as f:
+        save(f, **run_log_arrays(res))
+
+
+def _memmap_npz(path: Union[str, os.PathLike]) -> Dict[str, np.ndarray]:
+    out: Dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    out[name] = np.lib.format.read_array(member)
+                continue
+            # member data follows the 30-byte local header, the file name and the extra field
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{name}: object arrays are not supported")
+            if int(np.prod(shape)) == 0:
+                out[name] = np.empty(shape, dtype=dtype)
+            else:
+                out[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order="F" if fortran else "C")
+    return out
+
+
+def load_run_log(path: Union[str, os.PathLike], mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Load a run log as a dict of arrays. With mmap=True, uncompressed members are
+    memory-mapped read-only instead of read into memory.
+    """
+    if mmap:
+        return _memmap_npz(path)
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+def event_slice(log: Mapping[str, np.ndarray], name: str, i: int) -> np.ndarray:
+    """
+    Cells of path `name` ("candidates", "astar_path" or "smooth_path") for event i.
+    """
+    off = log[f"{name}_offsets"]
+    return log[name][off[i]:off[i + 1]]
+
+
+def run_result_from_log(log: Mapping[str, np.ndarray]) -> RunResult:
+    def ragged(name: str) -> List[List[Coord]]:
+        off = np.asarray(log[f"{name}_offsets"]).tolist()
+        cells = _as_coords(log[name])
+        return [cells[off[i]:off[i + 1]] for i in range(len(off) - 1)]
+
+    cands, apaths, spaths = (ragged(n) for n in _PATHS)
+    s_sps = _as_coords(log["ev_s_sp"])
+    events = [
+        BacktrackEvent(
+            s_cp=s_cp,
+            candidates=cands[i],
+            s_sp=None if s_sps[i] == (-1, -1) else s_sps[i],
+            astar_path=apaths[i],
+            smooth_path=spaths[i],
+            traj_index=int(log["ev_traj_index"][i]),
+            num_candidates=int(log["ev_num_candidates"][i]),
+            astar_len=int(log["ev_astar_len"][i]),
+            smooth_len=int(log["ev_smooth_len"][i]),
+        )
+        for i, s_cp in enumerate(_as_coords(log["ev_s_cp"]))
+    ]
+    return RunResult(
+        trajectory_cells=_as_coords(log["trajectory"]),
+        covered_cells=set(_as_coords(log["covered"])),
+        known_obstacles=set(_as_coords(log["known_obstacles"])),
+        events=events,
+        steps=int(log["steps"]),
+        coverage_rate=float(log["coverage_rate"]),
+        path_length=float(log["path_length"]),
+        num_backtracks=int(log["num_backtracks"]),
+    )
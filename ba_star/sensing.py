@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+
+from .grid_map import GridMap, Coord, bresenham_line
+
+
+@dataclass(frozen=True)
+class RayTable:
+    """
+    Precomputed raycast offsets for a disc-shaped range sensor.
+
+    - targets[k] = (dx, dy) offset of the k-th cell inside the sensing disc
+    - rays[k, i] = i-th Bresenham offset from (0, 0) towards targets[k],
+      padded with the target offset itself up to the longest ray
+    - occluders[k, i] is True for the cells strictly between the sensor and the target
+    """
+    radius: int
+    targets: np.ndarray    # (K, 2) int
+    rays: np.ndarray       # (K, Lmax, 2) int
+    occluders: np.ndarray  # (K, Lmax) bool
+
+
+@lru_cache(maxsize=None)
+def build_ray_table(radius: int) -> RayTable:
+    if radius < 0:
+        raise ValueError("radius must be non-negative")
+    offsets: List[Coord] = [
+        (dx, dy)
+        for dy in range(-radius, radius + 1)
+        for dx in range(-radius, radius + 1)
+        if dx * dx + dy * dy <= radius * radius
+    ]
+    lines = [bresenham_line((0, 0), o) for o in offsets]
+    lmax = max(len(l) for l in lines)
+
+    rays = np.empty((len(offsets), lmax, 2), dtype=np.int64)
+    occluders = np.zeros((len(offsets), lmax), dtype=bool)
+    for k, line in enumerate(lines):
+        n = len(line)
+        rays[k, :n] = line
+        rays[k, n:] = line[-1]
+        # the sensor cell itself and the target never occlude the target
+        occluders[k, 1:n-1] = True
+    return RayTable(
+        radius=radius,
+        targets=np.array(offsets, dtype=np.int64).reshape(-1, 2),
+        rays=rays,
+        occluders=occluders,
+    )
+
+
+def range_scan(grid: GridMap, c: Coord, table: RayTable) -> np.ndarray:
+    """
+    Cells visible from c within the table radius, as an (M, 2) array of (x, y).
+    A target is visible if it is in bounds and no obstacle lies strictly between c and it;
+    out-of-bounds cells on a ray occlude like obstacles.
+    """
+    x, y = c
+    xs = table.rays[..., 0] + x
+    ys = table.rays[..., 1] + y
+    inb = (xs >= 0) & (xs < grid.w) & (ys >= 0) & (ys < grid.h)
+    blocked = np.ones(xs.shape, dtype=bool)
+    blocked[inb] = grid.occ[ys[inb], xs[inb]] != 0
+    visible = ~np.any(blocked & table.occluders, axis=1)
+
+    tx = table.targets[:, 0] + x
+    ty = table.targets[:, 1] + y
+    visible &= (tx >= 0) & (tx < grid.w) & (ty >= 0) & (ty < grid.h)
+    return np.stack([tx[visible], ty[visible]], axis=1)
+
+
+def range_scan_obstacles(grid: GridMap, c: Coord, table: RayTable) -> List[Coord]:
+    """
+    Obstacle cells visible from c, ready to be written into the discovered map.
+    """
+    vis = range_scan(grid, c, table)
+    obs = vis[grid.occ[vis[:, 1], vis[:, 0]] != 0]
+    return list(zip(obs[:, 0].tolist(), obs[:, 1].tolist()))
+
+
+def range_scan_split(grid: GridMap, c: Coord, table: RayTable) -> Tuple[List[Coord], List[Coord]]:
+    """
+    Visible cells from c split into (obstacles, free).
+    """
+    vis = range_scan(grid, c, table)
+    is_obs = grid.occ[vis[:, 1], vis[:, 0]] != 0
+    obs = vis[is_obs]
+    free = vis[~is_obs]
+    return (
+        list(zip(obs[:, 0].tolist(), obs[:, 1].tolist())),
+        list(zip(free[:, 0].tolist(), free[:, 1].tolist())),
+    )
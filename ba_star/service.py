@@ -0,0 +1,436 @@
+"""
+Local planning service: an asyncio server around BAStarPlanner.
+
+Wire protocol (newline-delimited JSON, over a Unix socket or localhost TCP):
+
+request   {"id": ..., "map": {...}, "start": [x, y], "start_theta": 0.0, "config": {...}}
+replies   {"id": ..., "type": "moves", "offset": k, "cells": [[x, y], ...]}   (chunks, in order)
+          {"id": ..., "type": "event", "index": i, "event": {...}}         (one per BacktrackEvent)
+          {"id": ..., "type": "done", "summary": {...}}
+          {"id": ..., "type": "error", "error": "..."}
+
+"map" is {"scenario": "unified"}, {"scenario": "random", "width": .., "height": .., "seed": ..},
+or {"image": path} with optional "pixel_size"/"tile_size"/"obstacle_fraction" (block-reduced
+loading, see GridMap.from_image_tiles). "config" holds BAStarConfig fields.
+
+Replies stream while planning: workers advance each planner in run_for() slices and send the
+moves and events of every slice back as they are produced. Requests arriving within
+batch_window of each other that share a map and config form a group, which is spread over up
+to `workers` worker tasks. The requests in one task take slices in turn on the same warm map,
+so they share that worker's time: a long request delays the others in its task, but never
+blocks the pool. Workers keep loaded and inflated maps in an LRU cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .ba_star import BAStarConfig, BAStarPlanner, RunResult
+from .grid_map import GridMap
+
+
+MOVES_CHUNK = 4096  # cells per "moves" message
+SLICE_S = 0.02  # planning time per run_for() slice in the workers
+
+# per-worker-process state, set up by _init_worker
+_maps: "OrderedDict[str, GridMap]" = OrderedDict()
+_map_cache_size = 8
+_replies: Any = None  # multiprocessing queue back to the server process
+
+
+def _init_worker(map_cache_size: int, replies: Any) -> None:
+    global _map_cache_size, _replies
+    _map_cache_size = map_cache_size
+    _replies = replies
+
+
+def map_key(spec: Dict[str, Any]) -> str:
+    """
+    Cache key of a map spec; image maps include the file's mtime and size so edits reload it.
+    """
+    spec = dict(spec)
+    if "image" in spec:
+        st = os.stat(spec["image"])
+        spec["_stat"] = [st.st_mtime_ns, st.st_size]
+    return json.dumps(spec, sort_keys=True)
+
+
+def load_map(spec: Dict[str, Any]) -> GridMap:
+    if "image" in spec:
+        if "pixel_size" in spec:
+            return GridMap.from_image_tiles(
+                spec["image"],
+                pixel_size=float(spec["pixel_size"]),
+                tile_size=float(spec.get("tile_size", spec["pixel_size"])),
+                obstacle_fraction=float(spec.get("obstacle_fraction", 0.0)),
+            )
+        return GridMap.from_binary_image(spec["image"], tile_size=float(spec.get("tile_size", 1.0)))
+    from .scenarios import make_random_scenario, make_unified_scenario
+    name = spec.get("scenario")
+    if name == "unified":
+        return make_unified_scenario().grid
+    if name == "random":
+        return make_random_scenario(
+            int(spec.get("width", 90)), int(spec.get("height", 90)),
+            float(spec.get("obstacle_prob", 0.18)), spec.get("seed"),
+        ).grid
+    raise ValueError(f"unknown map spec: {spec}")
+
+
+def _warm_map(spec: Dict[str, Any], radius: float, shape: str) -> GridMap:
+    # loaded and inflated maps, least recently used evicted first
+    key = f"{map_key(spec)}|{radius}|{shape.upper()}"
+    grid = _maps.get(key)
+    if grid is None:
+        if radius > 0:
+            grid = _warm_map(spec, 0, "SQUARE").inflate_obstacles(radius, shape)
+        else:
+            grid = load_map(spec)
+        grid.precompute()
+        _maps[key] = grid
+        while len(_maps) > _map_cache_size:
+            _maps.popitem(last=False)
+    else:
+        _maps.move_to_end(key)
+    return grid
+
+
+def _summary(res: RunResult) -> Dict[str, Any]:
+    return {
+        "steps": res.steps,
+        "coverage_rate": res.coverage_rate,
+        "path_length": res.path_length,
+        "num_backtracks": res.num_backtracks,
+        "num_events": len(res.events),
+    }
+
+
+def _event_dict(e) -> Dict[str, Any]:
+    d = dataclasses.asdict(e)
+    for k, v in d.items():
+        if isinstance(v, tuple):
+            d[k] = list(v)
+        elif isinstance(v, list):
+            d[k] = [list(c) for c in v]
+    return d
+
+
+def plan_stream(token: int, spec: Dict[str, Any], config: Dict[str, Any], starts: List[Tuple[Tuple[int, int], float]], slice_s: float = SLICE_S) -> None:
+    """
+    Plan every (start, start_theta) on one map with one config; runs in a worker process.
+    The planners take run_for() slices in turn, and each slice's output is put on the reply
+    queue as (token, i, message) with message a reply without its "id"; (token, None, None)
+    ends the task.
+    """
+    try:
+        cfg = BAStarConfig(**config)
+        grid = _warm_map(spec, cfg.inflate_obstacles, cfg.inflate_shape)
+        # the warm map is already inflated
+        cfg = dataclasses.replace(cfg, inflate_obstacles=0)
+        planners: Dict[int, BAStarPlanner] = {}
+        for i, (s, theta) in enumerate(starts):
+            if grid.in_bounds(s) and grid.is_free(s):
+                planners[i] = BAStarPlanner(grid, s, theta, cfg=cfg)
+                _send_moves(token, i, 0, [s])
+            else:
+                _replies.put((token, i, {"type": "error", "error": "start_cell must be free in the map"}))
+        offsets = {i: 1 for i in planners}
+        events_sent = {i: 0 for i in planners}
+        last_event: Dict[int, Any] = {}
+        while planners:
+            for i, p in list(planners.items()):
+                inc = p.run_for(slice_s)
+                _send_moves(token, i, offsets[i], inc.moves)
+                offsets[i] += len(inc.moves)
+                for ev in _new_events(p, last_event.get(i)):
+                    _replies.put((token, i, {"type": "event", "index": events_sent[i], "event": _event_dict(ev)}))
+                    events_sent[i] += 1
+                    last_event[i] = ev
+                if inc.done:
+                    _replies.put((token, i, {"type": "done", "summary": _summary(p.result())}))
+                    del planners[i]
+    finally:
+        _replies.put((token, None, None))
+
+
+def _send_moves(token: int, i: int, offset: int, cells: List[Tuple[int, int]]) -> None:
+    for k in range(0, len(cells), MOVES_CHUNK):
+        chunk = [list(c) for c in cells[k:k + MOVES_CHUNK]]
+        _replies.put((token, i, {"type": "moves", "offset": offset + k, "cells": chunk}))
+
+
+def _new_events(p: BAStarPlanner, last: Any) -> List[Any]:
+    # events recorded after `last`; p.events is bounded by max_events, so look it up by identity
+    evs = list(p.events)
+    if last is None:
+        return evs
+    for k in range(len(evs) - 1, -1, -1):
+        if evs[k] is last:
+            return evs[k + 1:]
+    return evs
+
+
+@dataclasses.dataclass
+class _Pending:
+    request_id: Any
+    spec: Dict[str, Any]
+    config: Dict[str, Any]
+    start: Tuple[int, int]
+    start_theta: float
+    writer: asyncio.StreamWriter
+
+
+class PlanningServer:
+    """
+    Serves plan requests from local clients (see the module docstring for the protocol).
+    """
+    def __init__(self, workers: Optional[int] = None, map_cache_size: int = 8, batch_window: float = 0.005, max_batch: int = 64, slice_s: float = SLICE_S):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.map_cache_size = map_cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.slice_s = slice_s
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: "asyncio.Queue[_Pending]" = asyncio.Queue()
+        self._batcher: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+        self._replies: Any = None
+        self._reply_thread: Optional[threading.Thread] = None
+        self._groups: Dict[int, "asyncio.Queue[Tuple[Optional[int], Optional[Dict[str, Any]]]]"] = {}
+        self._next_token = 0
+
+    @property
+    def worker_tasks(self) -> int:
+        """
+        Number of worker tasks submitted so far (each plans one share of a request group).
+        """
+        return self._next_token
+
+    async def start(self, socket_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0) -> Any:
+        """
+        Start listening on socket_path (Unix socket) or host:port; returns the bound address.
+        """
+        # spawned, not forked: forked workers would inherit client sockets and keep them open
+        ctx = multiprocessing.get_context("spawn")
+        self._replies = ctx.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(self.map_cache_size, self._replies),
+        )
+        loop = asyncio.get_running_loop()
+        self._reply_thread = threading.Thread(target=self._reply_loop, args=(loop,), name="plan-replies", daemon=True)
+        self._reply_thread.start()
+        if socket_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=socket_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None, "call start() first"
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        for t in list(self._tasks):
+            t.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        if self._reply_thread is not None:
+            self._replies.put(None)
+            self._reply_thread.join()
+
+    def _reply_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        # reply-queue reader thread: hands worker messages to the group they belong to
+        while True:
+            item = self._replies.get()
+            if item is None:
+                return
+            token, i, msg = item
+            loop.call_soon_threadsafe(self._deliver, token, i, msg)
+
+    def _deliver(self, token: int, i: Optional[int], msg: Optional[Dict[str, Any]]) -> None:
+        q = self._groups.get(token)
+        if q is not None:
+            q.put_nowait((i, msg))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                req = None
+                try:
+                    req = json.loads(line)
+                    if not isinstance(req, dict):
+                        raise ValueError("request must be a JSON object")
+                    pending = _Pending(
+                        request_id=req.get("id"),
+                        spec=dict(req["map"]),
+                        config=dict(req.get("config") or {}),
+                        start=(int(req["start"][0]), int(req["start"][1])),
+                        start_theta=float(req.get("start_theta", 0.0)),
+                        writer=writer,
+                    )
+                    BAStarConfig(**pending.config)  # reject unknown fields early
+                except (ValueError, KeyError, TypeError, IndexError, AttributeError) as e:
+                    rid = req.get("id") if isinstance(req, dict) else None
+                    await self._send(writer, {"id": rid, "type": "error", "error": f"bad request: {e}"})
+                    continue
+                await self._queue.put(pending)
+        finally:
+            # replies still in flight go to a closed writer and are dropped
+            writer.close()
+
+    async def _batch_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            groups: Dict[Tuple[str, str], List[_Pending]] = {}
+            for p in batch:
+                try:
+                    key = (map_key(p.spec), json.dumps(p.config, sort_keys=True))
+                except OSError as e:
+                    await self._send(p.writer, {"id": p.request_id, "type": "error", "error": str(e)})
+                    continue
+                groups.setdefault(key, []).append(p)
+            for group in groups.values():
+                # round-robin over the workers, so one long request only delays its own share
+                n = min(len(group), self.workers)
+                for k in range(n):
+                    task = asyncio.create_task(self._run_group(group[k::n]))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+    async def _run_group(self, group: List[_Pending]) -> None:
+        token = self._next_token
+        self._next_token += 1
+        q: "asyncio.Queue[Tuple[Optional[int], Optional[Dict[str, Any]]]]" = asyncio.Queue()
+        self._groups[token] = q
+        starts = [(p.start, p.start_theta) for p in group]
+        future = asyncio.wrap_future(self._pool.submit(plan_stream, token, group[0].spec, group[0].config, starts, self.slice_s))
+        # the worker's end marker may never come if its process dies
+        future.add_done_callback(lambda f: f.cancelled() or f.exception() is None or q.put_nowait((None, None)))
+        finished = set()
+        try:
+            while True:
+                i, msg = await q.get()
+                if i is None:
+                    break
+                if msg["type"] in ("done", "error"):
+                    finished.add(i)
+                await self._send(group[i].writer, {"id": group[i].request_id, **msg})
+            await future
+        except Exception as e:  # worker failures are reported to every client still waiting
+            for i, p in enumerate(group):
+                if i not in finished:
+                    await self._send(p.writer, {"id": p.request_id, "type": "error", "error": f"{type(e).__name__}: {e}"})
+        finally:
+            del self._groups[token]
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, msg: Dict[str, Any]) -> None:
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(msg).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+class PlanClient:
+    """
+    Client for PlanningServer. Several plan() calls may run concurrently on one connection.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader, self._writer = reader, writer
+        self._queues: Dict[Any, asyncio.Queue] = {}
+        self._next_id = 0
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, socket_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8765) -> "PlanClient":
+        if socket_path:
+            reader, writer = await asyncio.open_unix_connection(socket_path, limit=2**24)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=2**24)
+        return cls(reader, writer)
+
+    async def _read_loop(self) -> None:
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            msg = json.loads(line)
+            q = self._queues.get(msg.get("id"))
+            if q is not None:
+                q.put_nowait(msg)
+        for q in self._queues.values():
+            q.put_nowait({"type": "error", "error": "connection closed"})
+
+    async def plan(self, map_spec: Dict[str, Any], start: Tuple[int, int], start_theta: float = 0.0, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send one request and yield its reply messages until "done" or "error".
+        """
+        rid = self._next_id
+        self._next_id += 1
+        q: asyncio.Queue = asyncio.Queue()
+        self._queues[rid] = q
+        req = {"id": rid, "map": map_spec, "start": list(start), "start_theta": start_theta, "config": config or {}}
+        self._writer.write(json.dumps(req).encode() + b"\n")
+        await self._writer.drain()
+        try:
+            while True:
+                msg = await q.get()
+                yield msg
+                if msg["type"] in ("done", "error"):
+                    return
+        finally:
+            del self._queues[rid]
+
+    async def plan_result(self, map_spec: Dict[str, Any], start: Tuple[int, int], start_theta: float = 0.0, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        plan() collected into {"trajectory", "events", "summary"}; raises RuntimeError on an error reply.
+        """
+        traj: List[List[int]] = []
+        events: List[Dict[str, Any]] = []
+        async for msg in self.plan(map_spec, start, start_theta, config):
+            if msg["type"] == "moves":
+                traj.extend(msg["cells"])
+            elif msg["type"] == "event":
+                events.append(msg["event"])
+            elif msg["type"] == "error":
+                raise RuntimeError(msg["error"])
+            else:
+                return {"trajectory": traj, "events": events, "summary": msg["summary"]}
+        raise RuntimeError("no reply")
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        # the server closes its end once it sees ours close
+        await self._reader_task
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional
 from .grid_map import GridMap, Coord
 
 
@@ -12,11 +12,14 @@ class SmoothResult:
     removed: int
 
 
-def astar_spt_smooth(grid: GridMap, path: List[Coord]) -> SmoothResult:
+def astar_spt_smooth(grid: GridMap, path: List[Coord], los_fn: Optional[Callable[[Coord, Coord], bool]] = None) -> SmoothResult:
     """
     A simplified A*SPT-like smoothing:
     greedily jump to the farthest line-of-sight point along the A* path.
+    los_fn overrides grid.line_of_sight (e.g. a cached or discovered-map test).
     """
+    if los_fn is None:
+        los_fn = grid.line_of_sight
     if not path:
         return SmoothResult(path=[], removed=0)
     if len(path) <= 2:
@@ -31,7 +34,7 @@ def astar_spt_smooth(grid: GridMap, path: List[Coord]) -> SmoothResult:
         # choose farthest visible j
         j = n - 1
         while j > i + 1:
-            if grid.line_of_sight(path[i], path[j]):
+            if los_fn(path[i], path[j]):
                 break
             j -= 1
         # if nothing found, fall back to immediate neighbor
@@ -0,0 +1,100 @@
+"""
+Bucketed grid index over a changing set of cells, for nearest-neighbour queries.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Set, Tuple
+
+from .grid_map import Coord
+
+
+class BucketIndex:
+    """
+    Cells hashed into square buckets of 2**shift cells. nearest() searches rings of buckets
+    outward from the query and stops once no unvisited ring can hold a closer cell.
+    """
+    def __init__(self, shift: int = 3):
+        self.shift = shift
+        self._buckets: Dict[Tuple[int, int], Set[Coord]] = {}
+        self._n = 0
+        # bounding box of buckets ever used, limits the ring search
+        self._bx0 = self._by0 = 0
+        self._bx1 = self._by1 = -1
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __contains__(self, c: Coord) -> bool:
+        b = self._buckets.get((c[0] >> self.shift, c[1] >> self.shift))
+        return b is not None and c in b
+
+    def __iter__(self) -> Iterator[Coord]:
+        for b in self._buckets.values():
+            yield from b
+
+    def add(self, c: Coord) -> None:
+        key = (c[0] >> self.shift, c[1] >> self.shift)
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = set()
+            if self._bx1 < self._bx0:
+                self._bx0, self._by0, self._bx1, self._by1 = key[0], key[1], key[0], key[1]
+            else:
+                self._bx0, self._bx1 = min(self._bx0, key[0]), max(self._bx1, key[0])
+                self._by0, self._by1 = min(self._by0, key[1]), max(self._by1, key[1])
+        if c not in b:
+            b.add(c)
+            self._n += 1
+
+    def discard(self, c: Coord) -> None:
+        key = (c[0] >> self.shift, c[1] >> self.shift)
+        b = self._buckets.get(key)
+        if b is not None and c in b:
+            b.remove(c)
+            self._n -= 1
+            if not b:
+                del self._buckets[key]
+
+    def nearest(self, q: Coord) -> List[Coord]:
+        """
+        All cells at the minimum Euclidean distance from q (exact: squared integer distances).
+        """
+        if not self._n:
+            return []
+        qx, qy = q
+        qbx, qby = qx >> self.shift, qy >> self.shift
+        size = 1 << self.shift
+        r_max = max(qbx - self._bx0, self._bx1 - qbx, qby - self._by0, self._by1 - qby)
+        best = -1
+        tied: List[Coord] = []
+        for r in range(r_max + 1):
+            if best >= 0 and r >= 1:
+                # cells in ring r are at least (r - 1) * size + 1 away along one axis
+                gap = (r - 1) * size + 1
+                if gap * gap > best:
+                    break
+            for key in _ring(qbx, qby, r):
+                b = self._buckets.get(key)
+                if not b:
+                    continue
+                for c in b:
+                    d = (c[0] - qx) ** 2 + (c[1] - qy) ** 2
+                    if best < 0 or d < best:
+                        best, tied = d, [c]
+                    elif d == best:
+                        tied.append(c)
+        return tied
+
+
+def _ring(cx: int, cy: int, r: int) -> Iterator[Tuple[int, int]]:
+    # bucket keys at Chebyshev distance exactly r from (cx, cy)
+    if r == 0:
+        yield cx, cy
+        return
+    for x in range(cx - r, cx + r + 1):
+        yield x, cy - r
+        yield x, cy + r
+    for y in range(cy - r + 1, cy + r):
+        yield cx - r, y
+        yield cx + r, y
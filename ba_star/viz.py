@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional, Set, Tuple
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgb
+from matplotlib.patches import Patch
 
 from .grid_map import GridMap, Coord
 
@@ -47,6 +49,127 @@ def plot_trajectory(ax: plt.Axes, traj: List[Coord], linewidth: float = 1.3, lab
     ax.plot(xs, ys, linewidth=linewidth, label=label, color=color)
 
 
+def _cells_array(cells: Union[Iterable[Coord], np.ndarray]) -> np.ndarray:
+    if isinstance(cells, np.ndarray):
+        return cells.reshape(-1, 2).astype(np.int64, copy=False)
+    arr = np.array(list(cells), dtype=np.int64)
+    return arr.reshape(-1, 2)
+
+
+def _block_reduce(a: np.ndarray, f: int, how: str) -> np.ndarray:
+    # pad to a multiple of f, then reduce each f x f block
+    if f == 1:
+        return a
+    h, w = a.shape
+    p = np.zeros((-(-h // f) * f, -(-w // f) * f), dtype=a.dtype)
+    p[:h, :w] = a
+    blocks = p.reshape(p.shape[0] // f, f, p.shape[1] // f, f)
+    if how == "sum":
+        return blocks.sum(axis=(1, 3))
+    if how == "max":
+        return blocks.max(axis=(1, 3))
+    return blocks.mean(axis=(1, 3))
+
+
+def _blend(img: np.ndarray, alpha: np.ndarray, color: str) -> None:
+    a = np.clip(alpha, 0.0, 1.0)[..., None]
+    img[..., :3] = img[..., :3] * (1.0 - a) + np.array(to_rgb(color)) * a
+
+
+def raster_layers(
+    grid: GridMap,
+    covered: Optional[Union[Set[Coord], np.ndarray]] = None,
+    candidates: Optional[Union[Sequence[Coord], np.ndarray]] = None,
+    traj: Optional[Union[Sequence[Coord], np.ndarray]] = None,
+    max_pixels: Optional[int] = None,
+    covered_color: str = "C0",
+    candidate_color: str = "C1",
+    traj_color: str = "C3",
+) -> Tuple[np.ndarray, int]:
+    """
+    Compose the map and the run overlays into one RGBA image (rows = y, cols = x).
+
+    - covered cells are tinted with alpha 0.35 (same as overlay_cells)
+    - trajectory visits are counted per cell and shown as log-scaled density
+    - candidates are drawn opaque on top
+    If max_pixels is set and the map is larger, cells are block-reduced by an integer
+    factor f (returned) so the image is at most max_pixels on its longer side.
+    """
+    h, w = grid.occ.shape
+    f = 1
+    if max_pixels is not None and max(h, w) > max_pixels:
+        f = -(-max(h, w) // max_pixels)
+
+    occ = _block_reduce(grid.occ.astype(np.float32), f, "mean")
+    img = np.ones(occ.shape + (4,), dtype=np.float32)
+    img[..., :3] = (1.0 - occ)[..., None]  # gray_r: obstacles dark
+
+    def mask_of(cells) -> np.ndarray:
+        m = np.zeros((h, w), dtype=np.float32)
+        arr = _cells_array(cells)
+        if len(arr):
+            m[arr[:, 1], arr[:, 0]] = 1.0
+        return m
+
+    if covered is not None:
+        _blend(img, 0.35 * _block_reduce(mask_of(covered), f, "mean"), covered_color)
+    if traj is not None:
+        arr = _cells_array(traj)
+        if len(arr):
+            counts = np.bincount(arr[:, 1] * w + arr[:, 0], minlength=h * w).reshape(h, w)
+            dens = np.log1p(_block_reduce(counts, f, "sum").astype(np.float32))
+            _blend(img, 0.85 * dens / dens.max(), traj_color)
+    if candidates is not None:
+        _blend(img, _block_reduce(mask_of(candidates), f, "max"), candidate_color)
+    return img, f
+
+
+def plot_raster_run(
+    grid: GridMap,
+    ax: Optional[plt.Axes] = None,
+    covered: Optional[Union[Set[Coord], np.ndarray]] = None,
+    candidates: Optional[Union[Sequence[Coord], np.ndarray]] = None,
+    traj: Optional[Union[Sequence[Coord], np.ndarray]] = None,
+    title: Optional[str] = None,
+    max_pixels: Optional[int] = 1500,
+    legend: bool = True,
+):
+    """
+    Raster counterpart of plot_map + overlay_cells + plot_trajectory: a single imshow,
+    so drawing cost no longer grows with the number of covered cells or trajectory steps.
+    """
+    if ax is None:
+        fig, ax = plt.subplots(figsize=(7, 7))
+    img, f = raster_layers(grid, covered=covered, candidates=candidates, traj=traj, max_pixels=max_pixels)
+    ih, iw = img.shape[:2]
+    ax.imshow(img, origin="upper", interpolation="nearest", extent=(-0.5, iw * f - 0.5, ih * f - 0.5, -0.5))
+    ax.set_xlim(-0.5, grid.spec.width - 0.5)
+    ax.set_ylim(grid.spec.height - 0.5, -0.5)
+    ax.set_aspect("equal")
+    ax.set_xlabel("X (tile index)")
+    ax.set_ylabel("Y (tile index)")
+    if title:
+        ax.set_title(title)
+    if legend:
+        handles = _raster_handles(covered is not None, candidates is not None, traj is not None)
+        handles += ax.get_legend_handles_labels()[0]
+        if handles:
+            ax.legend(handles=handles, loc="lower left", framealpha=0.85)
+    return ax
+
+
+def _raster_handles(covered: bool, candidates: bool, traj: bool) -> List[Patch]:
+    # imshow layers have no legend entries, so use proxy patches
+    handles = []
+    if covered:
+        handles.append(Patch(color="C0", alpha=0.35, label="covered"))
+    if traj:
+        handles.append(Patch(color="C3", alpha=0.85, label="trajectory density"))
+    if candidates:
+        handles.append(Patch(color="C1", label="L candidates"))
+    return handles
+
+
 def highlight_point(ax: plt.Axes, c: Coord, marker: str = "o", size: float = 60.0, label: Optional[str] = None, color: Optional[str] = None, zorder: Optional[int] = None):
     ax.scatter([c[0] + 0.5], [c[1] + 0.5], s=size, marker=marker, label=label, color=color, zorder=zorder)
 
@@ -82,8 +205,15 @@ def plot_astar_vs_smooth(grid: GridMap, s_cp: Coord, s_sp: Coord, astar_path: Li
     save_fig(out_path)
 
 
-def plot_full_run(grid: GridMap, covered: Set[Coord], traj: List[Coord], out_path: str, title: str = "BA* run", start_point: Optional[Coord] = None):
+def plot_full_run(grid: GridMap, covered: Set[Coord], traj: List[Coord], out_path: str, title: str = "BA* run", start_point: Optional[Coord] = None, raster: bool = False, max_pixels: Optional[int] = 1500):
     fig, ax = plt.subplots(figsize=(7, 7))
+    if raster:
+        plot_raster_run(grid, ax=ax, traj=traj, title=title, max_pixels=max_pixels, legend=False)
+        if start_point is not None:
+            highlight_point(ax, start_point, marker="o", size=100.0, label="start", color="red", zorder=15)
+        ax.legend(handles=_raster_handles(False, False, True) + ax.get_legend_handles_labels()[0], loc="lower left", framealpha=0.85)
+        save_fig(out_path)
+        return
     plot_map(grid, ax=ax, title=title)
     # Draw trajectory first (lower layer)
     plot_trajectory(ax, traj, linewidth=1.2, label="trajectory")
@@ -93,3 +223,237 @@ def plot_full_run(grid: GridMap, covered: Set[Coord], traj: List[Coord], out_pat
         highlight_point(ax, start_point, marker="o", size=100.0, label="start", color="red", zorder=15)
     ax.legend(loc="lower left", framealpha=0.85)
     save_fig(out_path)
+
+
+def _event_starts(traj: np.ndarray, events) -> List[Tuple[int, object]]:
+    """
+    Trajectory index at which each backtracking event starts (the s_cp visit followed by
+    the smoothed path). Uses the recorded traj_index when present, otherwise searches forward
+    in growing windows, so the total cost is linear in the trajectory length.
+    Events that cannot be located are skipped.
+    """
+    out: List[Tuple[int, object]] = []
+    pos = 0
+    n = len(traj)
+    for ev in events:
+        if getattr(ev, "traj_index", -1) >= 0:
+            out.append((ev.traj_index, ev))
+            pos = ev.traj_index + 1
+            continue
+        tail = np.array(ev.smooth_path[1:], dtype=np.int64).reshape(-1, 2)
+        window = 4096
+        lo = pos
+        found = None
+        while lo < n and found is None:
+            hi = min(n, lo + window)
+            hits = np.nonzero((traj[lo:hi, 0] == ev.s_cp[0]) & (traj[lo:hi, 1] == ev.s_cp[1]))[0] + lo
+            for i in hits.tolist():
+                if np.array_equal(traj[i + 1:i + 1 + len(tail)], tail):
+                    found = i
+                    break
+            lo = hi
+            window *= 2
+        if found is not None:
+            out.append((found, ev))
+            pos = found + 1
+    return out
+
+
+def export_animation(
+    grid: GridMap,
+    traj: Union[Sequence[Coord], np.ndarray],
+    events,
+    out_path: str,
+    fps: int = 20,
+    steps_per_frame: Optional[int] = None,
+    max_frames: int = 600,
+    max_memory_mb: float = 512.0,
+    max_pixels: Optional[int] = 400,
+    figsize: Tuple[float, float] = (6, 6),
+    dpi: int = 100,
+    title: str = "BA* run",
+) -> int:
+    """
+    Write the run as a GIF (Pillow) or MP4 (ffmpeg, found through matplotlib's FFMpegWriter).
+
+    The figure is drawn once, without the map; the map raster is then painted into the saved
+    background (a persistent RGBA buffer) through a precomputed block-to-pixel mapping, and
+    each frame repaints only the blocks newly covered since the previous frame. Frames are
+    blitted: restore the background, draw the robot marker, the smoothed path of the latest
+    BacktrackEvent and the title, and pass the canvas pixels straight to the encoder.
+    steps_per_frame is raised automatically so that the frame count stays within max_frames
+    and, for GIFs (kept in memory until the end), within max_memory_mb.
+    Returns the number of frames written.
+    """
+    from matplotlib.animation import FFMpegWriter
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    arr = _cells_array(traj)
+    n = len(arr)
+    if n == 0:
+        raise ValueError("empty trajectory")
+    gif = str(out_path).lower().endswith(".gif")
+    if not gif and not FFMpegWriter.isAvailable():
+        raise ValueError("MP4 export needs ffmpeg; use a .gif output path instead")
+
+    base, f = raster_layers(grid, max_pixels=max_pixels)
+    img = base.copy()
+    visited = np.zeros(grid.occ.shape, dtype=bool)
+    counts = np.zeros(base.shape[:2], dtype=np.int32)
+    cov_rgb = np.array(to_rgb("C0"), dtype=np.float32)
+
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    budget = max_frames
+    if gif:
+        frame_bytes = figsize[0] * figsize[1] * dpi * dpi  # palette images
+        budget = max(1, min(budget, int(max_memory_mb * 2**20 // frame_bytes)))
+    stride = max(steps_per_frame or 1, -(-n // budget))
+
+    ax.set_xlim(-0.5, grid.spec.width - 0.5)
+    ax.set_ylim(grid.spec.height - 0.5, -0.5)
+    ax.set_aspect("equal")
+    ax.axis("off")
+    bt_line, = ax.plot([], [], linewidth=2.0, color="orange", label="backtracking path")
+    robot, = ax.plot([], [], "o", markersize=6, color="red", label="robot")
+    # below the map, so that it stays in the static background
+    fig.legend(handles=[bt_line, robot], loc="lower center", ncol=2, framealpha=0.85)
+    ax.set_title(title)
+    animated = (bt_line, robot, ax.title)
+    for a in animated:
+        a.set_animated(True)
+    rows, cols, by_row, bx_col = _raster_pixels(canvas, ax, base.shape[:2], f)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    pixels = np.asarray(background)
+    # first pixel row / column of every block, plus the end of the last one
+    r_at = np.searchsorted(by_row, np.arange(base.shape[0] + 1))
+    c_at = np.searchsorted(bx_col, np.arange(base.shape[1] + 1))
+    rgba8 = np.round(img * 255).astype(np.uint8)
+    pixels[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1] = rgba8[by_row[:, None], bx_col[None, :]]
+    rows0, cols0 = rows[0], cols[0]
+
+    starts = _event_starts(arr, events)
+    ev_i = 0
+    frames = 0
+    sink = _GifSink(out_path, fps) if gif else _FFMpegSink(out_path, fps, canvas.get_width_height())
+    try:
+        for lo in range(0, n, stride):
+            seg = arr[lo:lo + stride]
+            new = seg[~visited[seg[:, 1], seg[:, 0]]]
+            if len(new):
+                new = np.unique(new, axis=0)
+                visited[new[:, 1], new[:, 0]] = True
+                by, bx = new[:, 1] // f, new[:, 0] // f
+                np.add.at(counts, (by, bx), 1)
+                blk = np.unique(np.stack([by, bx], axis=1), axis=0)
+                by, bx = blk[:, 0], blk[:, 1]
+                a = (0.35 * counts[by, bx] / (f * f))[:, None]
+                img[by, bx, :3] = base[by, bx, :3] * (1.0 - a) + cov_rgb * a
+                color = np.round(img[by, bx] * 255).astype(np.uint8)
+                for y, x, c in zip(by.tolist(), bx.tolist(), color):
+                    pixels[rows0 + r_at[y]:rows0 + r_at[y + 1], cols0 + c_at[x]:cols0 + c_at[x + 1]] = c
+
+            hi = lo + len(seg)
+            while ev_i < len(starts) and starts[ev_i][0] < hi:
+                xs, ys = _cell_centers(starts[ev_i][1].smooth_path)
+                bt_line.set_data(xs, ys)
+                ev_i += 1
+            x, y = arr[hi - 1]
+            robot.set_data([x + 0.5], [y + 0.5])
+            ax.set_title(f"{title} - step {hi - 1}/{n - 1}")
+
+            canvas.restore_region(background)
+            for a in animated:
+                ax.draw_artist(a)
+            sink.add(np.asarray(canvas.buffer_rgba()))
+            frames += 1
+        sink.finish()
+    finally:
+        sink.close()
+        plt.close(fig)
+    return frames
+
+
+def _raster_pixels(canvas, ax: plt.Axes, shape: Tuple[int, int], f: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Canvas pixels covered by the raster and the block each one shows, as imshow draws it:
+    (rows, cols, block row per row, block column per column), rows from the top of the canvas.
+    Found by drawing the raster once with each block's index encoded in its color.
+    """
+    h, w = shape
+    if h * w >= 2**24:
+        raise ValueError("raster too large to animate; set max_pixels")
+    idx = np.arange(1, h * w + 1, dtype=np.uint32).reshape(h, w)
+    code = np.empty((h, w, 4), dtype=np.uint8)
+    for k in range(3):
+        code[..., k] = (idx >> (8 * k)) & 255
+    code[..., 3] = 255
+    im = ax.imshow(code, origin="upper", interpolation="nearest", extent=(-0.5, w * f - 0.5, h * f - 0.5, -0.5))
+    colors = ax.figure.get_facecolor(), ax.get_facecolor()
+    ax.figure.set_facecolor("black")
+    ax.set_facecolor("black")
+    canvas.draw()
+    px = np.asarray(canvas.buffer_rgba())[..., :3].astype(np.int64)
+    got = px[..., 0] | (px[..., 1] << 8) | (px[..., 2] << 16)
+    # only the axes area: the legend and title are drawn outside it
+    bb = ax.get_window_extent()
+    height = got.shape[0]
+    got[:max(0, int(height - bb.y1) - 1)] = 0
+    got[int(np.ceil(height - bb.y0)) + 1:] = 0
+    got[:, :max(0, int(bb.x0) - 1)] = 0
+    got[:, int(np.ceil(bb.x1)) + 1:] = 0
+    im.remove()
+    ax.figure.set_facecolor(colors[0])
+    ax.set_facecolor(colors[1])
+    rows, cols = np.nonzero(got.any(axis=1))[0], np.nonzero(got.any(axis=0))[0]
+    block = got[rows[:, None], cols[None, :]] - 1
+    return rows, cols, block[:, 0] // w, block[0, :] % w
+
+
+class _GifSink:
+    # frames as Pillow palette images (fast octree quantization, one byte per pixel),
+    # written as one animated GIF at the end
+    def __init__(self, out_path: str, fps: int):
+        self.out_path = out_path
+        self.duration = int(1000 / fps)
+        self.frames: List = []
+
+    def add(self, rgba: np.ndarray) -> None:
+        from PIL import Image
+        self.frames.append(Image.fromarray(rgba).convert("RGB").quantize(method=Image.Quantize.FASTOCTREE))
+
+    def finish(self) -> None:
+        first, rest = self.frames[0], self.frames[1:]
+        first.save(self.out_path, save_all=True, append_images=rest, duration=self.duration, loop=0)
+
+    def close(self) -> None:
+        self.frames = []
+
+
+class _FFMpegSink:
+    # raw RGBA frames piped into an ffmpeg process
+    def __init__(self, out_path: str, fps: int, size: Tuple[int, int]):
+        import subprocess
+        from matplotlib.animation import FFMpegWriter
+        w, h = size
+        cmd = [
+            FFMpegWriter.bin_path(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+            # h264 needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-vcodec", "h264", "-pix_fmt", "yuv420p", str(out_path),
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def add(self, rgba: np.ndarray) -> None:
+        self.proc.stdin.write(rgba.tobytes())
+
+    def finish(self) -> None:
+        _, err = self.proc.communicate()
+        if self.proc.returncode:
+            raise RuntimeError(f"ffmpeg failed: {err.decode(errors='replace').strip()}")
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
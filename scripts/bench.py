@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path as _Path
+sys.path.append(str(_Path(__file__).resolve().parents[1]))
+import json
+import subprocess
+import time
+from pathlib import Path
+
+from ba_star.scenarios import make_random_scenario, make_unified_scenario
+from ba_star.ba_star import BAStarPlanner, BAStarConfig
+from ba_star.batch import BatchSimulator
+from ba_star.boustrophedon import BoustrophedonPlanner
+from ba_star.metrics import run_metrics
+from ba_star.profiling import profile_call
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# modules a planning-only process should never load
+HEAVY_MODULES = ("matplotlib", "PIL")
+
+_IMPORT_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": dt, "heavy": heavy}}))
+"""
+
+
+def measure_import(module: str, repeats: int = 3) -> dict:
+    """
+    Import time of module in a fresh interpreter (best of repeats), plus which heavy
+    dependencies the import pulled in.
+    """
+    best = None
+    for _ in range(repeats):
+        code = _IMPORT_PROBE.format(root=str(ROOT), module=module, heavy=HEAVY_MODULES)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        rec = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or rec["seconds"] < best["seconds"]:
+            best = rec
+    return best
+
+
+def timed_run(planner, label: str, profile_dir=None):
+    """
+    (planner.run() result, seconds); with profile_dir, profiled into <profile_dir>/<label>.prof
+    and .collapsed, with the report on stderr (seconds then include profiling overhead).
+    """
+    if profile_dir is None:
+        t0 = time.perf_counter()
+        res = planner.run()
+        return res, time.perf_counter() - t0
+    res, profile = profile_call(planner.run)
+    Path(profile_dir).mkdir(parents=True, exist_ok=True)
+    profile.write(Path(profile_dir) / label)
+    print(f"[{label}] {profile.report()}", file=sys.stderr)
+    return res, profile.seconds
+
+
+def bench_planning(repeats: int = 1, profile_dir=None) -> dict:
+    scenario = make_unified_scenario()
+    out = {}
+    for prefer_cost in ("A_STAR", "EUCLIDEAN"):
+        cfg = BAStarConfig(prefer_cost=prefer_cost)
+        best = float("inf")
+        label = f"unified_{prefer_cost.lower()}"
+        for _ in range(repeats):
+            res, dt = timed_run(BAStarPlanner(scenario.grid, scenario.start, scenario.start_theta, cfg=cfg), label, profile_dir)
+            best = min(best, dt)
+        out[label] = {
+            "seconds": best,
+            "steps": res.steps,
+            "coverage_rate": res.coverage_rate,
+        }
+    return out
+
+
+def bench_baseline(scenarios=None, profile_dir=None) -> dict:
+    """
+    BA* (default config) against the offline boustrophedon baseline on the same scenarios.
+    """
+    if scenarios is None:
+        scenarios = [make_unified_scenario()] + [make_random_scenario(40, 40, 0.05, seed=s) for s in range(3)]
+    out = {}
+    for sc in scenarios:
+        row = {}
+        for name, make in (
+            ("ba_star", lambda: BAStarPlanner(sc.grid, sc.start, sc.start_theta, cfg=BAStarConfig())),
+            ("boustrophedon", lambda: BoustrophedonPlanner(sc.grid, sc.start, sc.start_theta)),
+        ):
+            res, dt = timed_run(make(), f"{sc.name}_{name}", profile_dir)
+            m = run_metrics(res, sc.grid, curve_points=2)
+            row[name] = {
+                "seconds": dt,
+                "steps": res.steps,
+                "path_length": res.path_length,
+                "distance": m["distance"],  # path_length counts each smoothed backtracking jump as one move
+                "coverage_rate": res.coverage_rate,
+                "num_turns": m["num_turns"],
+                "overlap_ratio": m["overlap_ratio"],
+            }
+        out[sc.name] = row
+    return out
+
+
+def bench_batch(num_envs: int = 32, size: int = 24) -> dict:
+    """
+    BatchSimulator against one BAStarPlanner.run() per environment on num_envs random maps.
+    """
+    scenarios = [make_random_scenario(size, size, 0.08, seed=s) for s in range(num_envs)]
+    scenarios = [sc for sc in scenarios if sc.grid.is_free(sc.start)]
+    out = {}
+    for prefer_cost in ("A_STAR", "EUCLIDEAN"):
+        cfg = BAStarConfig(prefer_cost=prefer_cost)
+        t0 = time.perf_counter()
+        serial = [BAStarPlanner(sc.grid, sc.start, sc.start_theta, cfg=cfg).run() for sc in scenarios]
+        t1 = time.perf_counter()
+        batched = BatchSimulator(scenarios, cfg).run()
+        t2 = time.perf_counter()
+        out[prefer_cost.lower()] = {
+            "envs": len(scenarios),
+            "serial_seconds": t1 - t0,
+            "batch_seconds": t2 - t1,
+            "speedup": (t1 - t0) / (t2 - t1),
+            "identical": all(a.trajectory_cells == b.trajectory_cells for a, b in zip(serial, batched)),
+        }
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", type=str, default=None, help="Write results as JSON to this path")
+    ap.add_argument("--repeats", type=int, default=3, help="Best-of repeats for import and planning timings")
+    ap.add_argument("--skip_planning", action="store_true")
+    ap.add_argument("--skip_baseline", action="store_true", help="Skip the BA* vs boustrophedon comparison")
+    ap.add_argument("--skip_batch", action="store_true", help="Skip the BatchSimulator vs serial comparison")
+    ap.add_argument("--batch_envs", type=int, default=32, help="Environments in the BatchSimulator benchmark")
+    ap.add_argument("--profile", type=str, default=None, metavar="DIR", help="Profile every planning run into DIR (<run>.prof, <run>.collapsed) and print reports to stderr")
+    args = ap.parse_args()
+
+    results = {
+        "imports": {m: measure_import(m, args.repeats) for m in ("ba_star", "ba_star.ba_star", "ba_star.viz")},
+    }
+    if not args.skip_planning:
+        results["planning"] = bench_planning(args.repeats, args.profile)
+    if not args.skip_baseline:
+        results["baseline"] = bench_baseline(profile_dir=args.profile)
+    if not args.skip_batch:
+        results["batch"] = bench_batch(args.batch_envs)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+
+    # planning-only imports must stay headless
+    leaked = {m: r["heavy"] for m, r in results["imports"].items() if m != "ba_star.viz" and r["heavy"]}
+    if leaked:
+        print(f"planning imports pulled in heavy modules: {leaked}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,6 +13,7 @@ Each diagram illustrates a specific phase of the BA* robot planner:
 
 from __future__ import annotations
 
+import argparse
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -23,6 +24,8 @@ import matplotlib.patches as patches
 from matplotlib.patches import FancyArrowPatch, Circle, Rectangle, Wedge
 from pathlib import Path
 
+from ba_star.figures import FigureJob, run_figure_jobs
+
 
 # Configuration
 ROBOT_RADIUS = 5
@@ -399,21 +402,34 @@ def fig_phase6_execution():
     save_figure(fig, 'fig_phase6_execution')
 
 
+DIAGRAMS = [
+    fig_phase1_movement,
+    fig_phase2_tiling,
+    fig_phase3_stuck,
+    fig_phase4_list_construct,
+    fig_phase5_selection,
+    fig_phase6_execution,
+]
+
+
 def main():
     """Generate all unified example diagrams."""
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=None, help="Processes for rendering (default: one per diagram, up to CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-render diagrams even if this script did not change")
+    args = ap.parse_args()
+
     print("Generating Unified Example Diagrams...")
     print(f"Output directory: {OUTPUT_DIR}")
     print("-" * 50)
     
-    fig_phase1_movement()
-    fig_phase2_tiling()
-    fig_phase3_stuck()
-    fig_phase4_list_construct()
-    fig_phase5_selection()
-    fig_phase6_execution()
+    # Diagrams only depend on this script, so a diagram is skipped when the script's hash
+    # matches the one recorded for its existing output.
+    jobs = [FigureJob(str(OUTPUT_DIR / f"{fn.__name__}.png"), fn) for fn in DIAGRAMS]
+    rendered = run_figure_jobs(jobs, str(OUTPUT_DIR), workers=args.workers, force=args.force)
     
     print("-" * 50)
-    print("Done! Generated 6 diagrams.")
+    print(f"Done! Generated {len(rendered)} diagrams ({len(jobs) - len(rendered)} up to date).")
 
 
 if __name__ == "__main__":
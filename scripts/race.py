@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path as _Path
+sys.path.append(str(_Path(__file__).resolve().parents[1]))
+import dataclasses
+import itertools
+import json
+from pathlib import Path
+
+from ba_star.scenarios import make_random_scenario, make_unified_scenario
+from ba_star.ba_star import BAStarConfig
+from ba_star.racing import RUNNING, RaceProgress, race_configs
+from ba_star.runlog import save_run_log
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Race BAStarConfig variants (every combination of the lists below) on one map")
+    ap.add_argument("--random", type=int, nargs=2, default=None, metavar=("W", "H"), help="Random map instead of the unified scenario")
+    ap.add_argument("--obstacle_prob", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--sense", type=str, nargs="+", default=["N8"], choices=["N8", "N4", "RANGE", "NONE"])
+    ap.add_argument("--inflate", type=float, nargs="+", default=[0])
+    ap.add_argument("--prefer_cost", type=str, nargs="+", default=["A_STAR", "EUCLIDEAN"], choices=["A_STAR", "EUCLIDEAN"])
+    ap.add_argument("--max_steps", type=int, default=60000)
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per variant, up to CPU count)")
+    ap.add_argument("--min_coverage", type=float, default=1.0, help="Coverage a finished run needs to count (and to cancel longer ones)")
+    ap.add_argument("--quiet", action="store_true", help="Only print final states, not per-slice progress")
+    ap.add_argument("--log", type=str, default=None, help="Write the winning run to this run_log.npz")
+    args = ap.parse_args()
+
+    if args.random:
+        scenario = make_random_scenario(args.random[0], args.random[1], args.obstacle_prob, seed=args.seed)
+    else:
+        scenario = make_unified_scenario()
+    base = BAStarConfig(max_steps=args.max_steps, stop_if_no_candidates=True)
+    configs = [
+        dataclasses.replace(base, sense_mode=s, inflate_obstacles=r, prefer_cost=c)
+        for s, r, c in itertools.product(args.sense, args.inflate, args.prefer_cost)
+    ]
+
+    def show(p: RaceProgress) -> None:
+        if args.quiet and p.status == RUNNING:
+            return
+        cfg = configs[p.variant]
+        extra = f" coverage {p.coverage_rate:.4f}" if p.coverage_rate is not None else ""
+        extra += f" error {p.error}" if p.error else ""
+        print(
+            f"[{p.variant}] {cfg.sense_mode}/{cfg.inflate_obstacles:g}/{cfg.prefer_cost} {p.status} "
+            f"steps {p.steps} length {p.path_length:g} ({p.seconds:.2f} s){extra}",
+            file=sys.stderr, flush=True,
+        )
+
+    race = race_configs(scenario.grid, scenario.start, configs, scenario.start_theta, workers=args.workers, min_coverage=args.min_coverage, on_progress=show)
+    summary = {
+        "scenario": scenario.name,
+        "winner": race.winner,
+        "config": dataclasses.asdict(race.cfg) if race.cfg is not None else None,
+        "path_length": race.result.path_length if race.result is not None else None,
+        "coverage_rate": race.result.coverage_rate if race.result is not None else None,
+        "variants": [dataclasses.asdict(o) for o in race.outcomes],
+    }
+    if args.log and race.result is not None:
+        save_run_log(Path(args.log), race.result)
+        summary["run_log"] = args.log
+    print(json.dumps(summary, indent=2))
+    return 0 if race.winner is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import sys
 from pathlib import Path as _Path
 sys.path.append(str(_Path(__file__).resolve().parents[1]))
@@ -10,16 +11,130 @@ from pathlib import Path
 
 from ba_star.scenarios import make_unified_scenario
 from ba_star.ba_star import BAStarPlanner, BAStarConfig
-from ba_star import viz
+from ba_star.multires import MultiResolutionPlanner
+from ba_star.profiling import profile_call
+from ba_star.figures import FigureJob, run_figure_jobs
+from ba_star.run_cache import RunCache, cached_run
+from ba_star.runlog import save_run_log
+from ba_star.metrics import run_metrics
+
+# ba_star.viz (and with it matplotlib) is imported only when figures are requested,
+# so --no-figures runs load nothing beyond NumPy.
+
+
+def fig_map(grid, out_path: str) -> None:
+    import matplotlib.pyplot as plt
+    from ba_star import viz
+    fig, ax = plt.subplots(figsize=(7, 7))
+    viz.plot_map(grid, ax=ax, title="Scenario map (ground truth)")
+    viz.save_fig(out_path)
+
+
+def fig_overlay_cells(grid, covered, out_path: str, raster: bool = False, max_pixels: int = 1500) -> None:
+    import matplotlib.pyplot as plt
+    from ba_star import viz
+    fig, ax = plt.subplots(figsize=(7, 7))
+    if raster:
+        viz.plot_raster_run(grid, ax=ax, covered=covered, title="Map with covered cells overlay", max_pixels=max_pixels)
+    else:
+        viz.plot_map(grid, ax=ax, title="Map with covered cells overlay")
+        viz.overlay_cells(ax, covered, marker_size=4.0, label="covered")
+        ax.legend(loc="lower left", framealpha=0.85)
+    viz.save_fig(out_path)
+
+
+def render_figures(args, outdir: Path, scenario, res, event_idx: int) -> None:
+    from ba_star import viz
+
+    # Figures are independent, so they are rendered as jobs on a process pool;
+    # a figure whose inputs hash to the same value as last time is skipped.
+    jobs = [
+        # Figure 1: map
+        FigureJob(str(outdir / "fig01_map.png"), fig_map, dict(grid=scenario.grid, out_path=str(outdir / "fig01_map.png"))),
+        # Figure 2: map with overlay cells (covered cells)
+        FigureJob(str(outdir / "fig02_overlay_cells.png"), fig_overlay_cells, dict(
+            grid=scenario.grid,
+            covered=res.covered_cells,
+            out_path=str(outdir / "fig02_overlay_cells.png"),
+            raster=args.raster,
+            max_pixels=args.max_pixels,
+        )),
+        # Figure 3: full run
+        FigureJob(str(outdir / "fig03_full_run.png"), viz.plot_full_run, dict(
+            grid=scenario.grid,
+            covered=res.covered_cells,
+            traj=res.trajectory_cells,
+            out_path=str(outdir / "fig03_full_run.png"),
+            title="BA* full run: covered cells and trajectory",
+            start_point=scenario.start,
+            raster=args.raster,
+            max_pixels=args.max_pixels,
+        )),
+    ]
+
+    # If we have a backtracking event, visualize the selected one
+    if res.events:
+        ev = res.events[event_idx]
+        print(f"Visualizing event {event_idx}: s_cp={ev.s_cp}, s_sp={ev.s_sp}, astar_len={ev.astar_len}, smooth_len={ev.smooth_len}")
+        jobs.append(FigureJob(str(outdir / "fig04_candidates.png"), viz.plot_candidates, dict(
+            grid=scenario.grid,
+            covered=res.covered_cells,
+            candidates=ev.candidates,
+            s_cp=ev.s_cp,
+            s_sp=ev.s_sp,
+            out_path=str(outdir / "fig04_candidates.png"),
+        )))
+        jobs.append(FigureJob(str(outdir / "fig05_astar_vs_smooth.png"), viz.plot_astar_vs_smooth, dict(
+            grid=scenario.grid,
+            s_cp=ev.s_cp,
+            s_sp=ev.s_sp,
+            astar_path=ev.astar_path,
+            smooth_path=ev.smooth_path,
+            out_path=str(outdir / "fig05_astar_vs_smooth.png"),
+        )))
+
+    if args.animation:
+        jobs.append(FigureJob(str(outdir / args.animation), viz.export_animation, dict(
+            grid=scenario.grid,
+            traj=res.trajectory_cells,
+            events=res.events,
+            out_path=str(outdir / args.animation),
+            steps_per_frame=args.steps_per_frame,
+        )))
+
+    rendered = run_figure_jobs(jobs, str(outdir), workers=args.workers, force=args.force_figures)
+    print(f"Rendered {len(rendered)} of {len(jobs)} figures ({len(jobs) - len(rendered)} up to date)")
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--outdir", type=str, default="outputs")
     ap.add_argument("--max_steps", type=int, default=60000)
-    ap.add_argument("--sense", type=str, default="N8", choices=["N8", "N4", "NONE"])
-    ap.add_argument("--inflate", type=int, default=0)
+    ap.add_argument("--sense", type=str, default="N8", choices=["N8", "N4", "RANGE", "NONE"])
+    ap.add_argument("--sense_radius", type=int, default=3, help="Sensor radius in cells for --sense RANGE")
+    ap.add_argument("--observability", type=str, default="FULL", choices=["FULL", "PARTIAL"])
+    ap.add_argument("--inflate", type=float, default=0, help="Obstacle inflation radius in cells")
+    ap.add_argument("--inflate_shape", type=str, default="SQUARE", choices=["SQUARE", "DISK"])
     ap.add_argument("--prefer_cost", type=str, default="A_STAR", choices=["A_STAR", "EUCLIDEAN"])
+    ap.add_argument("--cost_model", type=str, default="UNIT", choices=["UNIT", "OCTILE", "TURN"], help="Edge costs of the backtracking search")
+    ap.add_argument("--turn_penalty", type=float, default=1.0, help="Cost of a quarter turn for --cost_model TURN")
+    ap.add_argument("--map_backend", type=str, default="GRID", choices=["GRID", "QUADTREE"], help="QUADTREE: backtracking search over merged covered regions (faster on open maps; paths are not always shortest)")
+    ap.add_argument("--compute_backend", type=str, default=None, choices=["PYTHON", "NUMPY", "NUMBA"], help="Kernel implementation (same results; default: $BA_STAR_BACKEND or PYTHON)")
+    ap.add_argument("--multires", type=int, default=None, metavar="BLOCK", help="Plan coarse-to-fine: BA* over BLOCK x BLOCK cell blocks (power of two), lanes inside each (fast on large open maps)")
+    ap.add_argument("--profile", action="store_true", help="Profile planning: write profile.prof (pstats) and profile.collapsed (flame graph stacks), print the hottest functions by phase")
+    ap.add_argument("--profile_top", type=int, default=15, help="Functions listed in the --profile report")
+    ap.add_argument("--cache_dir", type=str, default=None, help="Reuse run results stored here (keyed by map, start and config)")
+    ap.add_argument("--cache_mb", type=float, default=256.0, help="Size limit of --cache_dir before least recently used results are dropped")
+    ap.add_argument("--log", action="store_true", help="Write the full run (trajectory and every backtrack event) to run_log.npz")
+    ap.add_argument("--record_events", type=str, default="FULL", choices=["FULL", "SUMMARY", "NONE"])
+    ap.add_argument("--max_events", type=int, default=None, help="Keep only the most recent backtrack events")
+    ap.add_argument("--no-figures", dest="figures", action="store_false", help="Headless mode: plan and write summary.json only")
+    ap.add_argument("--raster", action="store_true", help="Draw covered cells and trajectory as a single raster image (fast on large maps)")
+    ap.add_argument("--max_pixels", type=int, default=1500, help="Downsample raster overlays above this many cells per side")
+    ap.add_argument("--animation", type=str, default=None, help="Also write the run as an animation (e.g. run.gif) into outdir")
+    ap.add_argument("--steps_per_frame", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None, help="Processes for figure rendering (default: one per figure, up to CPU count)")
+    ap.add_argument("--force_figures", action="store_true", help="Re-render figures even if their inputs did not change")
     ap.add_argument("--event_idx", type=int, default=6, help="Index of backtrack event to visualize (default: 6)")
     args = ap.parse_args()
 
@@ -30,57 +145,37 @@ def main() -> int:
     cfg = BAStarConfig(
         max_steps=args.max_steps,
         sense_mode=args.sense,
+        sense_radius=args.sense_radius,
+        observability=args.observability,
         inflate_obstacles=args.inflate,
+        inflate_shape=args.inflate_shape,
         prefer_cost=args.prefer_cost,
+        cost_model=args.cost_model,
+        turn_penalty=args.turn_penalty,
+        map_backend=args.map_backend,
+        compute_backend=args.compute_backend,
         stop_if_no_candidates=True,
+        record_events=args.record_events,
+        max_events=args.max_events,
     )
-    planner = BAStarPlanner(scenario.grid, scenario.start, scenario.start_theta, cfg=cfg)
-    res = planner.run()
-
-    # Figure 1: map
-    import matplotlib.pyplot as plt
-    fig, ax = plt.subplots(figsize=(7, 7))
-    viz.plot_map(scenario.grid, ax=ax, title="Scenario map (ground truth)")
-    viz.save_fig(str(outdir / "fig01_map.png"))
+    if args.multires:
+        plan = MultiResolutionPlanner(scenario.grid, scenario.start, scenario.start_theta, cfg=cfg, block=args.multires).run
+    elif args.cache_dir:
+        cache = RunCache(args.cache_dir, max_bytes=int(args.cache_mb * 2**20))
+        plan = functools.partial(cached_run, scenario.grid, scenario.start, scenario.start_theta, cfg=cfg, cache=cache)
+    else:
+        plan = BAStarPlanner(scenario.grid, scenario.start, scenario.start_theta, cfg=cfg).run
+    profile = None
+    if args.profile:
+        res, profile = profile_call(plan)
+        profile.write(outdir / "profile")
+        print(profile.report(args.profile_top), file=sys.stderr)
+    else:
+        res = plan()
 
-    # Figure 2: map with overlay cells (covered cells)
-    fig, ax = plt.subplots(figsize=(7, 7))
-    viz.plot_map(scenario.grid, ax=ax, title="Map with covered cells overlay")
-    viz.overlay_cells(ax, res.covered_cells, marker_size=4.0, label="covered")
-    ax.legend(loc="lower left", framealpha=0.85)
-    viz.save_fig(str(outdir / "fig02_overlay_cells.png"))
-
-    # Figure 3: full run  
-    viz.plot_full_run(
-        scenario.grid,
-        covered=res.covered_cells,
-        traj=res.trajectory_cells,
-        out_path=str(outdir / "fig03_full_run.png"),
-        title="BA* full run: covered cells and trajectory",
-        start_point=scenario.start,
-    )
-
-    # If we have a backtracking event, visualize the selected one
     event_idx = min(args.event_idx, len(res.events) - 1) if res.events else 0
-    if res.events:
-        ev = res.events[event_idx]
-        print(f"Visualizing event {event_idx}: s_cp={ev.s_cp}, s_sp={ev.s_sp}, astar_len={len(ev.astar_path)}, smooth_len={len(ev.smooth_path)}")
-        viz.plot_candidates(
-            scenario.grid,
-            covered=res.covered_cells,
-            candidates=ev.candidates,
-            s_cp=ev.s_cp,
-            s_sp=ev.s_sp,
-            out_path=str(outdir / "fig04_candidates.png"),
-        )
-        viz.plot_astar_vs_smooth(
-            scenario.grid,
-            s_cp=ev.s_cp,
-            s_sp=ev.s_sp,
-            astar_path=ev.astar_path,
-            smooth_path=ev.smooth_path,
-            out_path=str(outdir / "fig05_astar_vs_smooth.png"),
-        )
+    if args.figures:
+        render_figures(args, outdir, scenario, res, event_idx)
 
     summary = {
         "scenario": scenario.name,
@@ -88,7 +183,8 @@ def main() -> int:
         "steps": res.steps,
         "coverage_rate": res.coverage_rate,
         "path_length": res.path_length,
-        "num_backtrack_events": len(res.events),
+        "num_backtrack_events": res.num_backtracks,
+        "metrics": run_metrics(res, scenario.grid.inflate_obstacles(cfg.inflate_obstacles, cfg.inflate_shape)),
         "first_event": None,
     }
     if res.events:
@@ -96,11 +192,23 @@ def main() -> int:
         summary["first_event"] = {
             "s_cp": list(ev.s_cp),
             "s_sp": list(ev.s_sp) if ev.s_sp is not None else None,
-            "num_candidates": len(ev.candidates),
-            "astar_path_len": len(ev.astar_path),
-            "smooth_path_len": len(ev.smooth_path),
+            "num_candidates": ev.num_candidates,
+            "astar_path_len": ev.astar_len,
+            "smooth_path_len": ev.smooth_len,
         }
 
+    if profile is not None:
+        summary["profile"] = {
+            "seconds": profile.seconds,
+            "phases": profile.phase_shares(),
+            "pstats": "profile.prof",
+            "collapsed": "profile.collapsed",
+        }
+
+    if args.log:
+        save_run_log(outdir / "run_log.npz", res)
+        summary["run_log"] = "run_log.npz"
+
     (outdir / "summary.json").write_text(json.dumps(summary, indent=2))
     print(json.dumps(summary, indent=2))
     return 0
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path as _Path
+sys.path.append(str(_Path(__file__).resolve().parents[1]))
+import asyncio
+
+from ba_star.service import PlanningServer
+
+
+async def serve(args) -> None:
+    server = PlanningServer(workers=args.workers, map_cache_size=args.map_cache, batch_window=args.batch_window_ms / 1000.0)
+    addr = await server.start(socket_path=args.socket, host=args.host, port=args.port)
+    print(f"planning service listening on {addr}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--socket", type=str, default=None, help="Listen on this Unix socket instead of TCP")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=None, help="Planner worker processes (default: min(4, cpus))")
+    ap.add_argument("--map_cache", type=int, default=8, help="Loaded/inflated maps kept per worker")
+    ap.add_argument("--batch_window_ms", type=float, default=5.0, help="How long to gather requests into one batch")
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the package is used from the source tree, not installed: make `pytest` work from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
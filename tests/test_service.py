@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import tempfile
+
+import pytest
+
+from ba_star.ba_star import BAStarConfig, BAStarPlanner
+from ba_star.scenarios import make_unified_scenario
+from ba_star.service import PlanClient, PlanningServer
+
+
+UNIFIED = {"scenario": "unified"}
+
+
+@pytest.fixture(scope="module")
+def scenario():
+    return make_unified_scenario()
+
+
+def serve(test, **server_kw):
+    """
+    Run test(server, client, socket_path) against a fresh server on a temporary Unix socket.
+    """
+    async def main():
+        sock = os.path.join(tempfile.mkdtemp(), "plan.sock")
+        server = PlanningServer(**{"workers": 2, "batch_window": 0.05, **server_kw})
+        await server.start(socket_path=sock)
+        client = await PlanClient.connect(socket_path=sock)
+        try:
+            return await asyncio.wait_for(test(server, client, sock), 120)
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(main())
+
+
+def reference(scenario, **config):
+    return BAStarPlanner(scenario.grid, scenario.start, scenario.start_theta, cfg=BAStarConfig(**config)).run()
+
+
+def test_plan_streams_the_same_run_as_the_planner(scenario):
+    config = {"prefer_cost": "EUCLIDEAN"}
+
+    async def test(server, client, sock):
+        return [msg async for msg in client.plan(UNIFIED, scenario.start, scenario.start_theta, config)]
+
+    # zero-length slices stop at the first yield point, i.e. after every move
+    msgs = serve(test, slice_s=0.0)
+    ref = reference(scenario, **config)
+    moves = [m for m in msgs if m["type"] == "moves"]
+    events = [m for m in msgs if m["type"] == "event"]
+    assert msgs[-1]["type"] == "done"
+    # produced in run_for() slices, not chunked after the fact
+    assert [len(m["cells"]) for m in moves] == [1] * len(ref.trajectory_cells)
+    assert [m["offset"] for m in moves] == list(range(len(ref.trajectory_cells)))
+    assert [c for m in moves for c in m["cells"]] == [list(c) for c in ref.trajectory_cells]
+    assert [e["index"] for e in events] == list(range(len(ref.events)))
+    assert [tuple(e["event"]["s_sp"]) for e in events] == [e.s_sp for e in ref.events]
+    assert msgs[-1]["summary"]["steps"] == ref.steps
+
+
+def test_concurrent_requests_on_one_map_are_batched(scenario):
+    starts = [scenario.start, (2, 2), (40, 40)]
+    config = {"prefer_cost": "EUCLIDEAN"}
+
+    async def test(server, client, sock):
+        results = await asyncio.gather(*[client.plan_result(UNIFIED, s, 0.0, config) for s in starts])
+        return results, server.worker_tasks
+
+    # the batch closes when all three have arrived, well inside the window
+    results, tasks = serve(test, batch_window=60.0, max_batch=len(starts))
+    assert tasks == 2  # one group, spread over the two workers
+    for s, res in zip(starts, results):
+        ref = BAStarPlanner(scenario.grid, s, 0.0, cfg=BAStarConfig(**config)).run()
+        assert res["trajectory"] == [list(c) for c in ref.trajectory_cells]
+        assert res["summary"]["coverage_rate"] == ref.coverage_rate
+
+
+def test_malformed_requests_get_error_replies(scenario):
+    async def test(server, client, sock):
+        with pytest.raises(RuntimeError, match="unknown map spec"):
+            await client.plan_result({"scenario": "nope"}, (1, 1))
+        with pytest.raises(RuntimeError, match="start_cell must be free"):
+            await client.plan_result(UNIFIED, (0, 0))
+        with pytest.raises(RuntimeError, match="unexpected keyword"):
+            await client.plan_result(UNIFIED, scenario.start, config={"no_such_field": 1})
+        # raw lines: the connection stays usable after each error
+        reader, writer = await asyncio.open_unix_connection(sock)
+        replies = []
+        for line in (b"not json\n", b"[1]\n", b"5\n", b'{"id": 7, "map": {"scenario": "unified"}}\n'):
+            writer.write(line)
+            await writer.drain()
+            replies.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        res = await client.plan_result(UNIFIED, scenario.start, config={"prefer_cost": "EUCLIDEAN"})
+        return replies, res
+
+    replies, res = serve(test)
+    assert [r["type"] for r in replies] == ["error"] * 4
+    assert [r["id"] for r in replies] == [None, None, None, 7]
+    assert res["summary"]["coverage_rate"] == 1.0